@@ -46,7 +46,7 @@ from .buttons import *
 from .buttons.customize import *
 from .operators import *
 from .lib import *
-from .lib.Brick.legal_brick_sizes import getLegalBrickSizes
+from .lib.Brick.legal_brick_sizes import getLegalBrickSizes, getLegalBrickSizeLookup
 from . import addon_updater_ops
 
 # store keymaps here to access after registration
@@ -82,6 +82,7 @@ def register():
 
     # define legal brick sizes (key:height, val:[width,depth])
     bpy.props.Bricker_legal_brick_sizes = getLegalBrickSizes()
+    bpy.props.Bricker_legal_brick_lookup = getLegalBrickSizeLookup(bpy.props.Bricker_legal_brick_sizes)
 
     # Add attribute for Bricker Instructions addon
     Scene.isBrickerInstalled = BoolProperty(default=True)
@@ -120,6 +121,8 @@ def register():
     bpy.app.handlers.load_post.append(safe_unlink_parent)
     bpy.app.handlers.load_post.append(handle_upconversion)
     bpy.app.handlers.load_post.append(reset_undo_stack)
+    bpy.app.handlers.undo_post.append(reset_anim_frame_index)
+    bpy.app.handlers.redo_post.append(reset_anim_frame_index)
 
     # addon updater code and configurations
     addon_updater_ops.register(bl_info)
@@ -129,7 +132,12 @@ def unregister():
     # addon updater unregister
     addon_updater_ops.unregister()
 
+    # stop persistent worker instances
+    BrickerWorkerPool.shutdownAll()
+
     # unregister app handlers
+    bpy.app.handlers.redo_post.remove(reset_anim_frame_index)
+    bpy.app.handlers.undo_post.remove(reset_anim_frame_index)
     bpy.app.handlers.load_post.remove(reset_undo_stack)
     bpy.app.handlers.load_post.remove(handle_upconversion)
     bpy.app.handlers.load_post.remove(safe_unlink_parent)
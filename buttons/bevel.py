@@ -56,7 +56,8 @@ class BRICKER_OT_bevel(bpy.types.Operator):
             # set bevel action to add or remove
             try:
                 testBrick = getBricks()[0]
-                testBrick.modifiers[testBrick.name + '_bvl']
+                if not isInstancedBrick(testBrick):
+                    testBrick.modifiers[testBrick.name + '_bvl']
                 action = "REMOVE" if cm.bevelAdded else "ADD"
             except:
                 action = "ADD"
@@ -85,6 +86,7 @@ class BRICKER_OT_bevel(bpy.types.Operator):
     def removeBevelMods(self, objs):
         """ removes bevel modifier 'obj.name + "_bvl"' for objects in 'objs' """
         objs = confirmIter(objs)
+        objs = self.bevelInstanceMeshes(objs, None)
         for obj in objs:
             bvlMod = obj.modifiers.get(obj.name + "_bvl")
             if bvlMod is None:
@@ -96,6 +98,8 @@ class BRICKER_OT_bevel(bpy.types.Operator):
         """ runs 'createBevelMod' on objects in 'objs' """
         # get objs to bevel
         objs = confirmIter(objs)
+        # bevel shared meshes of instanced bricks
+        objs = self.bevelInstanceMeshes(objs, (cm.bevelWidth * cm.brickHeight, cm.bevelSegments, cm.bevelProfile))
         # create bevel modifiers for each object
         for obj in objs:
             segments = cm.bevelSegments
@@ -103,6 +107,21 @@ class BRICKER_OT_bevel(bpy.types.Operator):
             vGroupName = obj.name + "_bvl"
             self.createBevelMod(obj=obj, width=cm.bevelWidth * cm.brickHeight, segments=segments, profile=profile, limitMethod="VGROUP", vertexGroup=vGroupName, offsetType='WIDTH', angleLimit=1.55334)
 
+    @classmethod
+    def bevelInstanceMeshes(self, objs, bevel):
+        """ applies bevel (width, segments, profile; None to remove) to each shared mesh of instanced bricks in 'objs' once; returns remaining objs """
+        remainingObjs = []
+        instMeshes = set()
+        for obj in objs:
+            if isInstancedBrick(obj):
+                instMeshes.add(obj.data)
+            else:
+                remainingObjs.append(obj)
+        for instMesh in instMeshes:
+            if list(instMesh.get("bricker_bevel", [])) != list(bevel or []):
+                bakeInstanceMesh(instMesh, bevel)
+        return remainingObjs
+
     @classmethod
     def createBevelMod(self, obj, width=1, segments=1, profile=0.5, onlyVerts=False, limitMethod='NONE', angleLimit=0.523599, vertexGroup=None, offsetType='OFFSET'):
         """ create bevel modifier for 'obj' with given parameters """
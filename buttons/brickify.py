@@ -33,6 +33,7 @@ from .delete_model import BRICKER_OT_delete_model
 from .bevel import BRICKER_OT_bevel
 from .cache import *
 from ..lib.bricksDict import *
+from ..lib.worker_pool import *
 from ..lib.background_processing.classes.JobManager import JobManager
 from ..functions import *
 
@@ -60,10 +61,15 @@ class BrickerBrickify(bpy.types.Operator):
         if event.type == "TIMER":
             try:
                 scn, cm, n = getActiveContextInfo(cm=self.cm)
+                if self.useWorkerPool:
+                    self.workerPool.processJobs()
                 for job in self.jobs.copy():
                     # cancel if model was deleted before process completed
                     if scn in self.source.users_scene:
                         break
+                    if self.useWorkerPool:
+                        self.processWorkerPoolJob(job)
+                        continue
                     animAction = "ANIM" in self.action
                     frame = int(job.split("__")[-1][:-3]) if animAction else None
                     objFrameStr = "_f_%(frame)s" % locals() if animAction else ""
@@ -72,7 +78,7 @@ class BrickerBrickify(bpy.types.Operator):
                         if animAction: self.report({"INFO"}, "Completed frame %(frame)s of model '%(n)s'" % locals())
                         # cache bricksDict
                         retrieved_data = self.JobManager.get_retrieved_python_data(job)
-                        bricksDict = json.loads(retrieved_data["bricksDict"])
+                        bricksDict = decodeBFMCache(retrieved_data["bricksDict"])
                         cm.brickSizesUsed = retrieved_data["brickSizesUsed"]
                         cm.brickTypesUsed = retrieved_data["brickTypesUsed"]
                         cacheBricksDict(self.action, cm, bricksDict, curFrame=frame)
@@ -99,6 +105,7 @@ class BrickerBrickify(bpy.types.Operator):
                         if animAction:
                             bricker_parent.parent = cm.parent_obj
                             cm.numAnimatedFrames += 1
+                            resetAnimFrameIndex(cm)
                         self.jobs.remove(job)
                     elif self.JobManager.job_dropped(job):
                         errormsg = self.JobManager.get_issue_string(job)
@@ -112,7 +119,7 @@ class BrickerBrickify(bpy.types.Operator):
                 if scn in self.source.users_scene:
                     self.cancel(context)
                     return {"CANCELLED"}
-                elif self.JobManager.jobs_complete():
+                elif self.workerPool.jobsComplete() if self.useWorkerPool else self.JobManager.jobs_complete():
                     self.finishAnimation()
                     self.report({"INFO"}, "Brickify background process complete for model '%(n)s'" % locals())
                     stopwatch("Total Time Elapsed", self.start_time, precision=2)
@@ -161,7 +168,14 @@ class BrickerBrickify(bpy.types.Operator):
             return {"FINISHED"}
 
     def cancel(self, context):
-        if self.JobManager.num_running_jobs() + self.JobManager.num_pending_jobs() > 0:
+        if self.useWorkerPool:
+            if not self.workerPool.jobsComplete():
+                wm = context.window_manager
+                wm.event_timer_remove(self._timer)
+                self.workerPool.cancelJobs()
+            # don't keep worker instances running after this operator
+            self.workerPool.shutdown()
+        elif self.JobManager.num_running_jobs() + self.JobManager.num_pending_jobs() > 0:
             wm = context.window_manager
             wm.event_timer_remove(self._timer)
             self.JobManager.kill_all()
@@ -187,8 +201,15 @@ class BrickerBrickify(bpy.types.Operator):
         self.JobManager.timeout = cm.backProcTimeout
         self.JobManager.max_workers = cm.maxWorkers
         self.JobManager.max_attempts = 1
+        self.workerPool = BrickerWorkerPool.getInstance(cm.id)
+        self.workerPool.timeout = cm.backProcTimeout
+        self.workerPool.maxWorkers = cm.maxWorkers
+        # compute bricksDicts of animation frames in persistent worker instances if possible
+        self.useWorkerPool = cm.brickifyInBackground and "ANIM" in self.action and self.source is not None and canUseWorkerPool(cm, self.source)
         self.brickerAddonPath = dirname(dirname(abspath(__file__)))
         self.jobs = list()
+        # frame sent to worker pool -> frames with identical source geometry
+        self.identicalFrames = dict()
         self.cm = cm
 
         if self.splitBeforeUpdate:
@@ -300,8 +321,18 @@ class BrickerBrickify(bpy.types.Operator):
             if self.origFrame != cm.modelCreatedOnFrame:
                 scn.frame_set(cm.modelCreatedOnFrame)
 
+        # apply changes to source geometry (only rebrickifying the changed region if possible)
+        regionUpdate = None
+        if self.action == "UPDATE_MODEL" and not matrixDirty:
+            regionUpdate = self.updateSourceGeometry(scn, cm, n)
+            if regionUpdate == "ALL":
+                BRICKER_OT_clear_cache.clearCache(cm, brick_mesh=False)
+                cm.matrixIsDirty = True
+                matrixDirty = True
+                regionUpdate = None
+
         # if there are no changes to apply, simply return "FINISHED"
-        if self.action == "UPDATE_MODEL" and not updateCanRun("MODEL"):
+        if self.action == "UPDATE_MODEL" and not updateCanRun("MODEL") and regionUpdate is None:
             return{"FINISHED"}
 
         if (matrixDirty or self.action != "UPDATE_MODEL") and cm.customized:
@@ -318,28 +349,10 @@ class BrickerBrickify(bpy.types.Operator):
 
         if self.action == "CREATE":
             # duplicate source
-            sourceDup = duplicate(self.source, link_to_scene=True)
+            sourceDup = self.duplicateSource(scn, cm)
             sourceDup.name = self.source.name + "_duplicate"
-            if cm.useLocalOrient:
-                sourceDup.rotation_mode = "XYZ"
-                sourceDup.rotation_euler = Euler((0, 0, 0))
             self.createdObjects.append(sourceDup.name)
             self.source.select = False
-            # remove modifiers and constraints
-            for mod in sourceDup.modifiers:
-                sourceDup.modifiers.remove(mod)
-            for constraint in sourceDup.constraints:
-                sourceDup.constraints.remove(constraint)
-            # remove sourceDup parent
-            if sourceDup.parent:
-                parent_clear(sourceDup)
-            # send to new mesh
-            if not cm.isSmoke:
-                sourceDup.data = self.source.to_mesh(scn, True, 'PREVIEW')
-            # apply transformation data
-            apply_transform(sourceDup)
-            sourceDup.animation_data_clear()
-            scn.update()
         else:
             # get previously created source duplicate
             sourceDup = bpy.data.objects.get(n + "_duplicate")
@@ -371,9 +384,15 @@ class BrickerBrickify(bpy.types.Operator):
             if not jobAdded: raise Exception("Job already added")
             self.jobs.append(curJob)
         else:
-            bGroup = self.brickifyActiveFrame(self.action)
+            keys = "ALL"
+            if regionUpdate is not None and cm.splitModel:
+                # only merge and draw bricks in changed region
+                keys, oldBrickNames = regionUpdate
+                for name in oldBrickNames:
+                    delete(bpy.data.objects.get(name))
+            bGroup = self.brickifyActiveFrame(self.action, keys=keys)
             # select the bricks object unless it's massive
-            if not cm.splitModel:
+            if not cm.splitModel and len(bGroup.objects) > 0:
                 obj = bGroup.objects[0]
                 if len(obj.data.vertices) < 500000:
                     select(obj, active=True)
@@ -441,13 +460,30 @@ class BrickerBrickify(bpy.types.Operator):
 
         filename = bpy.path.basename(bpy.data.filepath)[:-6]
         overwrite_blend = True
+        # first frame brickified for each source geometry fingerprint (frames with identical geometry share bricks)
+        frameFingerprints = {}
+        # source colors may differ between frames with identical geometry
+        reuseFrames = not cm.isSmoke and not (cm.materialType == "SOURCE" and sourceColorsAnimated(self.source))
+        # don't reuse bricks drawn for frames of previous runs
+        bricker_anim_mesh_cache.pop(cm.id, None)
         # iterate through frames of animation and generate Brick Model
         for curFrame in range(cm.startFrame, cm.stopFrame + 1):
             if self.updatedFramesOnly and cm.lastStartFrame <= curFrame and curFrame <= cm.lastStopFrame:
                 print("skipped frame %(curFrame)s" % locals())
                 cm.framesToAnimate -= 1
                 continue
-            if cm.brickifyInBackground:
+            if self.useWorkerPool:
+                fingerprint = hash_mesh(duplicates[curFrame].data) if reuseFrames else None
+                if fingerprint in frameFingerprints:
+                    self.identicalFrames[frameFingerprints[fingerprint]].append(curFrame)
+                    continue
+                jobAdded = self.workerPool.addJob(curFrame, getWorkerRequest(cm, duplicates[curFrame], curFrame))
+                if not jobAdded: raise Exception("Job for frame '%(curFrame)s' already added" % locals())
+                self.jobs.append(curFrame)
+                if fingerprint is not None:
+                    frameFingerprints[fingerprint] = curFrame
+                self.identicalFrames[curFrame] = []
+            elif cm.brickifyInBackground:
                 curJob = "%(filename)s__%(n)s__%(curFrame)s" % locals()
                 script = os.path.join(self.brickerAddonPath, "lib", "brickify_in_background_template.py")
                 jobAdded = self.JobManager.add_job(curJob, script=script, passed_data={"frame":curFrame, "cmlist_index":scn.cmlist_index, "action":self.action}, use_blend_file=True, overwrite_blend=overwrite_blend)
@@ -455,16 +491,26 @@ class BrickerBrickify(bpy.types.Operator):
                 self.jobs.append(curJob)
                 overwrite_blend = False
             else:
+                fingerprint = hash_mesh(duplicates[curFrame].data) if reuseFrames else None
+                if fingerprint in frameFingerprints:
+                    self.brickifyIdenticalFrame(curFrame, frameFingerprints[fingerprint])
+                    continue
                 success = self.brickifyCurrentFrame(curFrame, self.action)
                 if not success:
                     break
+                if fingerprint is not None:
+                    frameFingerprints[fingerprint] = curFrame
+        bricker_anim_mesh_cache.pop(cm.id, None)
+        # start worker instances
+        if self.useWorkerPool:
+            self.workerPool.processJobs()
 
         cm.lastStartFrame = cm.startFrame
         cm.lastStopFrame = cm.stopFrame
 
     @staticmethod
-    def brickifyCurrentFrame(curFrame, action, inBackground=False):
-        scn, cm, n = getActiveContextInfo()
+    def brickifyCurrentFrame(curFrame, action, inBackground=False, cm=None, bricksDict=None):
+        scn, cm, n = getActiveContextInfo(cm=cm)
         wm = bpy.context.window_manager
         Bricker_parent_on = "Bricker_%(n)s_parent" % locals()
         parent0 = bpy.data.objects.get(Bricker_parent_on)
@@ -485,7 +531,7 @@ class BrickerBrickify(bpy.types.Operator):
             scn.objects.unlink(source)
 
         # get source_details and dimensions
-        source_details, dimensions = getDetailsAndBounds(source)
+        source_details, dimensions = getDetailsAndBounds(source, cm)
 
         # update refLogo
         logo_details, refLogo = BrickerBrickify.getLogo(scn, cm, dimensions)
@@ -503,7 +549,7 @@ class BrickerBrickify(bpy.types.Operator):
 
         # create new bricks
         try:
-            group_name = BrickerBrickify.createNewBricks(source, parent, source_details, dimensions, refLogo, logo_details, action, split=cm.splitModel, curFrame=curFrame, origSource=cm.source_obj, selectCreated=False)
+            group_name = BrickerBrickify.createNewBricks(source, parent, source_details, dimensions, refLogo, logo_details, action, split=cm.splitModel, cm=cm, curFrame=curFrame, bricksDict=bricksDict, bricksDictIsNew=bricksDict is not None, origSource=cm.source_obj, selectCreated=False)
         except KeyboardInterrupt:
             if curFrame != cm.startFrame:
                 wm.progress_end()
@@ -534,7 +580,47 @@ class BrickerBrickify(bpy.types.Operator):
         return True
 
     @staticmethod
-    def brickifyActiveFrame(action):
+    def brickifyIdenticalFrame(curFrame, srcFrame, cm=None):
+        """ share bricksDict and brick mesh of frame 'srcFrame' (with identical source geometry) with frame 'curFrame' """
+        scn, cm, n = getActiveContextInfo(cm=cm)
+        wm = bpy.context.window_manager
+        Bricker_parent_on = "Bricker_%(n)s_parent" % locals()
+        srcObj = bpy.data.groups["Bricker_%(n)s_bricks_f_%(srcFrame)s" % locals()].objects[0]
+        # set up parent for this layer
+        p_name = "%(Bricker_parent_on)s_f_%(curFrame)s" % locals()
+        parent = bpy.data.objects.get(p_name)
+        if parent is None:
+            parent = bpy.data.objects.new(p_name, None)
+            parent.location = srcObj.parent.location
+            parent.parent = srcObj.parent.parent
+            parent.use_fake_user = True
+        # get brick group for this frame
+        group_name = "Bricker_%(n)s_bricks_f_%(curFrame)s" % locals()
+        bGroup = bpy.data.groups.get(group_name)
+        if bGroup is None:
+            bGroup = bpy.data.groups.new(group_name)
+        else:
+            for obj0 in bGroup.objects:
+                bGroup.objects.unlink(obj0)
+        # create object sharing brick mesh of identical frame
+        name = "Bricker_%(n)s_bricks_f_%(curFrame)s" % locals()
+        delete(bpy.data.objects.get(name))
+        obj = duplicate(srcObj, linked=True, link_to_scene=True)
+        obj.name = name
+        obj.parent = parent
+        bGroup.objects.link(obj)
+        # hide obj unless on scene current frame
+        adjusted_frame_current = getAnimAdjustedFrame(scn.frame_current, cm.startFrame, cm.stopFrame)
+        obj.hide        = curFrame != adjusted_frame_current
+        obj.hide_render = curFrame != adjusted_frame_current
+        # share bricksDict of identical frame
+        bricker_bfm_cache[cm.id].setAlias(str(curFrame), str(srcFrame))
+
+        wm.progress_update(curFrame-cm.startFrame)
+        print("reused bricks of frame %(srcFrame)s for frame %(curFrame)s" % locals())
+
+    @staticmethod
+    def brickifyActiveFrame(action, keys="ALL"):
         # initialize vars
         scn, cm, n = getActiveContextInfo()
         parent = bpy.data.objects.get("Bricker_%(n)s_parent" % locals())
@@ -545,7 +631,10 @@ class BrickerBrickify(bpy.types.Operator):
         logo_details, refLogo = BrickerBrickify.getLogo(scn, cm, dimensions)
 
         # create new bricks
-        group_name = BrickerBrickify.createNewBricks(sourceDup, parent, sourceDup_details, dimensions, refLogo, logo_details, action, split=cm.splitModel, curFrame=None)
+        if keys == "ALL" or len(keys) > 0:
+            group_name = BrickerBrickify.createNewBricks(sourceDup, parent, sourceDup_details, dimensions, refLogo, logo_details, action, split=cm.splitModel, curFrame=None, keys=keys, clearExistingGroup=keys == "ALL")
+        else:
+            group_name = "Bricker_%(n)s_bricks" % locals()
 
         bGroup = bpy.data.groups.get(group_name)
         if bGroup:
@@ -569,18 +658,48 @@ class BrickerBrickify(bpy.types.Operator):
 
         return bGroup
 
+    def processWorkerPoolJob(self, frame):
+        """ draw bricks of animation frame once its bricksDict is retrieved from worker pool """
+        scn, cm, n = getActiveContextInfo(cm=self.cm)
+        if self.workerPool.jobComplete(frame):
+            bricksDict = self.workerPool.getResult(frame)
+            self.brickifyCurrentFrame(frame, self.action, cm=cm, bricksDict=bricksDict)
+            for curFrame in self.identicalFrames[frame]:
+                self.brickifyIdenticalFrame(curFrame, frame, cm=cm)
+            self.report({"INFO"}, "Completed frame %(frame)s of model '%(n)s'" % locals())
+            resetAnimFrameIndex(cm)
+            cm.numAnimatedFrames += 1 + len(self.identicalFrames.pop(frame))
+        elif self.workerPool.jobDropped(frame):
+            errormsg = self.workerPool.getIssueString(frame)
+            print_exception("Bricker log", errormsg=errormsg)
+            self.report({"WARNING"}, "Dropped frame %(frame)s of model '%(n)s'" % locals())
+            tag_redraw_areas("VIEW_3D")
+            # frames with identical source geometry aren't drawn either
+            cm.framesToAnimate -= 1 + len(self.identicalFrames.pop(frame))
+        else:
+            return
+        self.jobs.remove(frame)
+
     def finishAnimation(self):
         scn, cm, n = getActiveContextInfo(cm=self.cm)
         wm = bpy.context.window_manager
         wm.progress_end()
         cm.brickifyingInBackground = False
+        bricker_anim_mesh_cache.pop(cm.id, None)
+        # don't keep worker instances running after this operator
+        if self.useWorkerPool:
+            self.workerPool.shutdown()
+        # frames drawn from worker pool results set this after 'runBrickify' finished
+        cm.buildIsDirty = False
+        # index brick objects of new frames and keyframe their visibility if enabled
+        updateFrameVisibilityKeyframes(cm)
 
     def finishModel(self):
         pass
 
     @staticmethod
-    def createNewBricks(source, parent, source_details, dimensions, refLogo, logo_details, action, split=True, cm=None, curFrame=None, bricksDict=None, keys="ALL", clearExistingGroup=True, selectCreated=False, printStatus=True, tempBrick=False, redraw=False, origSource=None):
-        """ gets/creates bricksDict, runs makeBricks, and caches the final bricksDict """
+    def createNewBricks(source, parent, source_details, dimensions, refLogo, logo_details, action, split=True, cm=None, curFrame=None, bricksDict=None, bricksDictIsNew=False, keys="ALL", clearExistingGroup=True, selectCreated=False, printStatus=True, tempBrick=False, redraw=False, origSource=None):
+        """ gets/creates bricksDict (unless passed, e.g. new bricksDict from worker pool if 'bricksDictIsNew'), runs makeBricks, and caches the final bricksDict """
         scn, cm, n = getActiveContextInfo(cm=cm)
         _, _, _, brickScale, customData = getArgumentsForBricksDict(cm, source=source, source_details=source_details, dimensions=dimensions)
         updateCursor = action in ("CREATE", "UPDATE_MODEL")
@@ -590,7 +709,7 @@ class BrickerBrickify(bpy.types.Operator):
             # get bricks dictionary
             bricksDict, loadedFromCache = getBricksDict(dType=action, source=source, source_details=source_details, dimensions=dimensions, brickScale=brickScale2, updateCursor=updateCursor, curFrame=curFrame, origSource=origSource, restrictContext=False)
         else:
-            loadedFromCache = True
+            loadedFromCache = not bricksDictIsNew
         # reset all values for certain keys in bricksDict dictionaries
         if cm.buildIsDirty and loadedFromCache:
             threshold = getThreshold(cm)
@@ -613,16 +732,50 @@ class BrickerBrickify(bpy.types.Operator):
             updateInternal(bricksDict, cm, keys, clearExisting=loadedFromCache)
             cm.buildIsDirty = True
         # update materials in bricksDict
-        if cm.materialType != "NONE" and (cm.materialIsDirty or cm.matrixIsDirty or cm.animIsDirty): bricksDict = updateMaterials(bricksDict, source, origSource, curFrame)
+        if cm.materialType != "NONE" and (bricksDictIsNew or cm.materialIsDirty or cm.matrixIsDirty or cm.animIsDirty): bricksDict = updateMaterials(bricksDict, source, origSource, curFrame)
+        # reuse bricks of previous animation frame not touching changed entries
+        mergeVertical, allMeshes, mats = None, None, None
+        reuseFrameBricks = curFrame is not None and not loadedFromCache and BrickerBrickify.canReuseFrameBricks(cm, split)
+        if reuseFrameBricks:
+            mergeVertical, allMeshes, mats = cm.brickType == "BRICKS AND PLATES", MeshAssembler(), []
+            frameRedraw = BrickerBrickify.getFrameRedraw(cm, bricksDict)
+            if frameRedraw is not None:
+                keys, allMeshes, mats = frameRedraw
         # make bricks
         group_name = 'Bricker_%(n)s_bricks_f_%(curFrame)s' % locals() if curFrame is not None else "Bricker_%(n)s_bricks" % locals()
-        bricksCreated, bricksDict = makeBricks(source, parent, refLogo, logo_details, dimensions, bricksDict, action, cm=cm, split=split, brickScale=brickScale, customData=customData, group_name=group_name, clearExistingGroup=clearExistingGroup, frameNum=curFrame, cursorStatus=updateCursor, keys=keys, printStatus=printStatus, tempBrick=tempBrick, redraw=redraw)
+        bricksCreated, bricksDict = makeBricks(source, parent, refLogo, logo_details, dimensions, bricksDict, action, cm=cm, split=split, brickScale=brickScale, customData=customData, group_name=group_name, clearExistingGroup=clearExistingGroup, frameNum=curFrame, cursorStatus=updateCursor, keys=keys, printStatus=printStatus, tempBrick=tempBrick, redraw=redraw, mergeVertical=mergeVertical, allMeshes=allMeshes, mats=mats)
+        if reuseFrameBricks:
+            bricker_anim_mesh_cache[cm.id] = (curFrame, allMeshes, mats)
         if selectCreated and len(bricksCreated) > 0:
             select(bricksCreated)
         # store current bricksDict to cache
         cacheBricksDict(action, cm, bricksDict, curFrame=curFrame)
         return group_name
 
+    @staticmethod
+    def canReuseFrameBricks(cm, split):
+        """ check if unchanged bricks of previous animation frame can be reused (drawing doesn't depend on random state or adjacent bricks) """
+        return not split and cm.brickType not in ("CUSTOM", "SLOPES") and cm.materialType != "RANDOM" and cm.randomLoc == 0 and cm.randomRot == 0
+
+    @staticmethod
+    def getFrameRedraw(cm, bricksDict):
+        """ returns keys to redraw, MeshAssembler and materials with unchanged bricks of previous frame (None if frame must be drawn from scratch) """
+        if cm.id not in bricker_anim_mesh_cache or not isinstance(bricker_bfm_cache.get(cm.id), FrameCache):
+            return None
+        prevFrame, prevMeshes, prevMats = bricker_anim_mesh_cache[cm.id]
+        try:
+            prevBricksDict = bricker_bfm_cache[cm.id][str(prevFrame)]
+        except KeyError:
+            return None
+        frameRedraw = getFrameRedrawKeys(prevBricksDict, bricksDict, getZStep(cm))
+        if frameRedraw is None:
+            return None
+        keys, replacedBricks = frameRedraw
+        allMeshes = prevMeshes.copy()
+        allMeshes.removeOwners(replacedBricks)
+        print("redrawing %(numKeys)s of %(total)s bricksDict entries changed since frame %(prevFrame)s" % dict(numKeys=len(keys), total=len(bricksDict), prevFrame=prevFrame))
+        return keys, allMeshes, list(prevMats)
+
     def isValid(self, scn, cm, source_name, source, Bricker_bricks_gn):
         """ returns True if brickify action can run, else report WARNING/ERROR and return False """
         # ensure custom object(s) are valid
@@ -638,8 +791,8 @@ class BrickerBrickify(bpy.types.Operator):
         # ensure source name isn't too long
         if len(source_name) > 30:
             self.report({"WARNING"}, "Source object name too long (must be <= 30 characters)")
-        # verify Blender file is saved
-        if cm.brickifyInBackground and bpy.data.filepath == "":
+        # verify Blender file is saved (not needed by worker pool)
+        if cm.brickifyInBackground and not self.useWorkerPool and bpy.data.filepath == "":
             self.report({"WARNING"}, "Please save the file first")
             return False
         # ensure custom material exists
@@ -846,6 +999,76 @@ class BrickerBrickify(bpy.types.Operator):
             safeUnlink(obj)
         return duplicates
 
+    def duplicateSource(self, scn, cm):
+        """ returns duplicate of source with modifiers and transformation applied """
+        sourceDup = duplicate(self.source, link_to_scene=True)
+        if cm.useLocalOrient:
+            sourceDup.rotation_mode = "XYZ"
+            sourceDup.rotation_euler = Euler((0, 0, 0))
+        # remove modifiers and constraints
+        for mod in sourceDup.modifiers:
+            sourceDup.modifiers.remove(mod)
+        for constraint in sourceDup.constraints:
+            sourceDup.constraints.remove(constraint)
+        # remove sourceDup parent
+        if sourceDup.parent:
+            parent_clear(sourceDup)
+        # send to new mesh
+        if not cm.isSmoke:
+            sourceDup.data = self.source.to_mesh(scn, True, 'PREVIEW')
+        # apply transformation data
+        apply_transform(sourceDup)
+        sourceDup.animation_data_clear()
+        scn.update()
+        return sourceDup
+
+    def updateSourceGeometry(self, scn, cm, n):
+        """ update source duplicate with changes to source geometry
+
+        returns None if source geometry is unchanged, "ALL" if the whole model must be rebrickified, else
+        keys of bricksDict entries in the changed region and names of the bricks to replace (from 'updateBricksDictRegion')
+
+        """
+        sourceDup = bpy.data.objects.get(n + "_duplicate")
+        if sourceDup is None or cm.isSmoke or cm.brickType == "CUSTOM":
+            return None
+        # get face hashes of last brickified and current source geometry
+        safeLink(self.source)
+        newDup = self.duplicateSource(scn, cm)
+        oldFaces = getSourceFaceHashes(cm, sourceDup.data)
+        newFaces = getFaceHashes(newDup.data)
+        region = getChangedRegion(oldFaces, newFaces)
+        if region is not None:
+            # swap new geometry into source duplicate
+            oldMesh = sourceDup.data
+            sourceDup.data = newDup.data
+            newDup.data = oldMesh
+            storeSourceFaceHashes(cm, sourceDup.data, newFaces)
+        # remove unused duplicate
+        m = newDup.data
+        bpy.data.objects.remove(newDup, do_unlink=True)
+        bpy.data.meshes.remove(m)
+        if region is None:
+            return None
+        # rebrickify whole model if the lattice changed or the bricks can't be updated in place
+        oldBounds = getFaceBounds(oldFaces)
+        newBounds = getFaceBounds(newFaces)
+        sameBounds = oldBounds is not None and newBounds is not None and all(vec_round(v0, precision=5) == vec_round(v1, precision=5) for v0, v1 in zip(oldBounds, newBounds))
+        bricksDict, loadedFromCache = getBricksDict(dType="MODEL", cm=cm)
+        if not sameBounds or not loadedFromCache or cm.buildIsDirty or cm.lastSplitModel != cm.splitModel or cm.brickifyInBackground:
+            return "ALL"
+        # update bricksDict entries near changed faces
+        remapNearFaces(bricksDict, getFaceMap(oldFaces, newFaces))
+        safeLink(sourceDup)
+        sourceDup_details, dimensions = getDetailsAndBounds(sourceDup)
+        _, _, _, brickScale, _ = getArgumentsForBricksDict(cm, source=sourceDup, source_details=sourceDup_details, dimensions=dimensions)
+        regionMin, regionMax = region
+        keys, oldBrickNames = updateBricksDictRegion(bricksDict, sourceDup, sourceDup_details, brickScale, regionMin, regionMax)
+        if cm.materialType != "NONE":
+            updateMaterials(bricksDict, sourceDup, self.source, keys=keys)
+        safeUnlink(sourceDup)
+        return keys, oldBrickNames
+
     @staticmethod
     def getNewParent(Bricker_parent_on, loc):
         parent = bpy.data.objects.new(Bricker_parent_on, None)
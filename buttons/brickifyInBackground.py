@@ -52,7 +52,7 @@ class BRICKER_OT_brickify_in_background(bpy.types.Operator):
         else:
             BrickerBrickify.brickifyActiveFrame(self.action)
         # save last cache to cm.BFMCache
-        cm.BFMCache = json.dumps(bricker_bfm_cache[cm.id])
+        cm.BFMCache = encodeBFMCache(bricker_bfm_cache[cm.id])
         return {"FINISHED"}
 
     ################################################
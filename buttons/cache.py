@@ -74,6 +74,7 @@ class BRICKER_OT_clear_cache(bpy.types.Operator):
         # clear light matrix cache
         if light_matrix:
             bricker_bfm_cache[cm.id] = None
+            bricker_anim_mesh_cache.pop(cm.id, None)
         # clear deep matrix cache
         if deep_matrix:
             cm.BFMCache = ""
@@ -0,0 +1,74 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# NOTE: Run with pytest from a Blender instance with Bricker enabled
+
+# System imports
+# NONE!
+
+# Blender imports
+import bpy
+
+# Addon imports
+from .undo_stack import *
+from ...lib.caches import bricker_bfm_cache
+from ...lib.bricksDict.columns import BricksDictColumns
+from ...lib.bricksDict.generate import createBricksDictEntry
+
+
+def setUpTestModel():
+    """ add cmlist item for test model and return its id """
+    scn = bpy.context.scene
+    cm = scn.cmlist.add()
+    cm.id = max([cm0.id for cm0 in scn.cmlist]) + 1
+    scn.cmlist_index = len(scn.cmlist) - 1
+    return cm.id
+
+
+def tearDownTestModel(cm_id):
+    """ remove cmlist item and bricksDict of test model """
+    scn = bpy.context.scene
+    bricker_bfm_cache.pop(cm_id, None)
+    scn.cmlist.remove(scn.cmlist_index)
+    scn.cmlist_index = len(scn.cmlist) - 1
+
+
+def test_undo_redo_two_steps():
+    """ undo and redo two successive edits of a bricksDict entry one step at a time """
+    cm_id = setUpTestModel()
+    bricker_initialized = bpy.props.bricker_initialized
+    bpy.props.bricker_initialized = True
+    try:
+        undo_stack = UndoStack.get_instance(reset=True)
+        bricksDict = BricksDictColumns.fromDict({"0,0,0": createBricksDictEntry("Bricker_test_brick__0,0,0", [0, 0, 0], val=1.0)})
+        bricker_bfm_cache[cm_id] = bricksDict
+        undo_stack.undo_push("test", affected_ids=[cm_id])
+        bricksDict["0,0,0"]["val"] = 0.5
+        undo_stack.undo_push("test", affected_ids=[cm_id])
+        bricksDict["0,0,0"]["val"] = 0.25
+        undo_stack.undo_pop()
+        assert bricker_bfm_cache[cm_id]["0,0,0"]["val"] == 0.5
+        undo_stack.undo_pop()
+        assert bricker_bfm_cache[cm_id]["0,0,0"]["val"] == 1.0
+        undo_stack.redo_pop()
+        assert bricker_bfm_cache[cm_id]["0,0,0"]["val"] == 0.5
+        undo_stack.redo_pop()
+        assert bricker_bfm_cache[cm_id]["0,0,0"]["val"] == 0.25
+    finally:
+        bpy.props.bricker_initialized = bricker_initialized
+        UndoStack.get_instance(reset=True)
+        tearDownTestModel(cm_id)
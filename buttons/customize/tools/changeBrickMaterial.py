@@ -71,7 +71,7 @@ class BRICKER_OT_change_brick_material(Operator):
                 cm = getItemByID(scn.cmlist, cm_id)
                 self.undo_stack.iterateStates(cm)
                 # initialize vars
-                bricksDict = json.loads(self.cached_bfm[cm_id])
+                bricksDict = deepcopy(self.cached_bfm[cm_id])
                 keysToUpdate = []
                 cm.customized = True
 
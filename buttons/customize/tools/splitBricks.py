@@ -134,7 +134,7 @@ class BRICKER_OT_split_bricks(Operator):
             for cm_id in self.objNamesD.keys():
                 cm = getItemByID(scn.cmlist, cm_id)
                 self.undo_stack.iterateStates(cm)
-                bricksDict = json.loads(self.cached_bfm[cm_id]) if deepCopyMatrix else self.bricksDicts[cm_id]
+                bricksDict = deepcopy(self.cached_bfm[cm_id]) if deepCopyMatrix else self.bricksDicts[cm_id]
                 keysToUpdate = []
                 cm.customized = True
 
@@ -33,6 +33,91 @@ from bpy.app.handlers import persistent, load_post
 # Addon imports
 from ...functions import *
 from ...lib.caches import bricker_bfm_cache
+from ...lib.bricksDict.columns import BricksDictColumns
+from ...lib.bricksDict.storage import getBricksDictSize, FrameCache
+
+
+def getUndoMemoryLimit():
+    """ returns memory limit (in bytes) for bricksDict deltas in each of the undo and redo stacks """
+    try:
+        return bpy.props.bricker_preferences.undoMemory * 1024 ** 2
+    except AttributeError:
+        return 256 * 1024 ** 2
+
+
+def applyChanges(bricksDict, changes:dict, after:bool=False):
+    """ set bricksDict entries to values before (or after) changes (key -> (before, after)) """
+    for key, values in changes.items():
+        value = values[1] if after else values[0]
+        if value is None:
+            if key in bricksDict:
+                del bricksDict[key]
+        else:
+            bricksDict[key] = deepcopy(value)
+
+
+def snapshotCache(cache):
+    """ returns copy of cache for undo stack (frame caches are copied as their packed frames) """
+    if cache is None:
+        return None
+    if isinstance(cache, FrameCache):
+        return FrameCache(cache.packAll(), aliases=dict(cache.aliases), bases=dict(cache.bases))
+    return deepcopy(cache)
+
+
+def snapshotsEqual(snapshot0, snapshot1):
+    """ check if cache snapshots from 'snapshotCache' are equal (without decoding packed frames) """
+    if isinstance(snapshot0, FrameCache) and isinstance(snapshot1, FrameCache):
+        return snapshot0.packedFrames == snapshot1.packedFrames and snapshot0.aliases == snapshot1.aliases and snapshot0.bases == snapshot1.bases
+    if isinstance(snapshot0, FrameCache) or isinstance(snapshot1, FrameCache):
+        return False
+    return snapshot0 == snapshot1
+
+
+def getSnapshotSize(snapshot):
+    """ returns approximate memory size of cache snapshot (in bytes) """
+    if isinstance(snapshot, FrameCache):
+        return sum(len(data) for data in snapshot.packedFrames.values())
+    return getBricksDictSize(snapshot)
+
+
+def mergeDeltas(deltas0:dict, deltas1:dict):
+    """ returns deltas leading from states before 'deltas0' to states after 'deltas1' """
+    merged = dict(deltas0)
+    for cm_id, delta1 in deltas1.items():
+        delta0 = merged.get(cm_id)
+        if delta0 is None:
+            merged[cm_id] = delta1
+        elif delta0[0] == "KEYS" and delta1[0] == "KEYS":
+            changes = dict(delta0[1])
+            for key, (before, after) in delta1[1].items():
+                changes[key] = (changes[key][0], after) if key in changes else (before, after)
+            merged[cm_id] = ("KEYS", changes)
+        else:
+            # get full states before and after both deltas
+            if delta0[0] == "SNAPSHOT":
+                before = delta0[1]
+            else:
+                before = snapshotCache(delta1[1])
+                applyChanges(before, delta0[1])
+            if delta1[0] == "SNAPSHOT":
+                after = delta1[2]
+            else:
+                after = snapshotCache(delta0[2])
+                applyChanges(after, delta1[1], after=True)
+            merged[cm_id] = ("SNAPSHOT", before, after)
+    return merged
+
+
+def getDeltasSize(deltas:dict):
+    """ returns approximate memory size of deltas (in bytes) """
+    size = 0
+    for delta in deltas.values():
+        if delta[0] == "KEYS":
+            size += len(delta[1]) * 2 * 1024
+        else:
+            size += sum(getSnapshotSize(state) for state in delta[1:] if state is not None)
+    return size
 
 python_undo_state = {}
 
@@ -62,8 +147,12 @@ class UndoStack():
 
     def __init__(self):
         assert hasattr(UndoStack, 'creating'), 'Do not create new UndoStack directly!  Use UndoStack.new()'
-        self.undo = []  # undo stack of causing actions, FSM state, tool states, and rftargets
-        self.redo = []  # redo stack of causing actions, FSM state, tool states, and rftargets
+        self.undo = []  # undo stack of causing actions and bricksDict deltas
+        self.redo = []  # redo stack of causing actions and bricksDict deltas
+        self.base = {}  # bricksDict states at last sync (deltas are taken relative to these)
+        self.tracked = {}  # bricksDicts in bricker_bfm_cache at last sync
+        self.dirtyIDs = set()  # ids of models affected by action of last push (may have changed since last sync)
+        self.syncCount = 0
         scn = bpy.context.scene
         for cm in scn.cmlist:
             cm.blender_undo_state = 0
@@ -74,6 +163,7 @@ class UndoStack():
 
     instance = None
     undo_depth = 500    # set in User Preferences?
+    checkpoint_interval = 25    # compare full bricksDicts (rather than journaled keys) every n syncs
 
     ###################################################
     # undo / redo stack operations
@@ -99,28 +189,92 @@ class UndoStack():
 
     def isUpdating(self): return bpy.props.bricker_undoUpdating
 
-    def _create_state(self, action, bfm_cache):
+    def _create_state(self, action, deltas=None):
         return {
             'action':       action,
-            'bfm_cache':    bfm_cache
+            'deltas':       deltas or {},
+            'size':         getDeltasSize(deltas or {}),
             }
 
-    def _restore_state(self, state):
+    def _isAffected(self, cm_id, affected_ids):
+        """ check if model may have changed since last sync (affected by last pushed action or by 'affected_ids') """
+        return "ALL" in (affected_ids, self.dirtyIDs) or cm_id in affected_ids or cm_id in self.dirtyIDs
+
+    def _sync(self, affected_ids=(), checkpoint=False):
+        """ returns changes to bricker_bfm_cache since last sync as deltas from base states (and updates base states)
+
+        Caches that can't be compared column-wise are only compared when they were replaced or may have
+        been changed (see '_isAffected')
+
+        """
+        deltas = {}
         global bricker_bfm_cache
-        for key in state['bfm_cache'].keys():
-            bricker_bfm_cache[key] = json.loads(state['bfm_cache'][key])
+        self.syncCount += 1
+        checkpoint = checkpoint or self.syncCount % self.checkpoint_interval == 0
+        for cm_id in set(bricker_bfm_cache.keys()) | set(self.base.keys()):
+            live = bricker_bfm_cache.get(cm_id)
+            base = self.base.get(cm_id)
+            if isinstance(live, BricksDictColumns) and isinstance(base, BricksDictColumns):
+                # get changed keys from journal of tracked bricksDict, else compare columns
+                if live is self.tracked.get(cm_id) and live.changedKeys is not None and not checkpoint:
+                    changedKeys = live.changedKeys
+                else:
+                    changedKeys = base.diffKeys(live)
+                changes = {}
+                for key in changedKeys:
+                    before = base[key].toDict() if key in base else None
+                    after = live[key].toDict() if key in live else None
+                    if before != after:
+                        changes[key] = (before, after)
+                applyChanges(base, changes, after=True)
+                if len(changes) > 0:
+                    deltas[cm_id] = ("KEYS", changes)
+            elif live is not self.tracked.get(cm_id) or self._isAffected(cm_id, affected_ids):
+                # store full snapshots of caches that can't be compared column-wise
+                after = snapshotCache(live)
+                if live is self.tracked.get(cm_id) and snapshotsEqual(after, base):
+                    continue
+                deltas[cm_id] = ("SNAPSHOT", base, after)
+                self.base[cm_id] = snapshotCache(after)
+            self.tracked[cm_id] = live
+            if isinstance(live, BricksDictColumns):
+                live.trackChanges()
+        return deltas
 
-    def appendState(self, action, stack, stackType, affected_ids="ALL"):
-        new_bfm_cache = {}
-        bfm_cached = stack[-1]["bfm_cache"] if len(stack) > 0 else {}
+    def _restore_deltas(self, deltas, after=False):
+        """ restore bricker_bfm_cache (and base states) to states before (or after) deltas """
         global bricker_bfm_cache
-        for cm_id in bricker_bfm_cache:
-            if affected_ids != "ALL" and cm_id not in affected_ids and cm_id in bfm_cached:
-                new_bfm_cache[cm_id] = bfm_cached[cm_id]
+        for cm_id, delta in deltas.items():
+            if delta[0] == "SNAPSHOT":
+                state = delta[2] if after else delta[1]
+                live = snapshotCache(state)
+                bricker_bfm_cache[cm_id] = live
+                self.base[cm_id] = snapshotCache(state)
             else:
-                new_bfm_cache[cm_id] = json.dumps(bricker_bfm_cache[cm_id])
-        stack.append(self._create_state(action, new_bfm_cache))
-        return new_bfm_cache
+                live = bricker_bfm_cache[cm_id]
+                applyChanges(live, delta[1], after=after)
+                applyChanges(self.base[cm_id], delta[1], after=after)
+            self.tracked[cm_id] = live
+            if isinstance(live, BricksDictColumns):
+                live.trackChanges()
+
+    def _limit_stack(self, stack):
+        """ remove oldest states from stack while above undo depth or memory limit """
+        memoryLimit = getUndoMemoryLimit()
+        while len(stack) > self.undo_depth or (len(stack) > 1 and sum(state['size'] for state in stack) > memoryLimit):
+            stack.pop(0)
+
+    def appendState(self, action, stack, stackType, affected_ids="ALL"):
+        deltas = self._sync(affected_ids)
+        # models affected by this action are compared at next sync
+        self.dirtyIDs = affected_ids if affected_ids == "ALL" else set(affected_ids)
+        # changes since last sync lead from state on top of stack to current state
+        if len(stack) > 0:
+            stack[-1]['deltas'] = mergeDeltas(stack[-1]['deltas'], deltas)
+            stack[-1]['size'] = getDeltasSize(stack[-1]['deltas'])
+        stack.append(self._create_state(action))
+        # return base states (current bricksDicts) of affected models
+        return {cm_id: self.base.get(cm_id) for cm_id in self.base if affected_ids == "ALL" or cm_id in affected_ids}
 
     def undo_push(self, action, affected_ids="ALL", repeatable=False):
         # skip pushing to undo if action is repeatable and we are repeating actions
@@ -130,8 +284,7 @@ class UndoStack():
         if not bpy.props.bricker_initialized:
             return
         new_bfm_cache = self.appendState(action, self.undo, 'undo', affected_ids=affected_ids)
-        while len(self.undo) > self.undo_depth:
-            self.undo.pop(0)  # limit stack size
+        self._limit_stack(self.undo)
         self.redo.clear()
         self.instrument_write(action)
         return new_bfm_cache
@@ -139,8 +292,11 @@ class UndoStack():
     def undo_pop(self):
         if not self.undo:
             return
-        self.appendState('undo', self.redo, 'redo')
-        self._restore_state(self.undo.pop())
+        state = self.undo.pop()
+        deltas = mergeDeltas(state['deltas'], self._sync())
+        self._restore_deltas(deltas)
+        self.redo.append(self._create_state('undo', deltas))
+        self._limit_stack(self.redo)
         self.instrument_write('undo')
         # iterate undo states
         global python_undo_state
@@ -153,14 +309,20 @@ class UndoStack():
         self.undo.pop()
 
     def undo_cancel(self):
-        self._restore_state(self.undo.pop())
+        state = self.undo.pop()
+        deltas = mergeDeltas(state['deltas'], self._sync())
+        self._restore_deltas(deltas)
         self.instrument_write('cancel (undo)')
 
     def redo_pop(self):
         if not self.redo:
             return
-        self.appendState('redo', self.undo, 'undo')
-        self._restore_state(self.redo.pop())
+        # discard changes since last undo, then redo changes
+        self._restore_deltas(self._sync())
+        state = self.redo.pop()
+        self._restore_deltas(state['deltas'], after=True)
+        self.undo.append(self._create_state('redo', state['deltas']))
+        self._limit_stack(self.undo)
         self.instrument_write('redo')
         # iterate undo states
         global python_undo_state
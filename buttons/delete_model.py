@@ -340,6 +340,7 @@ class BRICKER_OT_delete_model(bpy.types.Operator):
                         delete(bricks)
                     bpy.data.groups.remove(brickGroup, do_unlink=True)
             cm.animated = False
+            resetAnimFrameIndex(cm)
         # finish status update
         update_progress("Deleting", 1)
         wm.progress_end()
@@ -60,7 +60,7 @@ class BRICKER_OT_export_model_data(Operator):
                                 "# Number of %(bType)s:  %(numBs)s" % locals(),
                                 ""]
             # get bricksDict and separate into strings
-            bricksDictStrings = json.dumps(bricksDict).split("}, ")
+            bricksDictStrings = json.dumps(bricksDict, default=json_default).split("}, ")
             for i,string in enumerate(bricksDictStrings):
                 whitespace = " " if string.startswith("\"") else ""
                 bricksDictStrings[i] = "%(whitespace)s%(string)s}," % locals()
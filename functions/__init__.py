@@ -26,3 +26,4 @@ from .wrappers import *
 from .logo_obj import *
 from .mat_utils import *
 from .point_cache import *
+from .frame_visibility import *
@@ -17,8 +17,11 @@
 
 # System imports
 import bpy
+import math
+import itertools
 import numpy as np
 import colorsys
+from collections import OrderedDict
 
 # Addon imports
 from .general import *
@@ -83,12 +86,13 @@ def getColors():
 def findNearestBrickColorName(rgba, transWeight, matObj=None):
     if rgba is None:
         return ""
-    colors = getColors().copy()
+    colors = getColors()
     if matObj is not None:
-        for k in getColors().keys():
-            if k not in matObj.data.materials.keys():
-                colors.pop(k, None)
-    return findNearestColorName(rgba, transWeight, colors)
+        matNames = set(matObj.data.materials.keys())
+        colorNames = tuple(k for k in colors.keys() if k in matNames)
+    else:
+        colorNames = tuple(colors.keys())
+    return getColorIndex(colorNames, transWeight).nearest(rgba)
 
 
 def distance(c1, c2, aWt=1):
@@ -120,3 +124,97 @@ def findNearestColorName(rgba, transWeight, colorNames):
             mindiff = diff
             mincolorname = colorName
     return mincolorname
+
+
+def getColorIndex(colorNames:tuple, transWeight:float):
+    """ returns cached 'ColorIndex' over ABS colors in 'colorNames' """
+    if not hasattr(getColorIndex, "indices"):
+        getColorIndex.indices = {}
+    key = (colorNames, transWeight)
+    index = getColorIndex.indices.get(key)
+    if index is None:
+        colors = getColors()
+        index = ColorIndex({name: colors[name] for name in colorNames}, transWeight)
+        getColorIndex.indices[key] = index
+    return index
+
+
+def clearColorIndices():
+    """ free cached 'ColorIndex' objects and their memoized lookups """
+    getColorIndex.indices = {}
+
+
+class ColorIndex:
+    """ nearest color lookup over a palette using the weighted 'distance' metric (results memoized for the most recently used RGBA values) """
+    maxMemoSize = 2 ** 16
+
+    def __init__(self, colors:dict, transWeight:float=1):
+        self.names = list(colors.keys())
+        self.colors = np.array(list(colors.values()), dtype=np.float64).reshape(-1, 4)
+        self.weights = np.array((0.30, 0.59, 0.11, transWeight))
+        self.memo = OrderedDict()
+
+    def nearest(self, rgba):
+        """ returns name of palette color nearest to 'rgba' ("" if palette is empty) """
+        key = tuple(rgba)
+        name = self.memo.get(key)
+        if name is not None:
+            self.memo.move_to_end(key)
+            return name
+        if len(self.names) == 0:
+            return ""
+        diffs = ((self.colors - key) ** 2) @ self.weights
+        name = self.names[int(np.argmin(diffs))]
+        self.memo[key] = name
+        if len(self.memo) > ColorIndex.maxMemoSize:
+            self.memo.popitem(last=False)
+        return name
+
+
+class ColorSnapGrid:
+    """ hashed grid of RGBA values for finding the first stored value within 'snapAmount' (weighted 'distance') """
+
+    def __init__(self, snapAmount:float):
+        self.snapAmount = snapAmount
+        # scale coordinates so weighted distance becomes euclidean distance with cell size of snap radius
+        self.scale = np.sqrt((0.30, 0.59, 0.11, 1)) / math.sqrt(snapAmount)
+        self.cells = {}
+        self.values = []
+        self.stored = set()
+        self.memo = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def _getCell(self, rgba):
+        return tuple(np.floor(np.multiply(rgba, self.scale)).astype(int).tolist())
+
+    def add(self, rgba):
+        """ store 'rgba' value """
+        rgba = tuple(rgba)
+        # duplicates can't take precedence over the first stored value
+        if rgba in self.stored:
+            return
+        self.stored.add(rgba)
+        self.cells.setdefault(self._getCell(rgba), []).append(len(self.values))
+        self.values.append(rgba)
+
+    def find(self, rgba):
+        """ returns first stored value within snap amount of 'rgba' (None if not found) """
+        rgba = tuple(rgba)
+        match = self.memo.get(rgba)
+        if match is not None:
+            return match
+        cell = self._getCell(rgba)
+        firstIdx = None
+        for offset in itertools.product((-1, 0, 1), repeat=4):
+            for idx in self.cells.get(tuple(c + o for c, o in zip(cell, offset)), ()):
+                if (firstIdx is None or idx < firstIdx) and distance(rgba, self.values[idx]) < self.snapAmount:
+                    firstIdx = idx
+                    break
+        if firstIdx is None:
+            return None
+        # later values can't take precedence over this match
+        match = self.values[firstIdx]
+        self.memo[rgba] = match
+        return match
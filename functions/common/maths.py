@@ -16,7 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
-# NONE!
+import math
 
 # Blender imports
 from mathutils import Matrix, Vector
@@ -56,6 +56,17 @@ def vec_remainder(v1:Vector, v2:Vector):
     return Vector(e1 % e2 for e1, e2 in zip(v1, v2))
 
 
+def VectorRound(vec, dec, roundType="ROUND"):
+    """ round all vals in Vector 'vec' to 'dec' precision """
+    if roundType == "ROUND":
+        lst = [round(vec[i], dec) for i in range(len(vec))]
+    elif roundType == "FLOOR":
+        lst = [(math.floor(vec[i] * 10**dec)) / 10**dec for i in range(len(vec))]
+    elif roundType in ("CEILING", "CEIL"):
+        lst = [(math.ceil(vec[i] * 10**dec)) / 10**dec for i in range(len(vec))]
+    return Vector(lst)
+
+
 def vec_abs(v1:Vector):
     """ componentwise absolute value for vectors """
     return Vector(abs(e1) for e1 in v1)
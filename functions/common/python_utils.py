@@ -135,9 +135,18 @@ def str_to_bool(s:str):
 #################### OTHER ####################
 
 
+def json_default(object):
+    """ json serializer for objects with 'toDict' method (e.g. columnar bricksDicts) """
+    if hasattr(object, "toDict"):
+        return object.toDict()
+    raise TypeError("Object of type '%(t)s' is not JSON serializable" % {"t":type(object).__name__})
+
+
 def deepcopy(object):
     """ efficient way to deepcopy json loadable object """
-    jsonObj = json.dumps(object)
+    if hasattr(object, "toDict") and hasattr(object, "copy"):
+        return object.copy()
+    jsonObj = json.dumps(object, default=json_default)
     newObj = json.loads(jsonObj)
     return newObj
 
@@ -0,0 +1,138 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+# NONE!
+
+# Blender imports
+import bpy
+
+# Addon imports
+from .common import *
+from .general import *
+from ..lib.caches import bricker_anim_frame_cache
+
+
+def getAnimFrameIndex(cm):
+    """ returns index of brick object names for each frame of animation and the frame currently shown (cached per model) """
+    frameRange = (cm.lastStartFrame, cm.lastStopFrame)
+    frameIndex = bricker_anim_frame_cache.get(cm.id)
+    if frameIndex is None or frameIndex["range"] != frameRange:
+        n = getSourceName(cm)
+        frames = {}
+        for cf in range(cm.lastStartFrame, cm.lastStopFrame + 1):
+            curBricks = bpy.data.groups.get("Bricker_%(n)s_bricks_f_%(cf)s" % locals())
+            if curBricks is not None:
+                frames[cf] = [brick.name for brick in curBricks.objects]
+        frameIndex = {"range": frameRange, "frames": frames, "shown": None}
+        bricker_anim_frame_cache[cm.id] = frameIndex
+    return frameIndex
+
+
+def resetAnimFrameIndex(cm=None):
+    """ clear index of brick objects for each animation frame (for all models if 'cm' is None) """
+    if cm is None:
+        bricker_anim_frame_cache.clear()
+    else:
+        bricker_anim_frame_cache.pop(cm.id, None)
+
+
+def getFrameBricks(frameIndex, frame):
+    """ returns brick objects of frame in 'frameIndex' (None if any of them no longer exist) """
+    bricks = [bpy.data.objects.get(name) for name in frameIndex["frames"].get(frame, [])]
+    return None if None in bricks else bricks
+
+
+def showAnimFrame(scn, cm):
+    """ show brick objects of current frame and hide brick objects of the frame shown before """
+    frameIndex = getAnimFrameIndex(cm)
+    curFrame = getAnimAdjustedFrame(scn.frame_current, cm.lastStartFrame, cm.lastStopFrame)
+    lastFrame = frameIndex["shown"]
+    if lastFrame == curFrame:
+        return
+    # hide bricks of all other frames if frame shown before is unknown
+    hideFrames = [lastFrame] if lastFrame is not None else [cf for cf in frameIndex["frames"] if cf != curFrame]
+    n = getSourceName(cm)
+    activeObj = bpy.context.active_object
+    selectCurBricks = activeObj is not None and activeObj.name.startswith("Bricker_%(n)s_bricks" % locals())
+    for cf in hideFrames + [curFrame]:
+        bricks = getFrameBricks(frameIndex, cf)
+        if bricks is None:
+            # bricks were removed or replaced; rebuild index and update all frames
+            resetAnimFrameIndex(cm)
+            showAnimFrame(scn, cm)
+            return
+        onCurF = cf == curFrame
+        for brick in bricks:
+            # hide bricks from view and render unless on current frame
+            if brick.hide == onCurF:
+                brick.hide = not onCurF
+                brick.hide_render = not onCurF
+            if selectCurBricks and onCurF:
+                select(brick, active=True)
+            # prevent bricks from being selected on frame change
+            elif brick.select:
+                brick.select = False
+    frameIndex["shown"] = curFrame
+
+
+def clearFrameVisibilityKeyframes(obj):
+    """ remove keyframes of 'hide' and 'hide_render' from object (gives object its own action if shared) """
+    if obj.animation_data is None or obj.animation_data.action is None:
+        return
+    action = obj.animation_data.action
+    # linked duplicates of bricks from identical frames share the action of the original bricks
+    if action.users > 1:
+        action = action.copy()
+        obj.animation_data.action = action
+    fcurves = action.fcurves
+    for fcurve in [fc for fc in fcurves if fc.data_path in ("hide", "hide_render")]:
+        fcurves.remove(fcurve)
+
+
+def keyframeFrameVisibility(obj, frame, startFrame, stopFrame):
+    """ keyframe 'hide' and 'hide_render' of object so it is only shown on 'frame' (and before/after animation for first/last frame) """
+    clearFrameVisibilityKeyframes(obj)
+    keys = [(frame, False)]
+    if frame > startFrame:
+        keys.append((frame - 1, True))
+    if frame < stopFrame:
+        keys.append((frame + 1, True))
+    for f, hide in keys:
+        obj.hide = hide
+        obj.hide_render = hide
+        obj.keyframe_insert(data_path="hide", frame=f)
+        obj.keyframe_insert(data_path="hide_render", frame=f)
+
+
+def updateFrameVisibilityKeyframes(cm):
+    """ add or remove visibility keyframes of animation brick objects depending on 'cm.frameVisibility' """
+    resetAnimFrameIndex(cm)
+    if not cm.animated:
+        return
+    scn = bpy.context.scene
+    frameIndex = getAnimFrameIndex(cm)
+    curFrame = getAnimAdjustedFrame(scn.frame_current, cm.lastStartFrame, cm.lastStopFrame)
+    for cf in frameIndex["frames"]:
+        for brick in getFrameBricks(frameIndex, cf) or []:
+            if cm.frameVisibility == "KEYFRAMES":
+                keyframeFrameVisibility(brick, cf, cm.lastStartFrame, cm.lastStopFrame)
+            else:
+                clearFrameVisibilityKeyframes(brick)
+            brick.hide = cf != curFrame
+            brick.hide_render = cf != curFrame
+    frameIndex["shown"] = curFrame
@@ -335,7 +335,7 @@ def getFlipRot(dir):
 
 
 def legalBrickSize(size, type):
-     return size[:2] in bpy.props.Bricker_legal_brick_sizes[size[2]][type]
+     return (type, size[0], size[1], size[2]) in bpy.props.Bricker_legal_brick_lookup
 
 
 def getExportPath(fn, ext, basePath, frame=-1, subfolder=False):
@@ -18,6 +18,7 @@
 # System imports
 import bmesh
 import math
+import numpy as np
 
 # Blender imports
 import bpy
@@ -27,6 +28,92 @@ from mathutils import Vector
 from .common import *
 
 
+class LatticeCoords:
+    """ compact coordinate matrix for lattice of evenly spaced verts
+
+    Coordinates are computed on demand from the lattice offset, spacing and resolution;
+    indexing with 'coordMatrix[x][y][z]' returns the same Vector as the old nested list
+
+    """
+
+    def __init__(self, vertDist:Vector, offset:Vector, h_res:Vector, shape:tuple):
+        self.vertDist = Vector(vertDist)
+        self.offset = Vector(offset)
+        self.h_res = Vector(h_res)
+        self.shape = tuple(shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, x):
+        return LatticeCoordsView(self, (_checkIndex(x, self.shape[0]),))
+
+    @property
+    def origin(self):
+        """ coordinate of lattice vert at index (0, 0, 0) """
+        return self.co(0, 0, 0)
+
+    def co(self, x:int, y:int, z:int):
+        """ return coordinate of lattice vert at index (x, y, z) """
+        return vec_mult(Vector((x, y, z)) - self.h_res, self.vertDist) + self.offset
+
+    def axisCoords(self, axis:int):
+        """ return numpy array of lattice vert coordinates along 'axis' (0: x, 1: y, 2: z) """
+        return ((np.arange(self.shape[axis], dtype=np.float32) - self.h_res[axis]) * self.vertDist[axis] + self.offset[axis]).astype(np.float32)
+
+    def regionSlices(self, regionMin:Vector, regionMax:Vector, pad:int=0):
+        """ return slices of lattice locations within bounding box 'regionMin'-'regionMax' (padded by 'pad' locations) """
+        slices = []
+        for i in range(3):
+            lo = (regionMin[i] - self.offset[i]) / self.vertDist[i] + self.h_res[i]
+            hi = (regionMax[i] - self.offset[i]) / self.vertDist[i] + self.h_res[i]
+            start = min(max(math.floor(lo) - pad, 0), self.shape[i])
+            stop = min(max(math.ceil(hi) + 1 + pad, start), self.shape[i])
+            slices.append(slice(start, stop))
+        return tuple(slices)
+
+    def subLattice(self, slices:tuple):
+        """ return LatticeCoords for lattice locations in 'slices' (index (0, 0, 0) at start of slices) """
+        start = Vector([s.start for s in slices])
+        shape = tuple(s.stop - s.start for s in slices)
+        return LatticeCoords(self.vertDist, self.offset, self.h_res - start, shape)
+
+    def toArray(self):
+        """ return (nx, ny, nz, 3) numpy array of all lattice vert coordinates """
+        nx, ny, nz = self.shape
+        coords = np.empty((nx, ny, nz, 3), dtype=np.float32)
+        coords[..., 0] = self.axisCoords(0)[:, None, None]
+        coords[..., 1] = self.axisCoords(1)[None, :, None]
+        coords[..., 2] = self.axisCoords(2)[None, None, :]
+        return coords
+
+
+class LatticeCoordsView:
+    """ lazy view into row/column of LatticeCoords """
+
+    def __init__(self, lattice:LatticeCoords, idxs:tuple):
+        self.lattice = lattice
+        self.idxs = idxs
+
+    def __len__(self):
+        return self.lattice.shape[len(self.idxs)]
+
+    def __getitem__(self, i):
+        i = _checkIndex(i, len(self))
+        if len(self.idxs) == 2:
+            return self.lattice.co(*self.idxs, i)
+        return LatticeCoordsView(self.lattice, self.idxs + (i,))
+
+
+def _checkIndex(i:int, length:int):
+    """ normalize negative index and raise IndexError if out of range (matches list behavior) """
+    if i < 0:
+        i += length
+    if i < 0 or i >= length:
+        raise IndexError("lattice index out of range")
+    return i
+
+
 def generateLattice(vertDist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0)), visualize:bool=False):
     """ return lattice coordinate matrix surrounding object of size 'scale'
 
@@ -47,20 +134,19 @@ def generateLattice(vertDist:Vector, scale:Vector, offset:Vector=Vector((0, 0, 0
     # round up lattice res
     res = Vector(round_up(round(val), 2) for val in res)
     h_res = res / 2
-    # populate coord matrix
+    # create coord matrix (coordinates are computed lazily from offset and spacing)
     nx, ny, nz = int(res.x) + 2, int(res.y) + 2, int(res.z) + 2
-    create_coord = lambda v: vec_mult(v - h_res, vertDist) + offset
-    coordMatrix = [[[create_coord(Vector((x, y, z))) for z in range(nz)] for y in range(ny)] for x in range(nx)]
+    coordMatrix = LatticeCoords(vertDist, offset, h_res, (nx, ny, nz))
 
     if visualize:
         # create bmesh
         bme = bmesh.new()
-        vertMatrix = np.zeros((len(coordMatrix), len(coordMatrix[0]), len(coordMatrix[0][0]))).tolist()
+        vertMatrix = np.zeros((nx, ny, nz)).tolist()
         # add vertex for each coordinate
-        for x in range(len(coordMatrix)):
-            for y in range(len(coordMatrix[0])):
-                for z in range(len(coordMatrix[0][0])):
-                    vertMatrix[x][y][z] = bme.verts.new(coordMatrix[x][y][z])
+        for x in range(nx):
+            for y in range(ny):
+                for z in range(nz):
+                    vertMatrix[x][y][z] = bme.verts.new(coordMatrix.co(x, y, z))
                     # create new edges from vert
                     if x != 0: bme.edges.new((vertMatrix[x][y][z], vertMatrix[x-1][y][z]))
                     if y != 0: bme.edges.new((vertMatrix[x][y][z], vertMatrix[x][y-1][z]))
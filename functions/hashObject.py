@@ -17,6 +17,8 @@
 
 # System imports
 import bmesh
+import hashlib
+import numpy as np
 
 # Blender imports
 import bpy
@@ -32,16 +34,43 @@ def hash_object(obj:bpy.types.Object):
     # get object data to act as a hash
     me = obj.data
     counts = (len(me.vertices), len(me.edges), len(me.polygons), len(obj.modifiers))
+    cos = getVertCoords(me)
     if me.vertices:
-        bbox = (tuple(min(v.co for v in me.vertices)), tuple(max(v.co for v in me.vertices)))
+        bbox = (tuple(cos.min(axis=0).tolist()), tuple(cos.max(axis=0).tolist()))
     else:
         bbox = (None, None)
-    vsum   = tuple(sum((v.co for v in me.vertices), Vector((0, 0, 0))))
+    vsum   = tuple(cos.sum(axis=0, dtype=np.float64).tolist())
     xform  = tuple(e for l in obj.matrix_world for e in l)
     hashed = (counts, bbox, vsum, xform, hash(obj))  # ob.name???
     return hashed
 
 
+def hash_mesh(me:bpy.types.Mesh):
+    """ returns digest of mesh geometry, faces, materials and uvs (equal for meshes with identical content) """
+    if me is None:
+        return None
+    loopVerts = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get("vertex_index", loopVerts)
+    polyData = np.empty((3, len(me.polygons)), dtype=np.int32)
+    for i, attr in enumerate(("loop_start", "loop_total", "material_index")):
+        me.polygons.foreach_get(attr, polyData[i])
+    hasher = hashlib.sha1()
+    for arr in (getVertCoords(me), loopVerts, polyData):
+        hasher.update(arr.tobytes())
+    if me.uv_layers.active is not None:
+        uvs = np.empty(len(me.loops) * 2, dtype=np.float32)
+        me.uv_layers.active.data.foreach_get("uv", uvs)
+        hasher.update(uvs.tobytes())
+    return hasher.hexdigest()
+
+
+def getVertCoords(me:bpy.types.Mesh):
+    """ returns (N x 3) numpy array of mesh vertex coordinates """
+    cos = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", cos)
+    return cos.reshape(-1, 3)
+
+
 # from CG Cookie's retopoflow plugin
 def hash_bmesh(bme:bmesh.types.BMesh):
     if bme is None:
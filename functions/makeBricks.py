@@ -42,7 +42,13 @@ from .mat_utils import *
 
 
 @timed_call('Time Elapsed')
-def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, action, cm=None, split=False, brickScale=None, customData=None, group_name=None, clearExistingGroup=True, frameNum=None, cursorStatus=False, keys="ALL", printStatus=True, tempBrick=False, redraw=False):
+def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, action, cm=None, split=False, brickScale=None, customData=None, group_name=None, clearExistingGroup=True, frameNum=None, cursorStatus=False, keys="ALL", printStatus=True, tempBrick=False, redraw=False, mergeVertical=None, allMeshes=None, mats=None):
+    """ merge and draw bricks for 'keys' of bricksDict
+
+    For models that are not split, 'allMeshes' (MeshAssembler) and 'mats' may hold bricks already drawn
+    outside of 'keys' (e.g. unchanged bricks of previous animation frame) to include in the combined mesh
+
+    """
     # set up variables
     scn, cm, n = getActiveContextInfo(cm=cm)
 
@@ -53,15 +59,16 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
     # initialize cm.zStep
     cm.zStep = getZStep(cm)
 
-    mergeVertical = keys != "ALL" or cm.brickType == "BRICKS AND PLATES"
+    if mergeVertical is None:
+        mergeVertical = keys != "ALL" or cm.brickType == "BRICKS AND PLATES"
 
     # get bricksDict keys in sorted order
     if keys == "ALL":
         keys = list(bricksDict.keys())
-    if len(keys) == 0:
+    if len(keys) == 0 and allMeshes is None:
         return False, None
     # get dictionary of keys based on z value
-    keysDict = getKeysDict(bricksDict, keys)
+    keysDict = getKeysDict(bricksDict, keys) if len(keys) > 0 else {}
     denom = sum([len(keysDict[z0]) for z0 in keysDict.keys()])
     # store first key to active keys
     if cm.activeKey[0] == -1 and len(keys) > 0:
@@ -116,16 +123,16 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
     # initialize other variables
     brick_mats = getBrickMats(cm.materialType, cm.id)
     brickSizeStrings = {}
-    mats = []
-    allMeshes = bmesh.new()
+    mats = [] if mats is None else mats
+    allMeshes = MeshAssembler() if allMeshes is None else allMeshes
     lowestZ = -1
-    availableKeys = []
+    availableKeys = set()
     bricksCreated = []
     maxBrickHeight = 1 if cm.zStep == 3 else max(legalBricks.keys())
     connectThresh = cm.connectThresh if mergableBrickType(brickType) and mergeType == "RANDOM" else 1
     # set up internal material for this object
     internalMat = None if len(source.data.materials) == 0 else cm.internalMat or bpy.data.materials.get("Bricker_%(n)s_internal" % locals()) or bpy.data.materials.new("Bricker_%(n)s_internal" % locals())
-    if internalMat is not None and cm.materialType == "SOURCE" and cm.matShellDepth < cm.shellThickness:
+    if internalMat is not None and cm.materialType == "SOURCE" and cm.matShellDepth < cm.shellThickness and internalMat not in mats:
         mats.append(internalMat)
     # set number of times to run through all keys
     numIters = 2 if brickType == "BRICKS AND PLATES" else 1
@@ -135,11 +142,12 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
         size = [1, 1, cm.zStep]
         if len(keys) > 0:
             updateBrickSizesAndTypesUsed(cm, listToStr(size), bricksDict[keys[0]]["type"])
-        availableKeys = keys
+        availableKeys = set(keys)
         for key in keys:
             bricksDict[key]["parent"] = "self"
             bricksDict[key]["size"] = size.copy()
-            setAllBrickExposures(bricksDict, cm.zStep, key)
+        setBrickExposures(bricksDict, keys)
+        for key in keys:
             setFlippedAndRotated(bricksDict, key, [key])
             if bricksDict[key]["type"] == "SLOPE" and brickType == "SLOPES":
                 setBrickTypeForSlope(bricksDict, key, [key])
@@ -158,16 +166,13 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
                     if skipThisRow(timeThrough, lowestZ, z, offsetBrickLayers):
                         continue
                 # get availableKeys for attemptMerge
-                availableKeysBase = []
+                availableKeysBase = set()
                 for ii in range(maxBrickHeight):
                     if ii + z in keysDict:
-                        availableKeysBase += keysDict[z + ii]
-                # get small duplicate of bricksDict for variations
+                        availableKeysBase.update(keysDict[z + ii])
+                # get copy-on-write views of bricksDict for variations (only changed fields are stored)
                 if connectThresh > 1:
-                    bricksDictsBase = {}
-                    for k4 in availableKeysBase:
-                        bricksDictsBase[k4] = bricksDict[k4]
-                    bricksDicts = [deepcopy(bricksDictsBase) for j in range(connectThresh)]
+                    bricksDicts = [BricksDictOverlay(bricksDict, availableKeysBase) for j in range(connectThresh)]
                     numAlignedEdges = [0 for idx in range(connectThresh)]
                 else:
                     bricksDicts = [bricksDict]
@@ -185,7 +190,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
                         # skip keys that are already drawn or have attempted merge
                         if brickD["attempted_merge"] or brickD["parent"] not in (None, "self"):
                             # remove ignored key if it exists in availableKeys (for attemptMerge)
-                            remove_item(availableKeys, key)
+                            availableKeys.discard(key)
                             continue
 
                         # initialize loc
@@ -217,8 +222,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
                 # choose optimal variation from above for current z level
                 if connectThresh > 1:
                     optimalTest = numAlignedEdges.index(min(numAlignedEdges))
-                    for k3 in bricksDicts[optimalTest]:
-                        bricksDict[k3] = bricksDicts[optimalTest][k3]
+                    bricksDicts[optimalTest].commit()
 
         # update cm.brickSizesUsed and cm.brickTypesUsed
         for key in keys:
@@ -233,6 +237,16 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
         # end 'Merging' progress bar
         updateProgressBars(printStatus, cursorStatus, 1, 0, "Merging", end=True)
 
+    # share brick meshes between split bricks of the same shape if instancing
+    instanceSettings = None
+    if split and cm.instanceBricks:
+        bevel = (cm.bevelWidth * cm.brickHeight, cm.bevelSegments, cm.bevelProfile) if cm.bevelAdded else None
+        instanceSettings = {"bevel":bevel, "meshes":{}}
+
+    # update exposure of all brick locs at once (else set in drawBrick where not yet computed)
+    if buildIsDirty:
+        setBrickExposures(bricksDict, keys)
+
     # begin 'Building' progress bar
     old_percent = updateProgressBars(printStatus, cursorStatus, 0, -1, "Building")
 
@@ -244,7 +258,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
                 continue
             loc = getDictLoc(bricksDict, k2)
             # create brick based on the current brick info
-            drawBrick(cm_id, bricksDict, k2, loc, i, parent, dimensions, cm.zStep, bricksDict[k2]["size"], brickType, split, lastSplitModel, cm.customObject1, cm.customObject2, cm.customObject3, cm.materialIsDirty or cm.matrixIsDirty or cm.buildIsDirty, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, brickHeight, logoResolution, logoDecimate, loopCut, buildIsDirty, materialType, customMat, randomMatSeed, studDetail, exposedUndersideDetail, hiddenUndersideDetail, randomRot, randomLoc, logoType, logoScale, logoInset, circleVerts, randS1, randS2, randS3)
+            drawBrick(cm_id, bricksDict, k2, loc, i, parent, dimensions, cm.zStep, bricksDict[k2]["size"], brickType, split, lastSplitModel, cm.customObject1, cm.customObject2, cm.customObject3, cm.materialIsDirty or cm.matrixIsDirty or cm.buildIsDirty, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, brickHeight, logoResolution, logoDecimate, loopCut, buildIsDirty, materialType, customMat, randomMatSeed, studDetail, exposedUndersideDetail, hiddenUndersideDetail, randomRot, randomLoc, logoType, logoScale, logoInset, circleVerts, randS1, randS2, randS3, instanceSettings=instanceSettings)
             # print status to terminal and cursor
             old_percent = updateProgressBars(printStatus, cursorStatus, i/len(bricksDict.keys()), old_percent, "Building")
             i += 1
@@ -272,9 +286,10 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
             vg = brick.vertex_groups.get("%(name)s_bvl" % locals())
             if vg:
                 brick.vertex_groups.remove(vg)
-            vg = brick.vertex_groups.new("%(name)s_bvl" % locals())
-            vertList = [v.index for v in brick.data.vertices if not v.select]
-            vg.add(vertList, 1, "ADD")
+            if instanceSettings is None:
+                vg = brick.vertex_groups.new("%(name)s_bvl" % locals())
+                vertList = [v.index for v in brick.data.vertices if not v.select]
+                vg.add(vertList, 1, "ADD")
             # set up remaining brick info if brick object just created
             if clearExistingGroup or brick.name not in bGroup.objects.keys():
                 bGroup.objects.link(brick)
@@ -305,8 +320,7 @@ def makeBricks(source, parent, logo, logo_details, dimensions, bricksDict, actio
             if vg:
                 allBricksObj.vertex_groups.remove(vg)
             vg = allBricksObj.vertex_groups.new("%(name)s_bvl" % locals())
-            vertList = [v.index for v in allBricksObj.data.vertices if not v.select]
-            vg.add(vertList, 1, "ADD")
+            vg.add(allMeshes.getUnselectedVerts(), 1, "ADD")
         if materialType in ("CUSTOM", "NONE"):
             setMaterial(allBricksObj, customMat)
         elif materialType == "SOURCE" or (materialType == "RANDOM" and len(brick_mats) > 0):
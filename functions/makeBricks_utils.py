@@ -30,7 +30,8 @@ import bpy
 from mathutils import Vector, Matrix
 
 # Addon imports
-from .hashObject import hash_object
+from .hashObject import hash_mesh
+from .mesh_assembly import *
 from ..lib.Brick import Bricks
 from ..lib.bricksDict import *
 from .common import *
@@ -38,12 +39,13 @@ from .mat_utils import *
 from .wrappers import *
 from .general import *
 from ..lib.caches import bricker_mesh_cache
+from ..lib.mesh_cache import readBrickMeshes, writeBrickMeshes
 
 
-def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSize, brickType, split, lastSplitModel, customObject1, customObject2, customObject3, matDirty, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, brickHeight, logoResolution, logoDecimate, loopCut, buildIsDirty, materialType, customMat, randomMatSeed, studDetail, exposedUndersideDetail, hiddenUndersideDetail, randomRot, randomLoc, logoType, logoScale, logoInset, circleVerts, randS1, randS2, randS3):
+def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSize, brickType, split, lastSplitModel, customObject1, customObject2, customObject3, matDirty, customData, brickScale, bricksCreated, allMeshes, logo, logo_details, mats, brick_mats, internalMat, brickHeight, logoResolution, logoDecimate, loopCut, buildIsDirty, materialType, customMat, randomMatSeed, studDetail, exposedUndersideDetail, hiddenUndersideDetail, randomRot, randomLoc, logoType, logoScale, logoInset, circleVerts, randS1, randS2, randS3, instanceSettings=None):
     brickD = bricksDict[key]
     # check exposure of current [merged] brick
-    if brickD["top_exposed"] is None or brickD["bot_exposed"] is None or buildIsDirty:
+    if brickD["top_exposed"] is None or brickD["bot_exposed"] is None:
         topExposed, botExposed = setAllBrickExposures(bricksDict, zStep, key)
     else:
         topExposed, botExposed = isBrickExposed(bricksDict, zStep, key)
@@ -73,6 +75,10 @@ def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSi
     if split:
         brick = bpy.data.objects.get(brickD["name"])
         edgeSplit = useEdgeSplitMod(brickD, customObject1, customObject2, customObject3)
+        if instanceSettings is not None:
+            # share mesh with edge split (and bevel) applied between all bricks of this shape
+            m = getInstanceMesh(m, edgeSplit, instanceSettings)
+            edgeSplit = False
         if brick:
             # NOTE: last brick mesh is left in memory (faster)
             # set brick.data to new mesh (resets materials)
@@ -83,6 +89,10 @@ def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSi
                 addEdgeSplitMod(brick)
             elif eMod and not edgeSplit:
                 brick.modifiers.remove(eMod)
+            # remove bevel modifier from bricks now sharing instance meshes
+            bMod = brick.modifiers.get(brick.name + "_bvl")
+            if bMod and instanceSettings is not None:
+                brick.modifiers.remove(bMod)
         else:
             # create new object with mesh data
             brick = bpy.data.objects.new(brickD["name"], m)
@@ -102,13 +112,10 @@ def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSi
         # append to bricksCreated
         bricksCreated.append(brick)
     else:
-        # duplicates mesh – prevents crashes (TODO: test without this line in 2.8)
-        m = m.copy()
-        # apply rotation matrices to edit mesh
+        # get transformation of brick mesh to coordinate on matrix (after random rotation)
+        matrix = Matrix.Translation(brickLoc)
         if randomRotMatrix is not None:
-            m.transform(randomRotMatrix)
-        # transform brick mesh to coordinate on matrix
-        m.transform(Matrix.Translation(brickLoc))
+            matrix = matrix * randomRotMatrix
 
         # set to internal mat if material not set
         internal = False
@@ -123,35 +130,56 @@ def drawBrick(cm_id, bricksDict, key, loc, i, parent, dimensions, zStep, brickSi
             mats.append(mat)
             matIdx = len(mats) - 1
 
-        # set material
-        if mat is not None:
-            # set material name in dictionary
-            if not internal:
-                brickD["mat_name"] = mat.name
-            # point all polygons to target material (index will correspond in allMeshes object)
-            for p in m.polygons:
-                p.material_index = matIdx
-
-        # append mesh to allMeshes bmesh object
-        allMeshes.from_mesh(m)
-
-        # remove duplicated mesh (TODO: test without this line in 2.8)
-        bpy.data.meshes.remove(m)
-        # NOTE: The following lines clean up the mesh if not duplicated
-        # # reset polygon material mapping
-        # if mat is not None:
-        #     for p in m.polygons:
-        #         p.material_index = 0
-        #
-        # # reset transformations for reference mesh
-        # m.transform(Matrix.Translation(-brickLoc))
-        # if randomRotMatrix is not None:
-        #     randomRotMatrix.invert()
-        #     m.transform(randomRotMatrix)
+        # set material name in dictionary
+        if mat is not None and not internal:
+            brickD["mat_name"] = mat.name
+
+        # add transformed brick mesh to allMeshes (all polygons point to target material index in allMeshes object)
+        allMeshes.add(m, matrix, matIdx if mat is not None else None, owner=key)
 
     return bricksDict
 
 
+def getInstanceMesh(m, edgeSplit, instanceSettings):
+    """ returns mesh shared by all instanced bricks drawn with brick mesh 'm' (built once per run of makeBricks) """
+    meshes = instanceSettings["meshes"]
+    instMesh = meshes.get((m.name, edgeSplit))
+    if instMesh is None:
+        meshName = "%(name)s_inst%(suffix)s" % {"name":m.name, "suffix":"" if edgeSplit else "_noES"}
+        instMesh = bpy.data.meshes.get(meshName) or bpy.data.meshes.new(meshName)
+        instMesh["bricker_source_mesh"] = m.name
+        instMesh["bricker_edge_split"] = edgeSplit
+        bakeInstanceMesh(instMesh, instanceSettings["bevel"], srcMesh=m)
+        meshes[(m.name, edgeSplit)] = instMesh
+    return instMesh
+
+
+def isInstancedBrick(obj):
+    """ check if brick object uses a mesh shared between instanced bricks """
+    return obj.type == "MESH" and "bricker_source_mesh" in obj.data.keys()
+
+
+def bakeInstanceMesh(instMesh, bevel=None, srcMesh=None):
+    """ write geometry of source brick mesh to instance mesh, applying bevel (width, segments, profile) and edge split """
+    srcMesh = srcMesh or bpy.data.meshes.get(instMesh["bricker_source_mesh"])
+    if srcMesh is None:
+        return
+    bm = bmesh.new()
+    bm.from_mesh(srcMesh)
+    if bevel:
+        width, segments, profile = bevel
+        # bevel edges outside of logo (selected verts), matching the '_bvl' vertex group of split bricks
+        edges = [e for e in bm.edges if not (e.verts[0].select or e.verts[1].select) and e.calc_face_angle(0) > 0.001]
+        verts = list({v for e in edges for v in e.verts})
+        bmesh.ops.bevel(bm, geom=edges + verts, offset=width, offset_type=1, segments=segments, profile=profile, vertex_only=False, clamp_overlap=True)
+    if instMesh["bricker_edge_split"]:
+        sharpEdges = [e for e in bm.edges if e.calc_face_angle(0) > math.radians(44)]
+        bmesh.ops.split_edges(bm, edges=sharpEdges)
+    bm.to_mesh(instMesh)
+    bm.free()
+    instMesh["bricker_bevel"] = list(bevel) if bevel else []
+
+
 def useEdgeSplitMod(brickD, customObject1, customObject2, customObject3):
     typ = brickD["type"]
     if ("CUSTOM" not in brickD["type"] or
@@ -180,9 +208,8 @@ def mergeWithAdjacentBricks(brickD, bricksDict, key, keysNotChecked, defaultSize
 
 def updateKeysLists(bricksDict, size, zStep, key, loc, availableKeys):
     keysChecked = getKeysInBrick(bricksDict, size, zStep, loc=loc)
-    for k in keysChecked:
-        # remove key if it exists in availableKeys
-        remove_item(availableKeys, k)
+    # remove keys if they exist in availableKeys
+    availableKeys.difference_update(keysChecked)
 
 
 def skipThisRow(timeThrough, lowestZ, z, offsetBrickLayers):
@@ -259,7 +286,7 @@ def getBrickData(brickD, rand, dimensions, brickSize, brickType, brickHeight, lo
                                       logoResolution if logoToUse is not None else None,
                                       logoDecimate if logoToUse is not None else None,
                                       logoInset if logoToUse is not None else None,
-                                      hash_object(logoToUse) if custom_logo_used else None,
+                                      hash_mesh(logoToUse.data) if custom_logo_used else None,
                                       logoScale if custom_logo_used else None,
                                       logoType, useStud, circleVerts,
                                       brickD["type"], loopCut, dimensions["gap"],
@@ -269,6 +296,11 @@ def getBrickData(brickD, rand, dimensions, brickSize, brickType, brickHeight, lo
     # NOTE: Stable implementation for Blender 2.79
     # check for bmesh in cache
     bms = bricker_mesh_cache.get(bm_cache_string)
+    # if not found, check for bmesh in on-disk cache (shared between sessions and background processes)
+    if bms is None and brickType != "CUSTOM":
+        bms = readBrickMeshes(bm_cache_string)
+        if bms is not None:
+            bricker_mesh_cache[bm_cache_string] = bms
     # if not found create new brick mesh(es) and store to cache
     if bms is None:
         # create new brick bmeshes
@@ -276,6 +308,7 @@ def getBrickData(brickD, rand, dimensions, brickSize, brickType, brickHeight, lo
         # store newly created meshes to cache
         if brickType != "CUSTOM":
             bricker_mesh_cache[bm_cache_string] = bms
+            writeBrickMeshes(bm_cache_string, bms)
     # create edit mesh for each bmesh
     meshes = []
     for i,bm in enumerate(bms):
@@ -0,0 +1,151 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+from mathutils import Matrix
+
+# Addon imports
+# NONE!
+
+
+class MeshAssembler:
+    """ assembles many transformed copies of brick meshes into a single mesh with numpy arrays
+
+    The vertex, loop and polygon arrays of each brick mesh are read once with 'foreach_get', tiled with
+    the transformations of all bricks using it, and written to the final mesh with 'foreach_set'.
+    Copies can be tagged with an owner (e.g. bricksDict key) to remove them again with 'removeOwners'.
+
+    """
+
+    def __init__(self):
+        self.templates = {}
+        self.instances = {}
+        self.selected = None
+
+    def add(self, m, matrix:Matrix, matIdx:int=None, owner=None):
+        """ add copy of mesh 'm' transformed by 'matrix' (with all polygons set to material 'matIdx' if not None) """
+        # mesh name is part of key so templates of freed meshes are not reused for new meshes at the same address
+        key = (m.as_pointer(), m.name)
+        self.addArrays(key, self.templates.get(key) or self.getMeshArrays(m), matrix, matIdx, owner)
+
+    def addArrays(self, key, arrays:dict, matrix:Matrix, matIdx:int=None, owner=None):
+        """ add copy of mesh arrays from 'getMeshArrays' (stored as template 'key') transformed by 'matrix' """
+        if key not in self.templates:
+            self.templates[key] = arrays
+            self.instances[key] = ([], [], [])
+        matrices, matIdxs, owners = self.instances[key]
+        matrices.append(matrix)
+        matIdxs.append(-1 if matIdx is None else matIdx)
+        owners.append(owner)
+
+    def removeOwners(self, owners:set):
+        """ remove copies added with owner in 'owners' """
+        for key, (matrices, matIdxs, instOwners) in self.instances.items():
+            keep = [i for i, owner in enumerate(instOwners) if owner not in owners]
+            if len(keep) == len(instOwners):
+                continue
+            self.instances[key] = ([matrices[i] for i in keep], [matIdxs[i] for i in keep], [instOwners[i] for i in keep])
+
+    def copy(self):
+        """ returns copy of assembler sharing template arrays (copies can be added/removed independently) """
+        new = MeshAssembler()
+        new.templates = self.templates.copy()
+        new.instances = {key: tuple(list(lst) for lst in lists) for key, lists in self.instances.items()}
+        return new
+
+    @staticmethod
+    def getMeshArrays(m):
+        """ returns dictionary of vertex, loop and polygon arrays of mesh 'm' """
+        numVerts, numLoops, numPolys = len(m.vertices), len(m.loops), len(m.polygons)
+        arrays = {
+            "co": np.empty(numVerts * 3, dtype=np.float32),
+            "select": np.empty(numVerts, dtype=np.bool_),
+            "vertex_index": np.empty(numLoops, dtype=np.int32),
+            "loop_start": np.empty(numPolys, dtype=np.int32),
+            "loop_total": np.empty(numPolys, dtype=np.int32),
+            "material_index": np.empty(numPolys, dtype=np.int16),
+            "use_smooth": np.empty(numPolys, dtype=np.bool_),
+        }
+        m.vertices.foreach_get("co", arrays["co"])
+        m.vertices.foreach_get("select", arrays["select"])
+        m.loops.foreach_get("vertex_index", arrays["vertex_index"])
+        for attr in ("loop_start", "loop_total", "material_index", "use_smooth"):
+            m.polygons.foreach_get(attr, arrays[attr])
+        arrays["co"] = arrays["co"].reshape(-1, 3)
+        if len(m.uv_layers) > 0:
+            uv = np.empty(numLoops * 2, dtype=np.float32)
+            m.uv_layers.active.data.foreach_get("uv", uv)
+            arrays["uv"] = uv
+        return arrays
+
+    def to_mesh(self, m):
+        """ write assembled bricks to empty mesh 'm' """
+        co, select, loopVerts, loopStarts, loopTotals, matIdxs, smooth, uvs = [], [], [], [], [], [], [], []
+        numVerts = 0
+        numLoops = 0
+        useUVs = any("uv" in arrays for arrays in self.templates.values())
+        for key, arrays in self.templates.items():
+            matrices, instMatIdxs, _ = self.instances[key]
+            n = len(matrices)
+            if n == 0:
+                continue
+            tVerts, tLoops = len(arrays["co"]), len(arrays["vertex_index"])
+            # transform template vertices by all brick matrices at once
+            mats = np.array([[tuple(row) for row in matrix] for matrix in matrices], dtype=np.float32)
+            co.append((np.einsum("nij,vj->nvi", mats[:, :3, :3], arrays["co"]) + mats[:, None, :3, 3]).reshape(-1, 3))
+            select.append(np.tile(arrays["select"], n))
+            # offset vertex and loop indices for each copy
+            vertOffsets = numVerts + tVerts * np.arange(n, dtype=np.int32)
+            loopOffsets = numLoops + tLoops * np.arange(n, dtype=np.int32)
+            loopVerts.append((arrays["vertex_index"][None, :] + vertOffsets[:, None]).ravel())
+            loopStarts.append((arrays["loop_start"][None, :] + loopOffsets[:, None]).ravel())
+            loopTotals.append(np.tile(arrays["loop_total"], n))
+            instMatIdxs = np.array(instMatIdxs, dtype=np.int16)[:, None]
+            matIdxs.append(np.where(instMatIdxs >= 0, instMatIdxs, arrays["material_index"][None, :]).ravel())
+            smooth.append(np.tile(arrays["use_smooth"], n))
+            if useUVs:
+                uvs.append(np.tile(arrays.get("uv", np.zeros(tLoops * 2, dtype=np.float32)), n))
+            numVerts += tVerts * n
+            numLoops += tLoops * n
+        if numVerts == 0:
+            return
+        self.selected = np.concatenate(select)
+        loopTotals = np.concatenate(loopTotals)
+        # write arrays to mesh
+        m.vertices.add(numVerts)
+        m.vertices.foreach_set("co", np.concatenate(co).ravel())
+        m.vertices.foreach_set("select", self.selected)
+        m.loops.add(numLoops)
+        m.loops.foreach_set("vertex_index", np.concatenate(loopVerts))
+        m.polygons.add(len(loopTotals))
+        m.polygons.foreach_set("loop_start", np.concatenate(loopStarts))
+        m.polygons.foreach_set("loop_total", loopTotals)
+        m.polygons.foreach_set("material_index", np.concatenate(matIdxs))
+        m.polygons.foreach_set("use_smooth", np.concatenate(smooth))
+        if useUVs:
+            m.uv_textures.new()
+            m.uv_layers.active.data.foreach_set("uv", np.concatenate(uvs))
+        m.update(calc_edges=True)
+
+    def getUnselectedVerts(self):
+        """ returns indices of unselected vertices in assembled mesh (all but logo verts) """
+        if self.selected is None:
+            return []
+        return np.flatnonzero(~self.selected).tolist()
@@ -17,6 +17,7 @@
 
 # System imports
 import time
+import numpy as np
 
 # Addon imports
 from .common import *
@@ -32,12 +33,13 @@ def getSmokeInfo(smoke_obj):
             break
 
     if smoke_data is not None:
-        # get channel data
-        density_grid = tuple(smoke_data.density_grid)
-        flame_grid = tuple(smoke_data.flame_grid)
-        color_grid = tuple(smoke_data.color_grid)
         # get resolution
         domain_res = getAdjustedRes(smoke_data, tuple(smoke_data.domain_resolution))
+        # get channel data as arrays indexed by [x, y, z] (grids are stored with x changing fastest)
+        shape = tuple(domain_res[::-1])
+        density_grid = getGridArray(smoke_data.density_grid).reshape(shape).transpose(2, 1, 0)
+        flame_grid = getGridArray(smoke_data.flame_grid).reshape(shape).transpose(2, 1, 0)
+        color_grid = getGridArray(smoke_data.color_grid).reshape(shape + (4,)).transpose(2, 1, 0, 3)
         adapt = smoke_data.use_adaptive_domain
         max_res_i = smoke_data.resolution_max
         max_res = Vector(domain_res) * (max_res_i / max(domain_res))
@@ -47,6 +49,16 @@ def getSmokeInfo(smoke_obj):
         return [None]*6
 
 
+def getGridArray(grid):
+    """ returns float32 array copy of smoke domain grid """
+    arr = np.empty(len(grid), dtype=np.float32)
+    if hasattr(grid, "foreach_get"):
+        grid.foreach_get(arr)
+    else:
+        arr[:] = grid[:]
+    return arr
+
+
 def getAdjustedRes(smoke_data, smoke_res):
     if smoke_data.use_high_resolution:
         smoke_res = [int((smoke_data.amplify + 1) * i) for i in smoke_res]
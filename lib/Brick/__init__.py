@@ -28,50 +28,51 @@ from mathutils import Vector, Matrix
 # Addon imports
 from .mesh_generators import *
 from .get_brick_dimensions import *
+from ..caches import bricker_logo_cache
 from ...functions import *
+from ...functions.mesh_assembly import MeshAssembler
 
 class Bricks:
     @staticmethod
     def new_mesh(dimensions:list, brickType:str, size:list=[1,1,3], type:str="BRICK", flip:bool=False, rotate90:bool=False, loopCut:bool=False, logo=False, logoType="NONE", logoScale=1, logoInset=None, all_vars=False, logo_details=None, undersideDetail:str="FLAT", stud:bool=True, circleVerts:int=16):
         """ create unlinked Brick at origin """
         # create brick mesh
-        if type in ("BRICK", "PLATE") or "CUSTOM" in type:
-            brickBM = makeStandardBrick(dimensions, size, type, brickType, loopCut, circleVerts=circleVerts, detail=undersideDetail, stud=stud)
-        elif type in getRoundBrickTypes():
-            brickBM = makeRound1x1(dimensions, brickType, loopCut, circleVerts=circleVerts, type=type, detail=undersideDetail)
-        elif type in ("TILE", "TILE_GRILL"):
-            brickBM = makeTile(dimensions, brickType, loopCut, brickSize=size, circleVerts=circleVerts, type=type, detail=undersideDetail)
-        elif type in ("SLOPE", "SLOPE_INVERTED", "TALL_SLOPE"):
-            # determine brick direction
-            directions = ["X+", "Y+", "X-", "Y-"]
-            maxIdx = size.index(max(size[:2]))
-            maxIdx -= 2 if flip else 0
-            maxIdx += 1 if rotate90 else 0
-            # make slope brick bmesh
-            if type == "SLOPE_INVERTED":
-                brickBM = makeInvertedSlope(dimensions, size, brickType, loopCut, circleVerts=circleVerts, direction=directions[maxIdx], detail=undersideDetail, stud=stud)
-            else:
-                brickBM = makeSlope(dimensions, size, brickType, loopCut, circleVerts=circleVerts, direction=directions[maxIdx], detail=undersideDetail, stud=stud)
-        else:
-            raise ValueError("'new_mesh' function received unrecognized value for parameter 'type': '" + str(type) + "'")
+        brickBM = Bricks.generate_mesh(dimensions, brickType, size=size, type=type, flip=flip, rotate90=rotate90, loopCut=loopCut, undersideDetail=undersideDetail, stud=stud, circleVerts=circleVerts)
 
         # create list of brick bmesh variations
         if logo and stud and (type in ("BRICK", "PLATE", "STUD", "SLOPE_INVERTED") or type == "SLOPE" and max(size[:2]) != 1):
-            bms = makeLogoVariations(dimensions, size, brickType, directions[maxIdx] if type.startswith("SLOPE") else "", all_vars, logo, logo_details, logoInset, logoType, logoScale)
+            bms = makeLogoVariations(dimensions, size, brickType, getSlopeDirection(size, flip, rotate90) if type.startswith("SLOPE") else "", all_vars, logo, logo_details, logoInset, logoType, logoScale)
+            # add brick mesh to logo variations
+            brickMesh = bpy.data.meshes.new("Bricker_brick_tmp")
+            brickBM.to_mesh(brickMesh)
+            for bm in bms:
+                bm.from_mesh(brickMesh)
+            bpy.data.meshes.remove(brickMesh)
         else:
-            bms = [bmesh.new()]
-
-        # add brick mesh to bm mesh
-        junkMesh = bpy.data.meshes.get('Bricker_junkMesh')
-        if junkMesh is None:
-            junkMesh = bpy.data.meshes.new('Bricker_junkMesh')
-        brickBM.to_mesh(junkMesh)
-        for bm in bms:
-            bm.from_mesh(junkMesh)
+            brickBM.verts.index_update()
+            bms = [brickBM]
 
         # return bmesh objects
         return bms
 
+    @staticmethod
+    def generate_mesh(dimensions:list, brickType:str, size:list=[1,1,3], type:str="BRICK", flip:bool=False, rotate90:bool=False, loopCut:bool=False, undersideDetail:str="FLAT", stud:bool=True, circleVerts:int=16, bme=None):
+        """ generate Brick geometry at origin into 'bme' (new bmesh by default) without touching bpy.data """
+        bme = bme or bmesh.new()
+        if type in ("BRICK", "PLATE") or "CUSTOM" in type:
+            makeStandardBrick(dimensions, size, type, brickType, loopCut, circleVerts=circleVerts, detail=undersideDetail, stud=stud, bme=bme)
+        elif type in getRoundBrickTypes():
+            makeRound1x1(dimensions, brickType, loopCut, circleVerts=circleVerts, type=type, detail=undersideDetail, bme=bme)
+        elif type in ("TILE", "TILE_GRILL"):
+            makeTile(dimensions, brickType, loopCut, brickSize=size, circleVerts=circleVerts, type=type, detail=undersideDetail, bme=bme)
+        elif type == "SLOPE_INVERTED":
+            makeInvertedSlope(dimensions, size, brickType, loopCut, circleVerts=circleVerts, direction=getSlopeDirection(size, flip, rotate90), detail=undersideDetail, stud=stud, bme=bme)
+        elif type in ("SLOPE", "TALL_SLOPE"):
+            makeSlope(dimensions, size, brickType, loopCut, circleVerts=circleVerts, direction=getSlopeDirection(size, flip, rotate90), detail=undersideDetail, stud=stud, bme=bme)
+        else:
+            raise ValueError("'generate_mesh' function received unrecognized value for parameter 'type': '" + str(type) + "'")
+        return bme
+
     @staticmethod
     def splitAll(bricksDict, zStep, keys=None):
         keys = keys or list(bricksDict.keys())
@@ -121,6 +122,15 @@ class Bricks:
         return get_brick_dimensions(height, zScale, gap_percentage)
 
 
+def getSlopeDirection(size, flip, rotate90):
+    """ returns direction of slope brick based on its size """
+    directions = ["X+", "Y+", "X-", "Y-"]
+    maxIdx = size.index(max(size[:2]))
+    maxIdx -= 2 if flip else 0
+    maxIdx += 1 if rotate90 else 0
+    return directions[maxIdx]
+
+
 def getNumRots(direction, size):
     return 1 if direction != "" else (4 if size[0] == 1 and size[1] == 1 else 2)
 
@@ -134,6 +144,17 @@ def getRotAdd(direction, size):
     return rot_add
 
 
+def getLogoArrays(logo):
+    """ returns mesh arrays of logo object (cached per logo hash) """
+    logoHash = hash_object(logo)
+    cached = bricker_logo_cache.get(logo.name)
+    if cached is not None and cached[0] == logoHash:
+        return cached[1]
+    logoArrays = MeshAssembler.getMeshArrays(logo.data)
+    bricker_logo_cache[logo.name] = (logoHash, logoArrays)
+    return logoArrays
+
+
 def makeLogoVariations(dimensions, size, brickType, direction, all_vars, logo, logo_details, logoInset, logoType, logoScale):
     # get logo rotation angle based on size of brick
     rot_vars = getNumRots(direction, size)
@@ -146,11 +167,9 @@ def makeLogoVariations(dimensions, size, brickType, direction, all_vars, logo, l
         randomSeed = int(time.time()*10**6) % 10000
         randS0 = np.random.RandomState(randomSeed)
         zRots = [randS0.randint(0,rot_vars) * rot_mult + rot_add]
-    # get duplicate of logo mesh
-    m = logo.data.copy()
+    # get logo mesh arrays (read once per logo hash)
+    logoArrays = getLogoArrays(logo)
 
-    # create new bmeshes for each logo variation
-    bms = [bmesh.new() for zRot in zRots]
     # get loc offsets
     zOffset = dimensions["logo_offset"] + (dimensions["height"] if flatBrickType(brickType) and size[2] == 3 else 0)
     lw = dimensions["logo_width"] * (0.78 if logoType == "LEGO" else logoScale)
@@ -162,23 +181,24 @@ def makeLogoVariations(dimensions, size, brickType, direction, all_vars, logo, l
     yR0 = size[1] - 1 if direction == "Y-" else 0
     xR1 = 1 if direction == "X+" else size[0]
     yR1 = 1 if direction == "Y+" else size[1]
-    # add logos on top of each stud
+    # get translation of logo on top of each stud (gap adjusted based on distance from first stud)
+    gap_base = dimensions["gap"] * Vector(((xR1 - xR0 - 1) / 2, (yR1 - yR0 - 1) / 2))
+    studMatrices = []
+    for x in range(xR0, xR1):
+        for y in range(yR0, yR1):
+            gap = gap_base + dimensions["gap"] * Vector((x / xR1, y / yR1))
+            studMatrices.append(Matrix.Translation((x * xyOffset - gap.x, y * xyOffset - gap.y, zOffset)))
+    # create new bmeshes for each logo variation
+    bms = [bmesh.new() for zRot in zRots]
     for i,zRot in enumerate(zRots):
-        m0 = m.copy()
         # rotate logo around stud
-        if zRot != 0: m0.transform(Matrix.Rotation(math.radians(zRot), 4, 'Z'))
-        # create logo for each stud and append to bm
-        gap_base = dimensions["gap"] * Vector(((xR1 - xR0 - 1) / 2, (yR1 - yR0 - 1) / 2))
-        for x in range(xR0, xR1):
-            for y in range(yR0, yR1):
-                # create duplicate of rotated logo
-                m1 = m0.copy()
-                # adjust gap based on distance from first stud
-                gap = gap_base + dimensions["gap"] * Vector((x / xR1, y / yR1))
-                # translate logo into place
-                m1.transform(Matrix.Translation((x * xyOffset - gap.x, y * xyOffset - gap.y, zOffset)))
-                # add transformed mesh to bm mesh
-                bms[i].from_mesh(m1)
-                bpy.data.meshes.remove(m1)
-        bpy.data.meshes.remove(m0)
+        rotMatrix = Matrix.Rotation(math.radians(zRot), 4, 'Z')
+        # tile rotated logo to all studs with 'foreach_set' and read it into bmesh
+        allLogos = MeshAssembler()
+        for mat in studMatrices:
+            allLogos.addArrays(logo.name, logoArrays, mat * rotMatrix)
+        m = bpy.data.meshes.new("Bricker_logo_variation")
+        allLogos.to_mesh(m)
+        bms[i].from_mesh(m)
+        bpy.data.meshes.remove(m)
     return bms
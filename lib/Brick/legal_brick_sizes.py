@@ -161,6 +161,17 @@ def getLegalBrickSizes():
     return legalBrickSizes
 
 
+def getLegalBrickSizeLookup(legalBrickSizes=None):
+    """ returns set of (type, width, depth, height) tuples for constant time legal brick size checks """
+    legalBrickSizes = legalBrickSizes or getLegalBrickSizes()
+    lookup = set()
+    for heightKey,types in legalBrickSizes.items():
+        for typ,sizes in types.items():
+            for s in sizes:
+                lookup.add((typ, s[0], s[1], heightKey))
+    return lookup
+
+
 def getLegalBricks():
     """ returns a list of legal brick sizes and part numbers """
     return legalBricks
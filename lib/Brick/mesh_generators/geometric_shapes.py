@@ -22,6 +22,22 @@ from mathutils import Vector
 from ....functions import *
 
 
+# cached (cos, sin) values for circles with N verts
+circleTemplates = {}
+
+
+def getCircleTemplate(N:int):
+    """ returns list of (cos, sin) values around circumference of circle with N verts (computed once per N) """
+    template = circleTemplates.get(N)
+    if template is None:
+        template = []
+        for i in range(N):
+            circ_val = ((2 * math.pi) / N) * i
+            template.append((math.cos(circ_val), math.sin(circ_val)))
+        circleTemplates[N] = template
+    return template
+
+
 def makeSquare(coord1:Vector, coord2:Vector, face:bool=True, flipNormal:bool=False, bme:bmesh=None):
     """
     create a square with bmesh
@@ -132,10 +148,9 @@ def makeCircle(r:float, N:int, co:Vector=Vector((0,0,0)), face:bool=True, flipNo
     verts = []
 
     # create verts around circumference of circle
-    for i in range(N):
-        circ_val = ((2 * math.pi) / N) * i
-        x = r * math.cos(circ_val)
-        y = r * math.sin(circ_val)
+    for cos, sin in getCircleTemplate(N):
+        x = r * cos
+        y = r * sin
         coord = co + Vector((x, y, 0))
         verts.append(bme.verts.new(coord))
     # create face
@@ -170,10 +185,9 @@ def makeCylinder(r:float, h:float, N:int, co:Vector=Vector((0,0,0)), botFace:boo
     sideFaces = []
 
     # create upper and lower circles
-    for i in range(N):
-        circ_val = ((2 * math.pi) / N) * i
-        x = r * math.cos(circ_val)
-        y = r * math.sin(circ_val)
+    for cos, sin in getCircleTemplate(N):
+        x = r * cos
+        y = r * sin
         z = h / 2
         coordT = co + Vector((x, y, z))
         coordB = co + Vector((x, y, -z))
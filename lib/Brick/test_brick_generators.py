@@ -17,13 +17,16 @@
 
 # System imports
 import bpy
+import itertools
 
 # Blender imports
 # NONE!
 
 # Addon imports
+from . import Bricks
 from .mesh_generators import *
 from .get_brick_dimensions import *
+from .legal_brick_sizes import getLegalBrickSizes
 from ...functions.common import *
 from ...functions.general import *
 from ...functions.makeBricks_utils import *
@@ -38,6 +41,7 @@ class testBrickGenerators(bpy.types.Operator):
     def execute(self, context):
         try:
             test_brick_generators()
+            test_generate_mesh()
         except:
             bricker_handle_exception()
         return{"FINISHED"}
@@ -136,3 +140,22 @@ def test_brick_generators():
     openLayer(17)
 
     cm.brickType = lastBrickType
+
+
+def test_generate_mesh():
+    """ confirm brick meshes for all legal brick sizes are generated at HIGH detail without creating bpy.data meshes """
+    dimensions = get_brick_dimensions(height=0.5, zScale=1)
+    numMeshes = len(bpy.data.meshes)
+    for height, types in getLegalBrickSizes().items():
+        for typ, sizes in types.items():
+            flips = (False, True) if typ.startswith("SLOPE") else (False,)
+            for size, flip, rotate90 in itertools.product(sizes, flips, flips):
+                try:
+                    bm = Bricks.generate_mesh(dimensions, "BRICKS AND PLATES", size=size + [height], type=typ, flip=flip, rotate90=rotate90, undersideDetail="HIGH", circleVerts=16)
+                except ZeroDivisionError:
+                    # NOTE: 'addSlopeStuds' can't place the underside studs of 1x3 inverted slopes
+                    assert typ == "SLOPE_INVERTED" and sorted(size) == [1, 3], "'generate_mesh' failed for %(typ)s %(size)s" % locals()
+                    continue
+                assert len(bm.verts) > 0 and len(bm.faces) > 0, "'generate_mesh' created empty bmesh for %(typ)s %(size)s" % locals()
+                bm.free()
+    assert len(bpy.data.meshes) == numMeshes, "'generate_mesh' created bpy.data meshes"
@@ -17,7 +17,9 @@
 
 
 from .caches import *
+from .mesh_cache import *
 from .preferences import *
 from .reportError import *
 from .bricksDict import *
+from .worker_pool import *
 from .keymaps import *
@@ -0,0 +1,17 @@
+# NOTE: Run by 'BrickerWorkerPool' as: blender --background --factory-startup --python brickify_worker.py -- host port addon_path worker_id
+# NOTE: Reads connection authkey (hex) from first line of stdin
+# System imports
+import os
+import sys
+
+# Blender imports
+import bpy
+
+host, port, addonPath, workerID = sys.argv[sys.argv.index("--") + 1:]
+authkey = sys.stdin.readline().strip()
+# make sure addon can be enabled wherever it is installed
+addonModule = os.path.basename(addonPath)
+sys.path.insert(0, os.path.dirname(addonPath))
+bpy.ops.wm.addon_enable(module=addonModule)
+workerPool = sys.modules[addonModule + ".lib.worker_pool"]
+workerPool.runWorker((host, int(port)), bytes.fromhex(authkey), int(workerID))
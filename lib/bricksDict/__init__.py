@@ -26,3 +26,8 @@ from .generate import *
 from .modify import *
 from .functions import *
 from .storage import *
+from .scanlines import *
+from .columns import *
+from .overlay import *
+from .source_diff import *
+from .frame_diff import *
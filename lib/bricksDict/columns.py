@@ -0,0 +1,565 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+from collections.abc import MutableMapping
+import json
+import struct
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Addon imports
+from ...functions.common import *
+from ...functions.general import *
+
+
+# column kinds and numpy dtypes for bricksDict entry fields (see 'createBricksDictEntry')
+#   float    -- single float value
+#   bool     -- single bool value
+#   tristate -- True/False/None
+#   int      -- non-negative int or None
+#   vec      -- fixed length float sequence or None
+#   ivec     -- fixed length int sequence or None
+#   bools    -- fixed length bool sequence
+#   string   -- string or None (interned in string table)
+#   key      -- bricksDict key, "self" or None (stored as row index)
+BRICKSDICT_COLUMNS = {
+    "name":              ("string", np.int32, 1),
+    "loc":               ("ivec", np.int32, 3),
+    "val":               ("float", np.float32, 1),
+    "draw":              ("bool", np.bool_, 1),
+    "co":                ("vec", np.float32, 3),
+    "near_face":         ("int", np.int32, 1),
+    "near_intersection": ("vec", np.float32, 3),
+    "near_normal":       ("string", np.int32, 1),
+    "rgba":              ("vec", np.float32, 4),
+    "mat_name":          ("string", np.int32, 1),
+    "custom_mat_name":   ("bool", np.bool_, 1),
+    "parent":            ("key", np.int32, 1),
+    "size":              ("ivec", np.int16, 3),
+    "attempted_merge":   ("bool", np.bool_, 1),
+    "top_exposed":       ("tristate", np.int8, 1),
+    "bot_exposed":       ("tristate", np.int8, 1),
+    "obscures":          ("bools", np.bool_, 6),
+    "type":              ("string", np.int32, 1),
+    "flipped":           ("bool", np.bool_, 1),
+    "rotated":           ("bool", np.bool_, 1),
+    "created_from":      ("key", np.int32, 1),
+}
+NONE_ROW = -1
+SELF_ROW = -2
+
+
+class BricksDictColumns(MutableMapping):
+    """ compact bricksDict storing entry fields in struct-of-arrays columns
+
+    Entries are stored in rows of numpy column arrays, and rows are looked up by lattice location
+    in a dense 3D index (locations outside the lattice fall back to a dictionary). Behaves like
+    the dictionary of entry dictionaries created by 'makeBricksDict', keyed by "x,y,z" strings;
+    'bricksDict[key]' returns a 'BrickEntryView' that reads and writes through to the columns.
+
+    """
+
+    def __init__(self, shape:tuple=(0, 0, 0), namePrefix:str="", capacity:int=64):
+        self.shape = tuple(shape)
+        self.namePrefix = namePrefix
+        self._index = np.full(self.shape, NONE_ROW, dtype=np.int32)
+        self._outerIndex = {}
+        self._keys = []
+        self._alive = np.zeros(capacity, dtype=np.bool_)
+        self._numAlive = 0
+        self._cols = {}
+        self._hasVal = {}
+        for field, (kind, dtype, width) in BRICKSDICT_COLUMNS.items():
+            self._cols[field] = np.zeros((capacity, width) if width > 1 else capacity, dtype=dtype)
+            if kind in ("vec", "ivec"):
+                self._hasVal[field] = np.zeros(capacity, dtype=np.bool_)
+        self._strings = []
+        self._stringIds = {}
+        self._extra = {}
+        # keys of entries changed since tracking started (see 'trackChanges')
+        self.changedKeys = None
+
+    ################################################
+    # mapping methods
+
+    def __getitem__(self, key:str):
+        row = self.getRow(key)
+        if row == NONE_ROW:
+            raise KeyError(key)
+        return BrickEntryView(self, row)
+
+    def __setitem__(self, key:str, entry):
+        row = self._getOrAddRow(key)
+        if not self._alive[row]:
+            self._alive[row] = True
+            self._numAlive += 1
+        if self.changedKeys is not None:
+            self.changedKeys.add(self._keys[row])
+        for field, value in entry.items():
+            self.setField(row, field, value)
+
+    def __delitem__(self, key:str):
+        row = self.getRow(key)
+        if row == NONE_ROW:
+            raise KeyError(key)
+        self._alive[row] = False
+        self._numAlive -= 1
+        self._extra.pop(row, None)
+        if self.changedKeys is not None:
+            self.changedKeys.add(self._keys[row])
+
+    def __contains__(self, key):
+        return self.getRow(key) != NONE_ROW
+
+    def __iter__(self):
+        keys = self._keys
+        for row in np.flatnonzero(self._alive[:len(keys)]).tolist():
+            yield keys[row]
+
+    def __len__(self):
+        return self._numAlive
+
+    def copy(self):
+        """ returns deep copy of bricksDict columns """
+        new = BricksDictColumns.__new__(BricksDictColumns)
+        new.__dict__.update(self.__dict__)
+        new._index = self._index.copy()
+        new._outerIndex = self._outerIndex.copy()
+        new._keys = self._keys.copy()
+        new._alive = self._alive.copy()
+        new._cols = {field: arr.copy() for field, arr in self._cols.items()}
+        new._hasVal = {field: arr.copy() for field, arr in self._hasVal.items()}
+        new._strings = self._strings.copy()
+        new._stringIds = self._stringIds.copy()
+        new._extra = {row: dict(fields) for row, fields in self._extra.items()}
+        new.changedKeys = None
+        return new
+
+    def diffKeys(self, other, fields=None):
+        """ returns keys of entries that differ between bricksDict columns 'self' and 'other' (compared column-wise; only 'fields' if given) """
+        numRows = len(self._keys)
+        otherRows = len(other._keys)
+        # get row in 'self' for each row in 'other'
+        locs = other._cols["loc"][:otherRows]
+        rowMap = np.full(otherRows, NONE_ROW, dtype=np.int32)
+        xL, yL, zL = self.shape
+        inLattice = np.all((locs >= 0) & (locs < (xL, yL, zL)), axis=1)
+        rows = np.flatnonzero(inLattice)
+        rowMap[rows] = self._index[locs[rows, 0], locs[rows, 1], locs[rows, 2]]
+        for row in np.flatnonzero(~inLattice).tolist():
+            rowMap[row] = self._outerIndex.get(tuple(locs[row].tolist()), NONE_ROW)
+        mapped = rowMap != NONE_ROW
+        selfRows = np.where(mapped, rowMap, 0)
+        # translate string ids and row indices of 'other' to those of 'self'
+        stringMap = np.array([self._stringIds.get(string, -3) for string in other._strings] + [-1], dtype=np.int32)
+        keyMap = np.append(np.where(mapped, rowMap, -3), (SELF_ROW, NONE_ROW)).astype(np.int32)
+        changed = ~mapped | (other._alive[:otherRows] != self._alive[selfRows])
+        for field, (kind, _, _) in BRICKSDICT_COLUMNS.items():
+            if fields is not None and field not in fields:
+                continue
+            otherCol = other._cols[field][:otherRows]
+            selfCol = self._cols[field][selfRows]
+            if kind == "string":
+                otherCol = stringMap[otherCol]
+            elif kind == "key":
+                otherCol = keyMap[otherCol]
+            diff = otherCol != selfCol
+            if kind in ("vec", "ivec"):
+                otherHas = other._hasVal[field][:otherRows]
+                diff = np.any(diff, axis=1) & otherHas
+                diff |= otherHas != self._hasVal[field][selfRows]
+            elif diff.ndim > 1:
+                diff = np.any(diff, axis=1)
+            changed |= diff
+        changedKeys = set(other._keys[row] for row in np.flatnonzero(changed & other._alive[:otherRows]).tolist())
+        # entries with differing extra fields
+        for row, fields in other._extra.items():
+            if other._alive[row] and (not mapped[row] or self._extra.get(int(rowMap[row])) != fields):
+                changedKeys.add(other._keys[row])
+        # entries removed from 'other'
+        stillMapped = np.zeros(numRows, dtype=np.bool_)
+        stillMapped[rowMap[mapped & other._alive[:otherRows]]] = True
+        removed = self._alive[:numRows] & ~stillMapped
+        changedKeys.update(self._keys[row] for row in np.flatnonzero(removed).tolist())
+        for row in self._extra:
+            if self._alive[row] and stillMapped[row] and self._keys[row] not in changedKeys:
+                otherRow = other.getRow(self._keys[row])
+                if other._extra.get(otherRow) != self._extra[row]:
+                    changedKeys.add(self._keys[row])
+        return changedKeys
+
+    def copyFields(self, other, fields, rows):
+        """ copy 'fields' of entries in 'other' to entries at 'rows' of 'self' with the same keys """
+        rows = np.asarray(rows, dtype=np.int32)
+        otherRows = other.getRowsAt(self._cols["loc"][rows])
+        found = otherRows != NONE_ROW
+        rows, otherRows = rows[found], otherRows[found]
+        for field in fields:
+            kind = BRICKSDICT_COLUMNS[field][0]
+            values = other._cols[field][otherRows]
+            if kind == "string":
+                # translate string ids of 'other' to those of 'self' (id -1 maps to the last item)
+                stringMap = np.array([self._internString(string) for string in other._strings] + [-1], dtype=np.int32)
+                values = stringMap[values]
+            elif kind == "key":
+                # translate row indices of 'other' to those of 'self' (adding rows for missing keys)
+                values = values.copy()
+                isRow = values >= 0
+                otherKeyRows, inverse = np.unique(values[isRow], return_inverse=True)
+                keyMap = np.array([self._getOrAddRow(other._keys[row]) for row in otherKeyRows.tolist()], dtype=np.int32)
+                values[isRow] = keyMap[inverse]
+            self._cols[field][rows] = values
+            if kind in ("vec", "ivec"):
+                self._hasVal[field][rows] = other._hasVal[field][otherRows]
+        if self.changedKeys is not None:
+            self.changedKeys.update(self._keys[row] for row in rows.tolist())
+
+    def trackChanges(self):
+        """ start (or restart) collecting keys of changed entries in 'changedKeys' """
+        self.changedKeys = set()
+
+    def toDict(self):
+        """ returns bricksDict as dictionary of entry dictionaries (e.g. for json serialization) """
+        return {key: self[key].toDict() for key in self}
+
+    @staticmethod
+    def fromDict(bricksDict:dict, shape:tuple=None, namePrefix:str=""):
+        """ returns new bricksDict columns with entries of 'bricksDict' """
+        if shape is None:
+            locs = [strToList(key) for key in bricksDict]
+            shape = tuple(max(loc[i] for loc in locs) + 1 for i in range(3)) if len(locs) > 0 else (0, 0, 0)
+        new = BricksDictColumns(shape, namePrefix=namePrefix, capacity=max(len(bricksDict), 1))
+        for key, entry in bricksDict.items():
+            new[key] = entry
+        return new
+
+    def memorySize(self):
+        """ returns approximate memory size of bricksDict columns (in bytes) """
+        arrays = [self._index, self._alive] + list(self._cols.values()) + list(self._hasVal.values())
+        return sum(arr.nbytes for arr in arrays) + 64 * len(self._keys)
+
+    def pack(self):
+        """ returns bricksDict columns packed into bytes (see 'unpack') """
+        numRows = len(self._keys)
+        arrays = [("alive", self._alive[:numRows])]
+        arrays += [("col:" + field, arr[:numRows]) for field, arr in self._cols.items()]
+        arrays += [("has:" + field, arr[:numRows]) for field, arr in self._hasVal.items()]
+        meta = {
+            "shape": self.shape,
+            "namePrefix": self.namePrefix,
+            "numRows": numRows,
+            "strings": self._strings,
+            "extra": {str(row): fields for row, fields in self._extra.items()},
+            "arrays": [(name, arr.dtype.str, arr.shape) for name, arr in arrays],
+        }
+        meta = json.dumps(meta, separators=(",", ":")).encode()
+        data = [struct.pack("<I", len(meta)), meta]
+        data += [np.ascontiguousarray(arr).tobytes() for _, arr in arrays]
+        return b"".join(data)
+
+    @staticmethod
+    def unpack(data:bytes):
+        """ returns bricksDict columns from bytes created by 'pack' """
+        metaLen = struct.unpack_from("<I", data)[0]
+        meta = json.loads(data[4:4 + metaLen].decode())
+        numRows = meta["numRows"]
+        new = BricksDictColumns(meta["shape"], namePrefix=meta["namePrefix"], capacity=max(numRows, 1))
+        offset = 4 + metaLen
+        for name, dtype, shape in meta["arrays"]:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            arr = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+            offset += count * dtype.itemsize
+            if name == "alive":
+                new._alive[:numRows] = arr
+            elif name.startswith("col:") and name[4:] in new._cols:
+                new._cols[name[4:]][:numRows] = arr
+            elif name.startswith("has:") and name[4:] in new._hasVal:
+                new._hasVal[name[4:]][:numRows] = arr
+        new._numAlive = int(np.count_nonzero(new._alive))
+        new._strings = meta["strings"]
+        new._stringIds = {s: i for i, s in enumerate(new._strings)}
+        new._extra = {int(row): fields for row, fields in meta["extra"].items()}
+        # rebuild keys and lattice index from entry locations
+        locs = new._cols["loc"][:numRows]
+        new._keys = [listToStr(loc) for loc in locs.tolist()]
+        xL, yL, zL = new.shape
+        inLattice = np.all((locs >= 0) & (locs < (xL, yL, zL)), axis=1)
+        rows = np.flatnonzero(inLattice)
+        new._index[locs[rows, 0], locs[rows, 1], locs[rows, 2]] = rows
+        for row in np.flatnonzero(~inLattice).tolist():
+            new._outerIndex[tuple(locs[row].tolist())] = row
+        return new
+
+    def packDiff(self, base, changedKeys:set=None):
+        """ returns entries added, removed or changed since bricksDict columns 'base' packed into bytes (see 'unpackDiff') """
+        changedKeys = base.diffKeys(self) if changedKeys is None else changedKeys
+        diff = BricksDictColumns(self.shape, namePrefix=self.namePrefix, capacity=max(len(changedKeys), 1))
+        removedKeys = []
+        for key in changedKeys:
+            if key in self:
+                diff[key] = self[key]
+            else:
+                removedKeys.append(key)
+        meta = json.dumps({"removed": removedKeys}, separators=(",", ":")).encode()
+        return b"".join((struct.pack("<I", len(meta)), meta, diff.pack()))
+
+    @staticmethod
+    def unpackDiff(base, data:bytes):
+        """ returns copy of bricksDict columns 'base' with entries of bytes created by 'packDiff' applied """
+        metaLen = struct.unpack_from("<I", data)[0]
+        meta = json.loads(data[4:4 + metaLen].decode())
+        diff = BricksDictColumns.unpack(data[4 + metaLen:])
+        new = base.copy()
+        for key in meta["removed"]:
+            del new[key]
+        for key in diff:
+            # remove old entry first so its row is reset and extra fields not in the changed entry are dropped
+            if key in new:
+                del new[key]
+            new[key] = diff[key]
+        return new
+
+    ################################################
+    # row methods
+
+    def getRow(self, key):
+        """ returns row index of 'key' (string key or lattice location), or -1 if not in bricksDict """
+        row = self._lookupRow(key)
+        return row if row != NONE_ROW and self._alive[row] else NONE_ROW
+
+    def getColumn(self, field:str):
+        """ returns column array for 'field' (rows of deleted entries included; see 'aliveRows') """
+        return self._cols[field][:len(self._keys)]
+
+    def aliveRows(self):
+        """ returns indices of rows with entries in bricksDict """
+        return np.flatnonzero(self._alive[:len(self._keys)])
+
+    def rowKey(self, row:int):
+        return self._keys[row]
+
+    def getRowsAt(self, locs):
+        """ returns row indices of entries at lattice locations 'locs' (N x 3 int array), or -1 where missing """
+        locs = np.asarray(locs, dtype=np.int64).reshape(-1, 3)
+        rows = np.full(len(locs), NONE_ROW, dtype=np.int32)
+        inside = np.all((locs >= 0) & (locs < self.shape), axis=1)
+        insideLocs = locs[inside]
+        rows[inside] = self._index[insideLocs[:, 0], insideLocs[:, 1], insideLocs[:, 2]]
+        if len(self._outerIndex) > 0:
+            for i in np.flatnonzero(~inside).tolist():
+                rows[i] = self._outerIndex.get(tuple(locs[i].tolist()), NONE_ROW)
+        # ignore rows of deleted entries
+        found = rows >= 0
+        rows[found] = np.where(self._alive[rows[found]], rows[found], NONE_ROW)
+        return rows
+
+    def getParentRows(self, rows):
+        """ returns row index of parent entry for each of 'rows' (same as 'getParentKey') """
+        rows = np.asarray(rows, dtype=np.int32)
+        parents = self._cols["parent"][rows]
+        return np.where(parents >= 0, parents, rows)
+
+    def getStringMask(self, field:str, strings, rows):
+        """ returns bool array; True where string 'field' of entry at row is in 'strings' """
+        inStrings = np.array([s in strings for s in self._strings] + [None in strings], dtype=np.bool_)
+        # string id -1 (None) maps to the last item
+        return inStrings[self._cols[field][rows]]
+
+    def setColumnRows(self, field:str, rows, values):
+        """ set bool, tristate or int 'field' of entries at 'rows' to 'values' (-1 for None) """
+        kind = BRICKSDICT_COLUMNS[field][0]
+        assert kind in ("bool", "tristate", "int")
+        rows = np.asarray(rows, dtype=np.int32)
+        self._cols[field][rows] = values
+        if self.changedKeys is not None:
+            self.changedKeys.update(self._keys[row] for row in rows.tolist())
+
+    def _lookupRow(self, key):
+        try:
+            x, y, z = strToList(key) if type(key) == str else key
+        except ValueError:
+            return NONE_ROW
+        xL, yL, zL = self.shape
+        if 0 <= x < xL and 0 <= y < yL and 0 <= z < zL:
+            return int(self._index[x, y, z])
+        return self._outerIndex.get((x, y, z), NONE_ROW)
+
+    def _getOrAddRow(self, key):
+        """ returns row index of 'key', allocating new (not yet alive) row if necessary """
+        row = self._lookupRow(key)
+        if row != NONE_ROW:
+            # removed entries keep their old values until their row is reused
+            if not self._alive[row]:
+                self._resetRow(row)
+            return row
+        loc = strToList(key) if type(key) == str else list(key)
+        row = len(self._keys)
+        if row == len(self._alive):
+            self._grow(2 * row)
+        self._keys.append(key if type(key) == str else listToStr(key))
+        self._resetRow(row)
+        self._cols["loc"][row] = loc
+        self._hasVal["loc"][row] = True
+        x, y, z = loc
+        xL, yL, zL = self.shape
+        if 0 <= x < xL and 0 <= y < yL and 0 <= z < zL:
+            self._index[x, y, z] = row
+        else:
+            self._outerIndex[(x, y, z)] = row
+        return row
+
+    def _resetRow(self, row:int):
+        """ set fields of 'row' (except 'loc') to None (or zero for fields without None value) """
+        for field, (kind, _, _) in BRICKSDICT_COLUMNS.items():
+            if field == "loc":
+                continue
+            if kind == "key":
+                self._cols[field][row] = NONE_ROW
+            elif kind in ("tristate", "int", "string"):
+                self._cols[field][row] = -1
+            else:
+                self._cols[field][row] = 0
+        for field, arr in self._hasVal.items():
+            if field != "loc":
+                arr[row] = False
+
+    def _grow(self, capacity:int):
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[len(self._keys):] = False
+        for field, arr in self._cols.items():
+            new = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            new[:len(arr)] = arr
+            self._cols[field] = new
+        for field, arr in self._hasVal.items():
+            new = np.zeros(capacity, dtype=np.bool_)
+            new[:len(arr)] = arr
+            self._hasVal[field] = new
+
+    ################################################
+    # field methods
+
+    def getField(self, row:int, field:str):
+        """ returns value of 'field' for entry at 'row' """
+        if field not in BRICKSDICT_COLUMNS:
+            try:
+                return self._extra[row][field]
+            except KeyError:
+                raise KeyError(field)
+        kind = BRICKSDICT_COLUMNS[field][0]
+        value = self._cols[field][row]
+        if kind == "float":
+            return round(float(value), 6)
+        elif kind == "bool":
+            return bool(value)
+        elif kind == "tristate":
+            return None if value == -1 else bool(value)
+        elif kind == "int":
+            return None if value == -1 else int(value)
+        elif kind in ("vec", "ivec"):
+            return value.tolist() if self._hasVal[field][row] else None
+        elif kind == "bools":
+            return value.tolist()
+        elif kind == "string":
+            if value == -1:
+                return self.namePrefix + self._keys[row] if field == "name" else None
+            return self._strings[value]
+        elif kind == "key":
+            if value == NONE_ROW:
+                return None
+            return "self" if value == SELF_ROW else self._keys[value]
+
+    def setField(self, row:int, field:str, value):
+        """ set value of 'field' for entry at 'row' """
+        if self.changedKeys is not None:
+            self.changedKeys.add(self._keys[row])
+        if field not in BRICKSDICT_COLUMNS:
+            self._extra.setdefault(row, {})[field] = value
+            return
+        kind = BRICKSDICT_COLUMNS[field][0]
+        col = self._cols[field]
+        if kind in ("float", "bool", "bools"):
+            col[row] = value
+        elif kind == "tristate":
+            col[row] = -1 if value is None else bool(value)
+        elif kind == "int":
+            col[row] = -1 if value is None else value
+        elif kind in ("vec", "ivec"):
+            self._hasVal[field][row] = value is not None
+            if value is not None:
+                col[row] = value
+        elif kind == "string":
+            if value is None or (field == "name" and value == self.namePrefix + self._keys[row]):
+                col[row] = -1
+            else:
+                col[row] = self._internString(value)
+        elif kind == "key":
+            if value is None:
+                col[row] = NONE_ROW
+            elif value == "self":
+                col[row] = SELF_ROW
+            else:
+                col[row] = self._getOrAddRow(value)
+
+    def _internString(self, s:str):
+        stringId = self._stringIds.get(s)
+        if stringId is None:
+            stringId = len(self._strings)
+            self._strings.append(s)
+            self._stringIds[s] = stringId
+        return stringId
+
+
+class BrickEntryView(MutableMapping):
+    """ dictionary-like view of a single bricksDict entry stored in 'BricksDictColumns' """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store:BricksDictColumns, row:int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, field:str):
+        return self.store.getField(self.row, field)
+
+    def __setitem__(self, field:str, value):
+        self.store.setField(self.row, field, value)
+
+    def __delitem__(self, field:str):
+        if field in BRICKSDICT_COLUMNS:
+            raise KeyError("cannot remove bricksDict entry field '%(field)s'" % locals())
+        del self.store._extra[self.row][field]
+
+    def __iter__(self):
+        yield from BRICKSDICT_COLUMNS
+        yield from self.store._extra.get(self.row, ())
+
+    def __len__(self):
+        return len(BRICKSDICT_COLUMNS) + len(self.store._extra.get(self.row, ()))
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+    def copy(self):
+        return self.toDict()
+
+    def toDict(self):
+        """ returns entry as dictionary """
+        return {field: self[field] for field in self}
@@ -0,0 +1,67 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+# NONE!
+
+# Addon imports
+from .columns import BricksDictColumns
+from ...functions.common import *
+from ...functions.general import *
+
+# bricksDict entry fields computed from the source object (compared between animation frames)
+FRAME_SOURCE_FIELDS = ("name", "loc", "val", "draw", "co", "near_face", "near_intersection", "near_normal", "rgba", "mat_name", "custom_mat_name")
+# bricksDict entry fields set when merging bricks (copied from previous animation frame)
+FRAME_MERGE_FIELDS = ("parent", "size", "top_exposed", "bot_exposed", "type", "flipped", "rotated")
+
+
+def getFrameRedrawKeys(prevBricksDict, bricksDict, zStep:int):
+    """ prepare new bricksDict of animation frame to reuse the unchanged bricks of previous frame 'prevBricksDict'
+
+    Bricks of the previous frame not touching entries changed since that frame are copied to 'bricksDict' (and
+    excluded from merging). Returns keys of entries to merge and draw and the parent keys of the replaced bricks
+    of the previous frame, or None if the frame should be built from scratch
+
+    """
+    if not isinstance(prevBricksDict, BricksDictColumns) or not isinstance(bricksDict, BricksDictColumns):
+        return None
+    if prevBricksDict.shape != bricksDict.shape or prevBricksDict.namePrefix != bricksDict.namePrefix:
+        return None
+    changedKeys = prevBricksDict.diffKeys(bricksDict, fields=FRAME_SOURCE_FIELDS)
+    if len(changedKeys) * 2 > len(bricksDict):
+        return None
+    # get bricks of previous frame containing changed entries or directly above/below them (exposure may change)
+    replacedBricks = set()
+    for key in changedKeys:
+        x, y, z = strToList(key)
+        for k in (key, listToStr((x, y, z - 1)), listToStr((x, y, z + 1))):
+            parentKey = getParentKey(prevBricksDict, k)
+            if parentKey is not None and prevBricksDict[parentKey]["size"] is not None:
+                replacedBricks.add(parentKey)
+    redrawKeys = set(k for k in changedKeys if k in bricksDict)
+    for parentKey in replacedBricks:
+        brickKeys = getKeysInBrick(prevBricksDict, prevBricksDict[parentKey]["size"], zStep, key=parentKey)
+        redrawKeys.update(k for k in brickKeys if k in bricksDict)
+    # copy merged bricks of previous frame to the remaining entries
+    redrawRows = np.array([bricksDict.getRow(k) for k in redrawKeys], dtype=np.int32)
+    keepRows = np.setdiff1d(bricksDict.aliveRows(), redrawRows)
+    bricksDict.copyFields(prevBricksDict, FRAME_MERGE_FIELDS, keepRows)
+    bricksDict.setColumnRows("attempted_merge", keepRows, True)
+    return list(redrawKeys), replacedBricks
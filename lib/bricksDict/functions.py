@@ -16,9 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
-from mathutils.interpolate import poly_3d_calc
 import math
 import colorsys
+import numpy as np
 
 # Blender imports
 import bpy
@@ -27,6 +27,8 @@ import bpy
 from ...functions import *
 from ..Brick import Bricks
 from ..Brick.legal_brick_sizes import *
+from .columns import BricksDictColumns
+from ..caches import bricker_uv_image_cache
 
 
 def getMatAtFaceIdx(obj, face_idx):
@@ -40,37 +42,73 @@ def getMatAtFaceIdx(obj, face_idx):
     return matName
 
 
-def getUVCoord(mesh, face, point, image):
-    """ returns UV coordinate of target point in source mesh image texture
-    mesh  -- mesh data from source object
-    face  -- face object from mesh
-    point -- coordinate of target point on source mesh
-    image -- image texture for source mesh
-    """
+def getUVMeshData(mesh):
+    """ returns vertex coordinates, loop uv coordinates and polygon loops of mesh with active uv layer (else None) """
     # get active uv layer data
     uv_layer = mesh.uv_layers.active
     if uv_layer is None:
         return None
-    uv = uv_layer.data
-    # get 3D coordinates of face's vertices
-    lco = [mesh.vertices[i].co for i in face.vertices]
-    # get uv coordinates of face's vertices
-    luv = [uv[i].uv for i in face.loop_indices]
-    # calculate barycentric weights for point
-    lwts = poly_3d_calc(lco, point)
-    # multiply barycentric weights by uv coordinates
-    uv_loc = sum((p*w for p,w in zip(luv,lwts)), Vector((0,0)))
+    # get vertex coordinates, uv coordinates and polygon loops
+    cos = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", cos)
+    cos = cos.reshape(-1, 3)
+    uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    uvs = uvs.reshape(-1, 2)
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVerts)
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    return cos, uvs, loopVerts, loopStarts, loopTotals
+
+
+def getUVCoords(meshData, faceIdxs, points, image):
+    """ returns UV coordinates of target points in source mesh image texture (N x 2 int array)
+    meshData -- mesh data from 'getUVMeshData'
+    faceIdxs -- indices of faces containing the points
+    points   -- coordinates of target points on source mesh (N x 3)
+    image    -- image texture for source mesh
+    """
+    cos, uvs, loopVerts, loopStarts, loopTotals = meshData
+    faceIdxs = np.asarray(faceIdxs, dtype=np.int32)
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    starts = loopStarts[faceIdxs]
+    totals = loopTotals[faceIdxs]
+    # calculate barycentric weights for points in each triangle of face's triangle fan, keeping best fit
+    bestScore = np.full(len(points), -np.inf, dtype=np.float32)
+    bestUV = np.zeros((len(points), 2), dtype=np.float32)
+    for k in range(1, int(totals.max()) - 1):
+        tri = np.flatnonzero(totals - 2 >= k)
+        loops = (starts[tri], starts[tri] + k, starts[tri] + k + 1)
+        a, b, c = (cos[loopVerts[l]] for l in loops)
+        v0, v1, v2 = b - a, c - a, points[tri] - a
+        d00 = np.einsum("ij,ij->i", v0, v0)
+        d01 = np.einsum("ij,ij->i", v0, v1)
+        d11 = np.einsum("ij,ij->i", v1, v1)
+        d20 = np.einsum("ij,ij->i", v2, v0)
+        d21 = np.einsum("ij,ij->i", v2, v1)
+        denom = d00 * d11 - d01 * d01
+        denom[denom == 0] = 1
+        wB = (d11 * d20 - d01 * d21) / denom
+        wC = (d00 * d21 - d01 * d20) / denom
+        wA = 1 - wB - wC
+        # prefer triangle containing the point (all weights non-negative)
+        score = np.minimum(np.minimum(wA, wB), wC)
+        better = score > bestScore[tri]
+        tri, wA, wB, wC = tri[better], wA[better, None], wB[better, None], wC[better, None]
+        bestScore[tri] = score[better]
+        bestUV[tri] = wA * uvs[loops[0][better]] + wB * uvs[loops[1][better]] + wC * uvs[loops[2][better]]
     # ensure uv_loc is in range(0,1)
     # TODO: possibly approach this differently? currently, uv verts that are outside the image are wrapped to the other side
-    uv_loc = Vector((uv_loc[0] % 1, uv_loc[1] % 1))
+    bestUV %= 1
     # convert uv_loc in range(0,1) to uv coordinate
     image_size_x, image_size_y = image.size
-    x_co = round(uv_loc.x * (image_size_x - 1))
-    y_co = round(uv_loc.y * (image_size_y - 1))
-    uv_coord = (x_co, y_co)
-
-    # return resulting uv coordinate
-    return Vector(uv_coord)
+    uv_coords = np.empty((len(points), 2), dtype=np.int64)
+    uv_coords[:, 0] = np.round(bestUV[:, 0] * (image_size_x - 1))
+    uv_coords[:, 1] = np.round(bestUV[:, 1] * (image_size_y - 1))
+    return uv_coords
 
 
 def getUVTextureData(obj):
@@ -103,45 +141,76 @@ def getFirstImgTexNode(obj):
     return img
 
 
+def getImagePixels(img):
+    """ returns float32 array of gamma corrected RGBA pixels (cached until the image changes) """
+    cacheKey = (tuple(img.size), img.filepath_raw, img.source)
+    cached = bricker_uv_image_cache.get(img.name)
+    if cached is not None and cached[0] == cacheKey and not img.is_dirty:
+        return cached[1]
+    # Accessing pixels directly is far too slow; copy to new array once for massive performance-gain
+    pixels = np.empty(len(img.pixels), dtype=np.float32)
+    if hasattr(img.pixels, "foreach_get"):
+        img.pixels.foreach_get(pixels)
+    else:
+        pixels[:] = img.pixels[:]
+    pixels = pixels.reshape(-1, 4)
+    # gamma correct RGB values
+    pixels[:, :3] **= 2
+    bricker_uv_image_cache[img.name] = (cacheKey, pixels)
+    return pixels
+
+
 # reference: https://svn.blender.org/svnroot/bf-extensions/trunk/py/scripts/addons/uv_bake_texture_to_vcols.py
-def getUVImages(obj):
-    """ returns dictionary with duplicate pixel arrays for all UV textures in object """
+def getSourceImages(obj):
+    """ returns list of images source colors of object may be read from (uv textures, cm.uvImage and first image texture node) """
     scn, cm, _ = getActiveContextInfo()
-    # get list of images to store
     uv_tex_data = getUVTextureData(obj)
     images = [uv_tex.image for uv_tex in uv_tex_data] if uv_tex_data else []
     images.append(cm.uvImage)
     images.append(getFirstImgTexNode(obj))
-    images = uniquify1(images)
+    return uniquify1(images)
+
+
+def getUVImages(obj):
+    """ returns dictionary with pixel arrays for all UV textures in object """
+    # get list of images to store
+    images = getSourceImages(obj)
     # store images
     uv_images = {}
     for img in images:
         if verifyImg(img) is None:
             continue
-        uv_images[img.name] = (img.size[0],
-                               img.size[1],
-                               img.pixels[:]
-                               # Accessing pixels directly is far too slow.
-                               #Copied to new array for massive performance-gain.
-                               )
+        uv_images[img.name] = (img.size[0], img.size[1], getImagePixels(img))
     return uv_images
 
 
-# reference: https://svn.blender.org/svnroot/bf-extensions/trunk/py/scripts/addons/uv_bake_texture_to_vcols.py
-def getPixel(pixels, uv_coord):
-    """ get RGBA value for specified coordinate in UV image
-    pixels    -- list of pixel data from UV texture image
-    uv_coord  -- UV coordinate of desired pixel value
+def isAnimated(id_data):
+    """ returns True if ID datablock has action or drivers """
+    anim = id_data.animation_data if id_data is not None else None
+    return anim is not None and (anim.action is not None or len(anim.drivers) > 0)
+
+
+def sourceColorsAnimated(obj):
+    """ returns True if source colors of object may change between frames (animated materials or image sequence/movie textures) """
+    for mat_slot in obj.material_slots:
+        mat = mat_slot.material
+        if mat is None:
+            continue
+        if isAnimated(mat) or (mat.use_nodes and isAnimated(mat.node_tree)):
+            return True
+        if any(tex_slot is not None and isAnimated(tex_slot.texture) for tex_slot in mat.texture_slots):
+            return True
+    return any(img is not None and img.source in ("SEQUENCE", "MOVIE") for img in getSourceImages(obj))
+
+
+def getPixels(pixels, uv_coords):
+    """ get gamma corrected RGBA values for specified coordinates in UV image (N x 4 array)
+    pixels    -- pixel data from 'getUVImages'
+    uv_coords -- UV coordinates of desired pixel values (N x 2)
     """
     image_size_x, image_size_y, uv_pixels = pixels
-    pixelNumber = (image_size_x * int(uv_coord.y)) + int(uv_coord.x)
-    r = uv_pixels[pixelNumber*4 + 0]
-    g = uv_pixels[pixelNumber*4 + 1]
-    b = uv_pixels[pixelNumber*4 + 2]
-    a = uv_pixels[pixelNumber*4 + 3]
-    # gamma correct RGB value
-    r, g, b, a = gammaCorrect([r, g, b, a], 2)
-    return (r, g, b, a)
+    pixelNumbers = image_size_x * uv_coords[:, 1] + uv_coords[:, 0]
+    return uv_pixels[pixelNumbers]
 
 
 def getAverage(rgba0:Vector, rgba1:Vector, weight:float):
@@ -167,21 +236,19 @@ def getFirstNode(mat, types:list=None):
             return node
 
 
+def getColorSnapGrid(colorSnap, colorSnapAmount):
+    """ returns empty grid for snapping rgba values in 'createNewMaterial' """
+    snapAmount = 0.000001 if colorSnap == "NONE" else colorSnapAmount
+    return ColorSnapGrid(snapAmount)
+
+
 def createNewMaterial(model_name, rgba, rgba_vals, sss, sat_mat, specular, roughness, ior, transmission, colorSnap, colorSnapAmount, includeTransparency, curFrame=None):
-    """ create new material with specified rgba values """
+    """ create new material with specified rgba values ('rgba_vals' is a 'ColorSnapGrid' of previous rgba values) """
     scn = bpy.context.scene
     # get or create material with unique color
-    min_diff = float("inf")
-    snapAmount = 0.000001 if colorSnap == "NONE" else colorSnapAmount
     if rgba is None:
         return ""
-    r0, g0, b0, a0 = rgba
-    for i in range(len(rgba_vals)):
-        diff = distance(rgba, rgba_vals[i])
-        if diff < min_diff and diff < snapAmount:
-            min_diff = diff
-            r0, g0, b0, a0 = rgba_vals[i]
-            break
+    r0, g0, b0, a0 = rgba_vals.find(rgba) or rgba
     mat_name_end_string = "".join((str(round(r0, 5)), str(round(g0, 5)), str(round(b0, 5)), str(round(a0, 5))))
     mat_name_hash = str(hash_str(mat_name_end_string))[:14]
     mat_name = "Bricker_{n}{f}_{hash}".format(n=model_name, f="_f_%(curFrame)s" % locals() if curFrame is not None else "", hash=mat_name_hash)
@@ -295,17 +362,29 @@ def getUVPixelColor(scn, obj, face_idx, point, uv_images, uvImage):
     """ get RGBA value for point in UV image at specified face index """
     if face_idx is None:
         return None
-    # get closest material using UV map
-    face = obj.data.polygons[face_idx]
-    # get uv_texture image for face
-    image = getUVImage(scn, obj, face_idx, uvImage)
-    if image is None:
-        return None
-    # get uv coordinate based on nearest face intersection
-    uv_coord = getUVCoord(obj.data, face, point, image)
-    # retrieve rgba value at uv coordinate
-    rgba = getPixel(uv_images[image.name], uv_coord)
-    return rgba
+    return getUVPixelColors(scn, obj, [face_idx], [point], uv_images, uvImage)[0]
+
+
+def getUVPixelColors(scn, obj, faceIdxs, points, uv_images, uvImage):
+    """ get RGBA values for points in UV images at specified face indices (None where no image found) """
+    rgbas = [None] * len(faceIdxs)
+    meshData = getUVMeshData(obj.data) if len(faceIdxs) > 0 else None
+    if meshData is None:
+        return rgbas
+    faceIdxs = np.asarray(faceIdxs, dtype=np.int32)
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+    # get uv_texture image for each face
+    uniqueFaces, faceInverse = np.unique(faceIdxs, return_inverse=True)
+    faceImages = [getUVImage(scn, obj, f, uvImage) for f in uniqueFaces.tolist()]
+    images = {image.name: image for image in faceImages if image is not None and image.name in uv_images}
+    pointImages = np.array([image.name if image is not None else "" for image in faceImages], dtype=object)[faceInverse]
+    # retrieve rgba values at uv coordinates for all points sharing an image
+    for name, image in images.items():
+        idxs = np.flatnonzero(pointImages == name)
+        uv_coords = getUVCoords(meshData, faceIdxs[idxs], points[idxs], image)
+        for i, rgba in zip(idxs.tolist(), getPixels(uv_images[name], uv_coords).tolist()):
+            rgbas[i] = tuple(rgba)
+    return rgbas
 
 
 def getMaterialColor(matName):
@@ -426,13 +505,12 @@ def setAllBrickExposures(bricksDict, zStep, key=None, loc=None):
     # initialize vars
     key = key or listToStr(loc)
     loc = loc or getDictLoc(bricksDict, key)
-    keysInBrick = getKeysInBrick(bricksDict, bricksDict[key]["size"], zStep, loc=loc)
-    topExposed, botExposed = False, False
+    keysInBrick = [k for k in getKeysInBrick(bricksDict, bricksDict[key]["size"], zStep, loc=loc) if k in bricksDict]
     # set brick exposures
-    for k in keysInBrick:
-        curTopExposed, curBotExposed = setBrickExposure(bricksDict, k)
-        if curTopExposed: topExposed = True
-        if curBotExposed: botExposed = True
+    setBrickExposures(bricksDict, keysInBrick)
+    # top or bottom exposed if even one location is exposed
+    topExposed = any(bricksDict[k]["top_exposed"] for k in keysInBrick)
+    botExposed = any(bricksDict[k]["bot_exposed"] for k in keysInBrick)
     return topExposed, botExposed
 
 
@@ -456,6 +534,40 @@ def setBrickExposure(bricksDict, key=None, loc=None):
     return topExposed, botExposed
 
 
+def setBrickExposures(bricksDict, keys=None):
+    """ set top and bottom exposure of all drawn brick locs (or only 'keys', e.g. a dirty region after customization) """
+    if not isinstance(bricksDict, BricksDictColumns):
+        keys = keys if keys is not None else [k for k in bricksDict.keys() if bricksDict[k]["draw"]]
+        for key in keys:
+            setBrickExposure(bricksDict, key)
+        return
+    # get rows to update
+    if keys is None:
+        rows = bricksDict.aliveRows()
+        rows = rows[bricksDict.getColumn("draw")[rows]]
+    else:
+        rows = np.array([bricksDict.getRow(k) for k in keys], dtype=np.int32)
+        rows = rows[rows >= 0]
+    if len(rows) == 0:
+        return
+    locs = bricksDict.getColumn("loc")[rows]
+    # get rows of locs above and below
+    offset = np.array((0, 0, 1))
+    rowsAbove = bricksDict.getRowsAt(locs + offset)
+    rowsBelow = bricksDict.getRowsAt(locs - offset)
+    # brick is exposed where the loc above/below is missing, empty or its parent type doesn't obscure it
+    val = bricksDict.getColumn("val")
+    topExposed = np.ones(len(rows), dtype=np.bool_)
+    botExposed = np.ones(len(rows), dtype=np.bool_)
+    for exposed, adjRows, obscuringTypes in ((topExposed, rowsAbove, getTypesObscuringBelow()), (botExposed, rowsBelow, getTypesObscuringAbove())):
+        found = np.flatnonzero(adjRows >= 0)
+        adjRows = adjRows[found]
+        obscured = (val[adjRows] != 0) & bricksDict.getStringMask("type", obscuringTypes, bricksDict.getParentRows(adjRows))
+        exposed[found] = ~obscured
+    bricksDict.setColumnRows("top_exposed", rows, topExposed)
+    bricksDict.setColumnRows("bot_exposed", rows, botExposed)
+
+
 def checkExposure(bricksDict, key, obscuringTypes=[]):
     """ checks if brick at given key is exposed """
     try:
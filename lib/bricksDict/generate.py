@@ -18,6 +18,7 @@
 # System imports
 import bmesh
 import math
+import os
 import time
 import numpy as np
 
@@ -28,6 +29,8 @@ from mathutils import Matrix, Vector
 
 # Addon imports
 from .functions import *
+from .scanlines import *
+from .columns import *
 from ...functions.common import *
 from ...functions.general import *
 from ...functions.generate_lattice import generateLattice
@@ -35,15 +38,61 @@ from ...functions.wrappers import *
 from ...functions.smoke_sim import *
 from ..Brick import Bricks
 
-def VectorRound(vec, dec, roundType="ROUND"):
-    """ round all vals in Vector 'vec' to 'dec' precision """
-    if roundType == "ROUND":
-        lst = [round(vec[i], dec) for i in range(len(vec))]
-    elif roundType == "FLOOR":
-        lst = [(math.floor(vec[i] * 10**dec)) / 10**dec for i in range(len(vec))]
-    elif roundType in ("CEILING", "CEIL"):
-        lst = [(math.ceil(vec[i] * 10**dec)) / 10**dec for i in range(len(vec))]
-    return Vector(lst)
+class FaceIdxMatrix:
+    """ nearest face intersection for each lattice location, stored in parallel arrays
+
+    idx    -- index of nearest intersected face (-1 if none)
+    dist   -- distance from lattice location to intersection (inf if none)
+    loc    -- location of intersection
+    normal -- normal of intersected face
+
+    """
+
+    def __init__(self, shape:tuple):
+        self.shape = tuple(shape)
+        self.idx = np.full(self.shape, -1, dtype=np.int32)
+        self.dist = np.full(self.shape, np.inf, dtype=np.float32)
+        self.loc = np.zeros(self.shape + (3,), dtype=np.float32)
+        self.normal = np.zeros(self.shape + (3,), dtype=np.float32)
+
+    def __getitem__(self, loc:tuple):
+        """ returns intersection dictionary at lattice location (None if no intersection) """
+        if self.idx[loc] == -1:
+            return None
+        return {"idx":int(self.idx[loc]), "dist":float(self.dist[loc]), "loc":Vector(self.loc[loc].tolist()), "normal":Vector(self.normal[loc].tolist())}
+
+    def __setitem__(self, loc:tuple, intersection:dict):
+        """ set intersection dictionary at lattice location (None to clear) """
+        if intersection is None:
+            self.idx[loc] = -1
+            self.dist[loc] = np.inf
+            return
+        self.idx[loc] = intersection["idx"]
+        self.dist[loc] = intersection["dist"]
+        self.loc[loc] = intersection["loc"]
+        self.normal[loc] = intersection["normal"]
+
+    def crop(self, slices:tuple):
+        """ returns FaceIdxMatrix of lattice locations in 'slices' """
+        new = FaceIdxMatrix.__new__(FaceIdxMatrix)
+        new.idx = self.idx[slices]
+        new.dist = self.dist[slices]
+        new.loc = self.loc[slices]
+        new.normal = self.normal[slices]
+        new.shape = new.idx.shape
+        return new
+
+    def copyFlat(self, dstIdxs, srcIdxs):
+        """ copy intersections from flat lattice indices 'srcIdxs' to flat lattice indices 'dstIdxs' """
+        for arr in (self.idx, self.dist, self.loc, self.normal):
+            flat = arr.reshape((-1,) + arr.shape[3:])
+            flat[dstIdxs] = flat[srcIdxs]
+
+    def update(self, loc:tuple, intersection:dict):
+        """ set intersection at lattice location if nearer than current intersection """
+        if self.dist[loc] > intersection["dist"]:
+            self[loc] = intersection
+
 
 def castRays(obj:Object, point:Vector, direction:Vector, miniDist:float, roundType:str="CEILING", edgeLen:int=0):
     """
@@ -150,34 +199,36 @@ def rayObjIntersections(scn, point, direction, miniDist:Vector, edgeLen, obj, us
     # return helpful information
     return not outside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection
 
-def updateBFMatrix(scn, x0, y0, z0, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x1, y1, z1, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays):
-    """ update brickFreqMatrix[x0][y0][z0] based on results from rayObjIntersections """
-    orig = coordMatrix[x0][y0][z0]
-    try:
-        rayEnd = coordMatrix[x1][y1][z1]
-    except IndexError:
+def updateBFMatrix(scn, x0, y0, z0, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x1, y1, z1, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays, caster=None):
+    """ update brickFreqMatrix[x0][y0][z0] based on results from rayObjIntersections (or from 'caster' scanlines if passed) """
+    xL, yL, zL = coordMatrix.shape
+    if x1 >= xL or y1 >= yL or z1 >= zL:
         return -1, None, True
+    orig = coordMatrix.co(x0, y0, z0)
+    rayEnd = coordMatrix.co(x1, y1, z1)
     # check if point can be thrown away
     ray = rayEnd - orig
     edgeLen = ray.length
 
-    origInside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection = rayObjIntersections(scn, orig, ray, miniDist, edgeLen, source, useNormals, insidenessRayCastDir, castDoubleCheckRays)
-    if origInside and brickFreqMatrix[x0][y0][z0] == 0:
+    if caster is None:
+        origInside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection = rayObjIntersections(scn, orig, ray, miniDist, edgeLen, source, useNormals, insidenessRayCastDir, castDoubleCheckRays)
+    else:
+        axis = 0 if x1 != x0 else (1 if y1 != y0 else 2)
+        origInside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection = caster.rayObjIntersections((x0, y0, z0), axis, edgeLen)
+    if origInside and brickFreqMatrix[x0, y0, z0] == 0:
         # define brick as inside shell
-        brickFreqMatrix[x0][y0][z0] = -1
+        brickFreqMatrix[x0, y0, z0] = -1
     if edgeIntersects:
         if (brickShell == "INSIDE" and origInside) or (brickShell == "OUTSIDE" and not origInside) or brickShell == "INSIDE AND OUTSIDE":
             # define brick as part of shell
-            brickFreqMatrix[x0][y0][z0] = 1
+            brickFreqMatrix[x0, y0, z0] = 1
             # set or update nearest face to brick
-            if type(faceIdxMatrix[x0][y0][z0]) != dict or faceIdxMatrix[x0][y0][z0]["dist"] > firstIntersection["dist"]:
-                faceIdxMatrix[x0][y0][z0] = firstIntersection
+            faceIdxMatrix.update((x0, y0, z0), firstIntersection)
         if (brickShell == "INSIDE" and not origInside) or (brickShell == "OUTSIDE" and origInside) or brickShell == "INSIDE AND OUTSIDE":
             # define brick as part of shell
-            brickFreqMatrix[x1][y1][z1] = 1
+            brickFreqMatrix[x1, y1, z1] = 1
             # set or update nearest face to brick
-            if type(faceIdxMatrix[x1][y1][z1]) != dict or faceIdxMatrix[x1][y1][z1]["dist"] > lastIntersection["dist"]:
-                faceIdxMatrix[x1][y1][z1] = lastIntersection
+            faceIdxMatrix.update((x1, y1, z1), lastIntersection)
 
     return intersections, nextIntersection, edgeIntersects
 
@@ -245,29 +296,34 @@ def updateInternal(bricksDict, cm, keys="ALL", clearExisting=False):
 def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", printStatus=True, cursorStatus=False):
     """ returns new brickFreqMatrix """
     scn, cm, _ = getActiveContextInfo()
-    brickFreqMatrix = deepcopy(faceIdxMatrix)
+    brickFreqMatrix = np.zeros(coordMatrix.shape, dtype=np.float32)
     axes = axes.lower()
-    dist = coordMatrix[1][1][1] - coordMatrix[0][0][0]
+    dist = coordMatrix.vertDist
     highEfficiency = cm.insidenessRayCastDir in ("HIGH EFFICIENCY", "XYZ") and not cm.verifyExposure
     # runs update functions only once
     useNormals = cm.useNormals
     insidenessRayCastDir = cm.insidenessRayCastDir
     castDoubleCheckRays = cm.castDoubleCheckRays
+    # cast rays along entire lattice rows at once if using scanline ray casting
+    caster = ScanlineCaster(getMeshData(source), coordMatrix, useNormals, insidenessRayCastDir, castDoubleCheckRays) if cm.shellRayCasting == "SCANLINE" else None
+    # cast rays for all rows up front in parallel worker processes
+    if caster is not None and cm.shellProcesses != 1:
+        lineAxes = axes + ("" if insidenessRayCastDir == "HIGH EFFICIENCY" else insidenessRayCastDir)
+        caster.castLinesInParallel(lineAxes, cm.shellProcesses or os.cpu_count())
     # initialize Matix sizes
-    xL = len(brickFreqMatrix)
-    yL = len(brickFreqMatrix[0])
-    zL = len(brickFreqMatrix[0][0])
-
+    xL, yL, zL = coordMatrix.shape
+    # get lattice coordinates along each axis (for skipping unnecessary ray casts)
+    xCoords, yCoords, zCoords = (coordMatrix.axisCoords(i).tolist() for i in range(3))
 
     # initialize values used for printing status
-    denom = (len(brickFreqMatrix[0][0]) + len(brickFreqMatrix[0]) + len(brickFreqMatrix))/100
+    denom = (zL + yL + xL)/100
     if cursorStatus:
         wm = bpy.context.window_manager
         wm.progress_begin(0, 100)
 
     def printCurStatus(percentStart, num0, denom0, lastPercent):
         # print status to terminal
-        percent = percentStart + (len(brickFreqMatrix)/denom * (num0/(denom0-1))) / 100
+        percent = percentStart + (xL/denom * (num0/(denom0-1))) / 100
         updateProgressBars(printStatus, cursorStatus, percent, 0, "Shell")
         return percent
 
@@ -282,12 +338,12 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", p
                 i = 0
                 for x in range(xL):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].x + dist.x + miniDist.x < nextIntersection.x:
-                        brickFreqMatrix[x][y][z] = val
+                    if i == 2 and highEfficiency and nextIntersection is not None and xCoords[x] + dist.x + miniDist.x < nextIntersection.x:
+                        brickFreqMatrix[x, y, z] = val
                         continue
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x+1, y, z, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x+1, y, z, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays, caster=caster)
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -302,14 +358,14 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", p
                 i = 0
                 for y in range(yL):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].y + dist.y + miniDist.y < nextIntersection.y:
-                        if brickFreqMatrix[x][y][z] == 0:
-                            brickFreqMatrix[x][y][z] = val
-                        if brickFreqMatrix[x][y][z] == val:
+                    if i == 2 and highEfficiency and nextIntersection is not None and yCoords[y] + dist.y + miniDist.y < nextIntersection.y:
+                        if brickFreqMatrix[x, y, z] == 0:
+                            brickFreqMatrix[x, y, z] = val
+                        if brickFreqMatrix[x, y, z] == val:
                             continue
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y+1, z, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y+1, z, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays, caster=caster)
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -324,15 +380,15 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", p
                 i = 0
                 for z in range(zL):
                     # skip current loc if casting ray is unnecessary (sets outside vals to last found val)
-                    if i == 2 and highEfficiency and nextIntersection is not None and coordMatrix[x][y][z].z + dist.z + miniDist.z < nextIntersection.z:
-                        if brickFreqMatrix[x][y][z] == 0:
-                            brickFreqMatrix[x][y][z] = val
-                        if brickFreqMatrix[x][y][z] == val:
+                    if i == 2 and highEfficiency and nextIntersection is not None and zCoords[z] + dist.z + miniDist.z < nextIntersection.z:
+                        if brickFreqMatrix[x, y, z] == 0:
+                            brickFreqMatrix[x, y, z] = val
+                        if brickFreqMatrix[x, y, z] == val:
                             continue
                     # cast rays and update brickFreqMatrix
-                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y, z+1, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays)
+                    intersections, nextIntersection, edgeIntersects = updateBFMatrix(scn, x, y, z, coordMatrix, faceIdxMatrix, brickFreqMatrix, brickShell, source, x, y, z+1, miniDist, useNormals, insidenessRayCastDir, castDoubleCheckRays, caster=caster)
                     i = 0 if edgeIntersects else (2 if i == 1 else 1)
-                    val = brickFreqMatrix[x][y][z]
+                    val = brickFreqMatrix[x, y, z]
                     if intersections == 0:
                         break
 
@@ -348,10 +404,11 @@ def getBrickMatrix(source, faceIdxMatrix, coordMatrix, brickShell, axes="xyz", p
 def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, printStatus=True, cursorStatus=False):
     cm = getActiveContextInfo()[1]
     density_grid, flame_grid, color_grid, domain_res, max_res, adapt = getSmokeInfo(source)
-    brickFreqMatrix = deepcopy(faceIdxMatrix)
-    colorMatrix = deepcopy(faceIdxMatrix)
+    brickFreqMatrix = np.zeros(faceIdxMatrix.shape, dtype=np.float32)
+    colorMatrix = np.zeros(faceIdxMatrix.shape + (4,), dtype=np.float32)
+    xL, yL, zL = faceIdxMatrix.shape
     old_percent = 0
-    brightness = Vector([(cm.smokeBrightness - 1) / 5]*3)
+    brightness = (cm.smokeBrightness - 1) / 5
     sat_mat = getSaturationMatrix(cm.smokeSaturation)
     quality = cm.smokeQuality
 
@@ -367,76 +424,47 @@ def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, print
             return brickFreqMatrix, colorMatrix
         start_percent = vec_div(adapt_min - full_min, full_dist)
         end_percent   = vec_div(adapt_max - full_min, full_dist)
-        s_idx = (len(faceIdxMatrix) * start_percent.x, len(faceIdxMatrix[0]) * start_percent.y, len(faceIdxMatrix[0][0]) * start_percent.z)
-        e_idx = (len(faceIdxMatrix) * end_percent.x,   len(faceIdxMatrix[0]) * end_percent.y,   len(faceIdxMatrix[0][0]) * end_percent.z)
+        s_idx = (xL * start_percent.x, yL * start_percent.y, zL * start_percent.z)
+        e_idx = (xL * end_percent.x,   yL * end_percent.y,   zL * end_percent.z)
     else:
         s_idx = (0, 0, 0)
-        e_idx = (len(faceIdxMatrix), len(faceIdxMatrix[0]), len(faceIdxMatrix[0][0]))
+        e_idx = (xL, yL, zL)
 
     # get number of iterations from s_idx to e_idx for x, y, z
     d = Vector((e_idx[0] - s_idx[0], e_idx[1] - s_idx[1], e_idx[2] - s_idx[2]))
     # verify bounding box is larger than 0 in all directions
     if 0 in d:
         return brickFreqMatrix, colorMatrix
-    # get x/y/z distances
-    xn0 = domain_res[0] / d.x
-    yn0 = domain_res[1] / d.y
-    zn0 = domain_res[2] / d.z
-    denom = d.x
-
     # initialize variables
     flameIntensity = cm.flameIntensity
-    flameColor = cm.flameColor
+    flameColor = np.array(cm.flameColor, dtype=np.float32)
     smokeDensity = cm.smokeDensity
 
-    # set up brickFreqMatrix values
-    for x in range(int(s_idx[0]), int(e_idx[0])):
-        # print status to terminal
-        old_percent = updateProgressBars(printStatus, cursorStatus, x / denom, old_percent, "Shell")
-        for y in range(int(s_idx[1]), int(e_idx[1])):
-            for z in range(int(s_idx[2]), int(e_idx[2])):
-                d_acc = 0
-                f_acc = 0
-                cs_acc = Vector((0, 0, 0))
-                cf_acc = Vector((0, 0, 0))
-                # get indices for
-                x0 = x - s_idx[0]
-                y0 = y - s_idx[1]
-                z0 = z - s_idx[2]
-                xn = [int(xn0 * x0), int(xn0 * (x0 + 1))]
-                yn = [int(yn0 * y0), int(yn0 * (y0 + 1))]
-                zn = [int(zn0 * z0), int(zn0 * (z0 + 1))]
-                xn[1] += 1 if xn[1] == xn[0] else 0
-                yn[1] += 1 if yn[1] == yn[0] else 0
-                zn[1] += 1 if zn[1] == zn[0] else 0
-                stepX = math.ceil((xn[1] - xn[0]) / quality)
-                stepY = math.ceil((yn[1] - yn[0]) / quality)
-                stepZ = math.ceil((zn[1] - zn[0]) / quality)
-                ave_denom = 0
-                for x1 in range(xn[0], xn[1], stepX):
-                    for y1 in range(yn[0], yn[1], stepY):
-                        for z1 in range(zn[0], zn[1], stepZ):
-                            cur_idx = (z1 * domain_res[1] + y1) * domain_res[0] + x1
-                            _d = density_grid[cur_idx]
-                            f = flame_grid[cur_idx]
-                            d_acc += _d
-                            f_acc += f
-                            cur_idx_ext = cur_idx * 4
-                            cs_acc += _d * Vector((color_grid[cur_idx_ext], color_grid[cur_idx_ext + 1], color_grid[cur_idx_ext + 2]))
-                            cf_acc += Vector(f * flameIntensity * f * flameColor)
-                            ave_denom += 1
-                d_ave = d_acc / ave_denom
-                f_ave = f_acc / ave_denom
-                alpha = d_ave + f_ave
-                cs_ave = cs_acc / (ave_denom * (d_ave if d_ave != 0 else 1))
-                cf_ave = cf_acc / (ave_denom * (f_ave if f_ave != 0 else 1))
-                c_ave = (cs_ave + cf_ave)
-                # add brightness
-                c_ave += brightness
-                # add saturation
-                c_ave = c_ave * sat_mat
-                brickFreqMatrix[x][y][z] = 0 if alpha < (1 - smokeDensity) else 1
-                colorMatrix[x][y][z] = list(c_ave) + [alpha]
+    # get matrices selecting the sampled voxels for each brick along x, y and z
+    samplers = [getSmokeSampler(int(s_idx[i]), int(e_idx[i]), s_idx[i], domain_res[i] / d[i], domain_res[i], quality) for i in range(3)]
+    num_samples = np.einsum("a,b,c->abc", *[sampler.sum(axis=1) for sampler in samplers])
+    # sum sampled voxels for each brick (the sampled voxels are the product of the per-axis samples)
+    old_percent = updateProgressBars(printStatus, cursorStatus, 0, old_percent, "Shell")
+    d_acc = resampleSmokeGrid(density_grid, samplers)
+    f_acc = resampleSmokeGrid(flame_grid, samplers)
+    cs_acc = resampleSmokeGrid(density_grid[..., None] * color_grid[..., :3], samplers)
+    cf_acc = resampleSmokeGrid(flame_grid ** 2, samplers)[..., None] * (flameIntensity * flameColor)
+    # get average density, flame and color values
+    d_ave = d_acc / num_samples
+    f_ave = f_acc / num_samples
+    alpha = d_ave + f_ave
+    cs_ave = cs_acc / (num_samples * np.where(d_ave != 0, d_ave, 1))[..., None]
+    cf_ave = cf_acc / (num_samples * np.where(f_ave != 0, f_ave, 1))[..., None]
+    c_ave = cs_ave + cf_ave
+    # add brightness
+    c_ave += brightness
+    # add saturation
+    c_ave = c_ave @ np.array(sat_mat, dtype=np.float32)
+    # store values in brickFreqMatrix and colorMatrix
+    region = tuple(slice(int(s_idx[i]), int(e_idx[i])) for i in range(3))
+    brickFreqMatrix[region] = np.where(alpha < (1 - smokeDensity), 0, 1)
+    colorMatrix[region + (slice(0, 3),)] = c_ave
+    colorMatrix[region + (3,)] = alpha
 
     # mark inside freqs as internal (-1) and outside next to outsides for removal
     adjustBFM(brickFreqMatrix, matShellDepth=cm.matShellDepth, axes=False)
@@ -447,101 +475,101 @@ def getBrickMatrixSmoke(source, faceIdxMatrix, brickShell, source_details, print
     return brickFreqMatrix, colorMatrix
 
 
+def getSmokeSampler(start:int, end:int, startIdx:float, voxelsPerBrick:float, res:int, quality:float):
+    """ returns (bricks x voxels) matrix with 1 for each voxel sampled by each brick along one axis """
+    bricks = np.arange(start, end) - startIdx
+    sampler = np.zeros((len(bricks), res), dtype=np.float32)
+    for i, b in enumerate(bricks.tolist()):
+        n0, n1 = int(voxelsPerBrick * b), int(voxelsPerBrick * (b + 1))
+        n1 += 1 if n1 == n0 else 0
+        step = math.ceil((n1 - n0) / quality)
+        sampler[i, np.clip(np.arange(n0, n1, step), 0, res - 1)] = 1
+    return sampler
+
+
+def resampleSmokeGrid(grid, samplers):
+    """ returns sum of sampled 'grid' voxels for each brick, reducing one axis at a time """
+    samplerX, samplerY, samplerZ = samplers
+    grid = np.tensordot(samplerX, grid, axes=(1, 0))
+    grid = np.tensordot(samplerY, grid, axes=(1, 1)).swapaxes(0, 1)
+    grid = np.tensordot(samplerZ, grid, axes=(1, 2))
+    return np.moveaxis(grid, 0, 2)
+
+
+def getOutsideNeighbors(outside, axis:int):
+    """ returns mask of locations adjacent to an outside location (or the lattice boundary) along axis """
+    padded = np.pad(outside, 1, "constant", constant_values=True)
+    lo = [slice(1, -1)] * 3
+    hi = [slice(1, -1)] * 3
+    lo[axis] = slice(0, -2)
+    hi[axis] = slice(2, None)
+    return padded[tuple(lo)] | padded[tuple(hi)]
+
+
 def adjustBFM(brickFreqMatrix, matShellDepth, faceIdxMatrix=None, axes=""):
     """ adjust brickFreqMatrix values """
-    shellVals = []
-    xL = len(brickFreqMatrix)
-    yL = len(brickFreqMatrix[0])
-    zL = len(brickFreqMatrix[0][0])
+    axes = axes or ""
+    outside = brickFreqMatrix == 0
+    nearOutside = [getOutsideNeighbors(outside, i) for i in range(3)]
+    # if current location is inside (-1) and adjacent location is out of bounds or outside, current location is shell (1)
     if axes != "xyz":
-        for x in range(xL):
-            for y in range(yL):
-                for z in range(zL):
-                    # if current location is inside (-1) and adjacent location is out of bounds, current location is shell (1)
-                    if (brickFreqMatrix[x][y][z] == -1 and
-                        (("z" not in axes and
-                          (z in (0, zL-1) or
-                           brickFreqMatrix[x][y][z+1] == 0 or
-                           brickFreqMatrix[x][y][z-1] == 0)) or
-                         ("y" not in axes and
-                          (y in (0, yL-1) or
-                           brickFreqMatrix[x][y+1][z] == 0 or
-                           brickFreqMatrix[x][y-1][z] == 0)) or
-                         ("x" not in axes and
-                          (x in (0, xL-1) or
-                           brickFreqMatrix[x+1][y][z] == 0 or
-                           brickFreqMatrix[x-1][y][z] == 0))
-                      )):
-                        brickFreqMatrix[x][y][z] = 1
-                        # TODO: set faceIdxMatrix value to nearest shell value using some sort of built in nearest poly to point function
-
-    # # iterate through all values except boundaries
-    # for x in range(1, xL - 1):
-    #     for y in range(1, yL - 1):
-    #         for z in range(1, zL - 1):
-    #             # If inside location (-1) intersects outside location (0), make it ouside (0)
-    #             if (brickFreqMatrix[x][y][z] == -1 and
-    #                 (brickFreqMatrix[x+1][y][z] == 0 or
-    #                  brickFreqMatrix[x-1][y][z] == 0 or
-    #                  brickFreqMatrix[x][y+1][z] == 0 or
-    #                  brickFreqMatrix[x][y-1][z] == 0 or
-    #                  brickFreqMatrix[x][y][z+1] == 0 or
-    #                  brickFreqMatrix[x][y][z-1] == 0)):
-    #                 brickFreqMatrix[x][y][z] = 0
-
-    # iterate through all values except boundaries
-    for x in range(1, xL - 1):
-        for y in range(1, yL - 1):
-            for z in range(1, zL - 1):
-                # If shell location (1) does not intersect outside location (0), make it inside (-1)
-                if brickFreqMatrix[x][y][z] == 1:
-                    if (brickFreqMatrix[x+1][y][z] != 0 and
-                        brickFreqMatrix[x-1][y][z] != 0 and
-                        brickFreqMatrix[x][y+1][z] != 0 and
-                        brickFreqMatrix[x][y-1][z] != 0 and
-                        brickFreqMatrix[x][y][z+1] != 0 and
-                        brickFreqMatrix[x][y][z-1] != 0):
-                        brickFreqMatrix[x][y][z] = -1
-                    else:
-                        shellVals.append((x, y, z))
-
-    # mark outside and unused inside brickFreqMatrix values for removal
-    for x in range(xL):
-        for y in range(yL):
-            for z in range(zL):
-                if brickFreqMatrix[x][y][z] == 0:
-                    brickFreqMatrix[x][y][z] = None
+        exposed = np.zeros(brickFreqMatrix.shape, dtype=bool)
+        for i, a in enumerate("xyz"):
+            if a not in axes:
+                exposed |= nearOutside[i]
+        brickFreqMatrix[(brickFreqMatrix == -1) & exposed] = 1
+        # TODO: set faceIdxMatrix value to nearest shell value using some sort of built in nearest poly to point function
+
+    # If shell location (1) does not intersect outside location (0), make it inside (-1) (ignoring boundaries)
+    interior = np.zeros(brickFreqMatrix.shape, dtype=bool)
+    interior[1:-1, 1:-1, 1:-1] = True
+    shell = (brickFreqMatrix == 1) & interior
+    nearOutside = nearOutside[0] | nearOutside[1] | nearOutside[2]
+    brickFreqMatrix[shell & ~nearOutside] = -1
+
+    # outside brickFreqMatrix values (0) are left out of the bricksDict
 
     # Update internals
+    updateInternals(brickFreqMatrix, matShellDepth, faceIdxMatrix=faceIdxMatrix)
+
+
+def updateInternals(brickFreqMatrix, matShellDepth, faceIdxMatrix=None, maxDepth=50):
+    """ set inside brickFreqMatrix values (-1) to their distance from the shell (1 - bricks away / 100)
+
+    multi-source breadth first search from all shell locations, visiting each location once. Inside
+    locations within 'matShellDepth' of the shell get the nearest face of the shell location they were
+    reached from (used for source materials).
+
+    """
+    shape = brickFreqMatrix.shape
+    strides = (shape[1] * shape[2], shape[2], 1)
+    bfm = brickFreqMatrix.reshape(-1)
+    shellVals = np.flatnonzero(bfm == 1)
     j = 1
     setNF = True
-    for i in range(50):
-        continue
+    for i in range(maxDepth):
+        if len(shellVals) == 0:
+            break
         j = round(j-0.01, 2)
-        gotOne = False
-        newShellVals = []
         if setNF:
             setNF = (1 - j) * 100 < matShellDepth
-        for x, y, z in shellVals:
-            idxsToCheck = ((x+1, y, z),
-                           (x-1, y, z),
-                           (x, y+1, z),
-                           (x, y-1, z),
-                           (x, y, z+1),
-                           (x, y, z-1))
-            for idx in idxsToCheck:
-                # print("*"*25)
-                # print(str(idx))
-                # print(str(len(brickFreqMatrix)), str(len(brickFreqMatrix[0])), str(len(brickFreqMatrix[0][0])))
-                # print("*"*25)
-                curVal = brickFreqMatrix[idx[0]][idx[1]][idx[2]]
-                if curVal == -1:
-                    newShellVals.append(idx)
-                    brickFreqMatrix[idx[0]][idx[1]][idx[2]] = j
-                    if faceIdxMatrix and setNF: faceIdxMatrix[idx[0]][idx[1]][idx[2]] = faceIdxMatrix[x][y][z]
-                    gotOne = True
-        if not gotOne:
-            break
+        # get inside locations adjacent to current shell values
+        coords = np.unravel_index(shellVals, shape)
+        newShellVals = []
+        sources = []
+        for axis in range(3):
+            for step in (1, -1):
+                inBounds = (coords[axis] + step >= 0) & (coords[axis] + step < shape[axis])
+                idxs = shellVals[inBounds] + step * strides[axis]
+                inside = bfm[idxs] == -1
+                newShellVals.append(idxs[inside])
+                sources.append(shellVals[inBounds][inside])
+        newShellVals, first = np.unique(np.concatenate(newShellVals), return_index=True)
+        sources = np.concatenate(sources)[first]
+        # set distance from shell (and nearest face) for new shell values
+        bfm[newShellVals] = j
+        if faceIdxMatrix is not None and setNF:
+            faceIdxMatrix.copyFlat(newShellVals, sources)
         shellVals = newShellVals
 
 
@@ -601,6 +629,82 @@ def createBricksDictEntry(name:str, loc:list, val:float=0, draw:bool=False, co:t
             "created_from":created_from,
            }
 
+def getSourceLattice(source, source_details, brickScale):
+    """ returns lattice coordinate matrix surrounding source """
+    lScale = source_details.dist
+    offset = source_details.mid
+    if source.parent:
+        offset = offset - source.parent.location
+    # get coordinate list from intersections of edges with faces
+    return generateLattice(brickScale, lScale, offset)
+
+
+def addBricksDictEntries(bricksDict, source, source_details, coordMatrix, brickFreqMatrix, faceIdxMatrix, smokeColors=None, start=(0, 0, 0)):
+    """ create bricksDict entries for locations with non-zero brickFreqMatrix values (returns keys of created entries)
+    coordMatrix -- lattice coordinate matrix surrounding source
+    start       -- lattice location of index (0, 0, 0) in brickFreqMatrix, faceIdxMatrix and smokeColors
+    """
+    scn, cm, n = getActiveContextInfo()
+    threshold = getThreshold(cm)
+    brickType = cm.brickType  # prevents cm.brickType update function from running over and over in for loop
+    uvImage = cm.uvImage
+    offset = source_details.mid - source.parent.location if source.parent else source_details.mid
+    noOffset = vec_round(offset, precision=5) == Vector((0, 0, 0))
+    # get uv_texture image and pixels for material calculation
+    uv_images = getUVImages(source)
+    # iterate through locations not marked for removal (brickFreqMatrix value of 0)
+    locs = np.argwhere(brickFreqMatrix != 0).tolist()
+    vals = brickFreqMatrix[brickFreqMatrix != 0].tolist()
+    # sample uv image colors at nearest face intersections for all locations at once
+    if smokeColors is None:
+        faceIdxs = faceIdxMatrix.idx[brickFreqMatrix != 0]
+        hasFace = np.flatnonzero(faceIdxs != -1)
+        rgbas = [None] * len(locs)
+        faceRGBAs = getUVPixelColors(scn, source, faceIdxs[hasFace], faceIdxMatrix.loc[brickFreqMatrix != 0][hasFace], uv_images, uvImage) if uv_images else []
+        for i, rgba in zip(hasFace.tolist(), faceRGBAs):
+            rgbas[i] = rgba
+    sx, sy, sz = start
+    keys = []
+    for i, ((x, y, z), val) in enumerate(zip(locs, vals)):
+        # initialize variables
+        bKey = listToStr((x + sx, y + sy, z + sz))
+        # vals are stored in hundredths (distance from shell)
+        val = round(val, 2)
+
+        co = coordMatrix.co(x + sx, y + sy, z + sz)
+        co = co.to_tuple() if noOffset else (co - source_details.mid).to_tuple()
+
+        # get material from nearest face intersection point
+        nearestFace = faceIdxMatrix[x, y, z]
+        nf = nearestFace["idx"] if nearestFace is not None else None
+        ni = nearestFace["loc"].to_tuple() if nearestFace is not None else None
+        nn = nearestFace["normal"] if nearestFace is not None else None
+        norm_dir = getNormalDirection(nn, slopes=True)
+        bType = getBrickType(brickType)
+        flipped, rotated = getFlipRot("" if norm_dir is None else norm_dir[1:])
+        rgba = smokeColors[x, y, z].tolist() if smokeColors is not None else rgbas[i]
+        draw = val >= threshold
+        # create bricksDict entry for current brick
+        bricksDict[bKey] = createBricksDictEntry(
+            name= 'Bricker_%(n)s_brick__%(bKey)s' % locals(),
+            loc= [x + sx, y + sy, z + sz],
+            val= val,
+            draw= draw,
+            co= co,
+            near_face= nf,
+            near_intersection= ni,
+            near_normal= norm_dir,
+            rgba= rgba,
+            # mat_name= "",  # defined in 'updateMaterials' function
+            # obscures= [val != 0]*6,
+            bType= bType,
+            flipped= flipped,
+            rotated= rotated,
+        )
+        keys.append(bKey)
+    return keys
+
+
 @timed_call('Time Elapsed')
 def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=False):
     """ make dictionary with brick information at each coordinate of lattice surrounding source
@@ -612,18 +716,11 @@ def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=
     scn, cm, n = getActiveContextInfo()
     # get lattice bmesh
     print("\ngenerating blueprint...")
-    lScale = source_details.dist
-    offset = source_details.mid
-    if source.parent:
-        offset = offset - source.parent.location
-    # get coordinate list from intersections of edges with faces
-    coordMatrix = generateLattice(brickScale, lScale, offset)
-    if len(coordMatrix) == 0:
-        coordMatrix.append(source_details.mid)
+    coordMatrix = getSourceLattice(source, source_details, brickScale)
     # set calculationAxes
     calculationAxes = cm.calculationAxes if cm.brickShell != "INSIDE" else "XYZ"
     # set up faceIdxMatrix and brickFreqMatrix
-    faceIdxMatrix = np.zeros((len(coordMatrix), len(coordMatrix[0]), len(coordMatrix[0][0])), dtype=int).tolist()
+    faceIdxMatrix = FaceIdxMatrix(coordMatrix.shape)
     if cm.isSmoke:
         brickFreqMatrix, smokeColors = getBrickMatrixSmoke(origSource, faceIdxMatrix, cm.brickShell, source_details, cursorStatus=cursorStatus)
     else:
@@ -633,59 +730,67 @@ def makeBricksDict(source, source_details, brickScale, origSource, cursorStatus=
     cm.activeKey = (-1, -1, -1)
 
     # create bricks dictionary with brickFreqMatrix values
-    bricksDict = {}
-    threshold = getThreshold(cm)
-    brickType = cm.brickType  # prevents cm.brickType update function from running over and over in for loop
-    uvImage = cm.uvImage
-    noOffset = vec_round(offset, precision=5) == Vector((0, 0, 0))
-    # get uv_texture image and pixels for material calculation
-    uv_images = getUVImages(source)
-    for x in range(len(coordMatrix)):
-        for y in range(len(coordMatrix[0])):
-            for z in range(len(coordMatrix[0][0])):
-                # skip brickFreqMatrix values set to None
-                if brickFreqMatrix[x][y][z] is None:
-                    continue
-
-                # initialize variables
-                bKey = listToStr((x, y, z))
-
-                co = coordMatrix[x][y][z].to_tuple() if noOffset else (coordMatrix[x][y][z] - source_details.mid).to_tuple()
-
-                # get material from nearest face intersection point
-                nf = faceIdxMatrix[x][y][z]["idx"] if type(faceIdxMatrix[x][y][z]) == dict else None
-                ni = faceIdxMatrix[x][y][z]["loc"].to_tuple() if type(faceIdxMatrix[x][y][z]) == dict else None
-                nn = faceIdxMatrix[x][y][z]["normal"] if type(faceIdxMatrix[x][y][z]) == dict else None
-                norm_dir = getNormalDirection(nn, slopes=True)
-                bType = getBrickType(brickType)
-                flipped, rotated = getFlipRot("" if norm_dir is None else norm_dir[1:])
-                rgba = smokeColors[x][y][z] if smokeColors else getUVPixelColor(scn, source, nf, ni if ni is None else Vector(ni), uv_images, uvImage)
-                draw = brickFreqMatrix[x][y][z] >= threshold
-                # create bricksDict entry for current brick
-                bricksDict[bKey] = createBricksDictEntry(
-                    name= 'Bricker_%(n)s_brick__%(bKey)s' % locals(),
-                    loc= [x, y, z],
-                    val= brickFreqMatrix[x][y][z],
-                    draw= draw,
-                    co= co,
-                    near_face= nf,
-                    near_intersection= ni,
-                    near_normal= norm_dir,
-                    rgba= rgba,
-                    # mat_name= "",  # defined in 'updateMaterials' function
-                    # obscures= [brickFreqMatrix[x][y][z] != 0]*6,
-                    bType= bType,
-                    flipped= flipped,
-                    rotated= rotated,
-                )
+    bricksDict = BricksDictColumns(coordMatrix.shape, namePrefix="Bricker_%(n)s_brick__" % locals(), capacity=max(int(np.count_nonzero(brickFreqMatrix)), 1))
+    addBricksDictEntries(bricksDict, source, source_details, coordMatrix, brickFreqMatrix, faceIdxMatrix, smokeColors)
 
     # if buildIsDirty, this is done in drawBrick
     if not cm.buildIsDirty:
-        # set exposure of brick locs
-        for key in bricksDict.keys():
-            if not bricksDict[key]["draw"]:
-                continue
-            setBrickExposure(bricksDict, key)
+        # set exposure of drawn brick locs
+        setBrickExposures(bricksDict)
 
     # return list of created Brick objects
     return bricksDict
+
+
+def updateBricksDictRegion(bricksDict, source, source_details, brickScale, regionMin, regionMax, cursorStatus=False):
+    """ recompute bricksDict entries near region of source that changed since bricksDict was made
+
+    Only lattice locations near the bounding box 'regionMin'-'regionMax' of changed source faces are ray cast
+    (the lattice must be unchanged, i.e. source bounds are the same). Returns keys of entries to merge and draw
+    again (merge info of these entries is reset) and names of bricks made from the previous entries.
+
+    """
+    scn, cm, n = getActiveContextInfo()
+    coordMatrix = getSourceLattice(source, source_details, brickScale)
+    calculationAxes = cm.calculationAxes if cm.brickShell != "INSIDE" else "XYZ"
+    # shell and internal values change up to shell depth away from changed faces
+    depth = max(math.ceil(cm.shellThickness), cm.matShellDepth) + 1
+    core = coordMatrix.regionSlices(regionMin, regionMax, pad=depth)
+    # cast rays in box padded by shell depth (values near the box boundary are discarded)
+    box = coordMatrix.regionSlices(regionMin, regionMax, pad=2 * depth)
+    faceIdxMatrix = FaceIdxMatrix(tuple(s.stop - s.start for s in box))
+    brickFreqMatrix = getBrickMatrix(source, faceIdxMatrix, coordMatrix.subLattice(box), cm.brickShell, axes=calculationAxes, cursorStatus=cursorStatus)
+    inner = tuple(slice(c.start - b.start, c.stop - b.start) for c, b in zip(core, box))
+    start = tuple(c.start for c in core)
+    zStep = cm.zStep
+    # get keys and names of bricks overlapping region before it is updated
+    coreKeys = [listToStr(loc) for loc in (np.argwhere(np.ones(brickFreqMatrix[inner].shape, dtype=np.bool_)) + start).tolist()]
+    mergedKeys = set()
+    oldBrickNames = []
+    for key in coreKeys:
+        if key not in bricksDict or bricksDict[key]["parent"] is None:
+            continue
+        parentKey = getParentKey(bricksDict, key)
+        if parentKey in mergedKeys:
+            continue
+        parentD = bricksDict[parentKey]
+        if parentD["draw"]:
+            oldBrickNames.append(parentD["name"])
+        mergedKeys.update(k for k in getKeysInBrick(bricksDict, parentD["size"] or [1, 1, zStep], zStep, key=parentKey) if k in bricksDict)
+    # replace entries in region
+    for key in coreKeys:
+        if key in bricksDict:
+            del bricksDict[key]
+    newKeys = addBricksDictEntries(bricksDict, source, source_details, coordMatrix, brickFreqMatrix[inner], faceIdxMatrix.crop(inner), start=start)
+    affectedKeys = [k for k in mergedKeys if k in bricksDict]
+    affectedKeys += [k for k in newKeys if k not in mergedKeys]
+    # reset merge info of entries in affected bricks
+    for key in affectedKeys:
+        brickD = bricksDict[key]
+        brickD["parent"] = None
+        brickD["size"] = None
+        brickD["attempted_merge"] = False
+    # update internal supports and exposures of new entries
+    updateInternal(bricksDict, cm, newKeys)
+    setBrickExposures(bricksDict, affectedKeys)
+    return affectedKeys, oldBrickNames
@@ -26,8 +26,8 @@ from .functions import *
 from ...functions import *
 
 
-def updateMaterials(bricksDict, source, origSource, curFrame=None):
-    """ sets all matNames in bricksDict based on near_face """
+def updateMaterials(bricksDict, source, origSource, curFrame=None, keys=None):
+    """ sets all matNames in bricksDict based on near_face (only for 'keys' if passed, keeping existing materials) """
     scn, cm, n = getActiveContextInfo()
     useUVMap = cm.useUVMap and (len(source.data.uv_layers) > 0 or cm.uvImage is not None)
     if useUVMap:
@@ -36,7 +36,6 @@ def updateMaterials(bricksDict, source, origSource, curFrame=None):
             useUVMap = False
     else:
         uv_images = None
-    rgba_vals = []
     # initialize variables
     isSmoke = cm.isSmoke
     materialType = cm.materialType
@@ -52,29 +51,36 @@ def updateMaterials(bricksDict, source, origSource, curFrame=None):
     ior = cm.colorSnapIOR
     transmission = cm.colorSnapTransmission
     colorSnapAmount = cm.colorSnapAmount
+    rgba_vals = getColorSnapGrid(colorSnap, colorSnapAmount)
     cm_id = cm.id
+    matObj = getMatObject(cm_id, typ="ABS")
     # clear materials
-    mat_name_start = "Bricker_{n}{f}".format(n=n, f="f_%(curFrame)s" % locals() if curFrame else "")
-    for mat in bpy.data.materials:
-        if mat.name.startswith(mat_name_start):
-            bpy.data.materials.remove(mat)
+    if keys is None:
+        mat_name_start = "Bricker_{n}{f}".format(n=n, f="f_%(curFrame)s" % locals() if curFrame else "")
+        for mat in bpy.data.materials:
+            if mat.name.startswith(mat_name_start):
+                bpy.data.materials.remove(mat)
+    # get relevant bricks
+    keys = [key for key in (bricksDict.keys() if keys is None else keys) if bricksDict[key]["draw"] and (isSmoke or bricksDict[key]["near_face"] is not None) and not bricksDict[key]["custom_mat_name"]]
+    # sample uv image colors at nearest face intersections for all bricks at once
+    if uv_images and not isSmoke:
+        uvRGBAs = getUVPixelColors(scn, source, [bricksDict[key]["near_face"] for key in keys], [bricksDict[key]["near_intersection"] for key in keys], uv_images, uvImage)
     # get original matNames, and populate rgba_vals
-    for key in bricksDict.keys():
-        # skip irrelevant bricks
-        nf = bricksDict[key]["near_face"]
-        if not bricksDict[key]["draw"] or (nf is None and not isSmoke) or bricksDict[key]["custom_mat_name"]:
-            continue
+    for i, key in enumerate(keys):
         # get RGBA value at nearest face intersection
         if isSmoke:
             rgba = bricksDict[key]["rgba"]
             matName = ""
+        elif uv_images:
+            rgba = uvRGBAs[i]
+            matName = ""
         else:
+            nf = bricksDict[key]["near_face"]
             ni = Vector(bricksDict[key]["near_intersection"])
             rgba, matName = getBrickRGBA(scn, source, nf, ni, uv_images, uvImage)
 
         if materialType == "SOURCE":
             # get material with snapped RGBA value
-            matObj = getMatObject(cm_id, typ="ABS")
             if rgba is None and useUVMap:
                 matName = ""
             elif rgba is None and matName in getColors().keys():
@@ -84,7 +90,7 @@ def updateMaterials(bricksDict, source, origSource, curFrame=None):
             elif colorSnap == "RGB" or isSmoke or useUVMap:
                 matName = createNewMaterial(n, rgba, rgba_vals, sss, sat_mat, specular, roughness, ior, transmission, colorSnap, colorSnapAmount, includeTransparency, curFrame)
             if rgba is not None:
-                rgba_vals.append(rgba)
+                rgba_vals.add(rgba)
         elif materialType == "CUSTOM":
             matName = cm.customMat.name
         bricksDict[key]["mat_name"] = matName
@@ -92,7 +98,7 @@ def updateMaterials(bricksDict, source, origSource, curFrame=None):
 
 
 def updateBrickSizes(bricksDict, key, availableKeys, loc, brickSizes, zStep, maxL, height3Only, legalBricksOnly, mergeInternals, materialType, mergeVertical=False, tallType="BRICK", shortType="PLATE"):
-    """ update 'brickSizes' with available brick sizes surrounding bricksDict[key] """
+    """ update 'brickSizes' with available brick sizes surrounding bricksDict[key] ('availableKeys' should be a set) """
     if not mergeVertical:
         maxL[2] = 1
     newMax1 = maxL[1]
@@ -105,7 +111,7 @@ def updateBrickSizes(bricksDict, key, availableKeys, loc, brickSizes, zStep, max
             if j >= newMax1: break
             # break case 2
             key1 = listToStr((loc[0] + i, loc[1] + j, loc[2]))
-            if not brickAvail(bricksDict, key, key1, mergeInternals in ["BOTH, HORIZONTAL"], materialType) or key1 not in availableKeys:
+            if key1 not in availableKeys or not brickAvail(bricksDict, key, key1, mergeInternals in ["BOTH, HORIZONTAL"], materialType):
                 if j == 0: breakOuter2 = True
                 else:      newMax1 = j
                 break
@@ -115,7 +121,7 @@ def updateBrickSizes(bricksDict, key, availableKeys, loc, brickSizes, zStep, max
                 if k >= newMax2: break
                 # break case 2
                 key2 = listToStr((loc[0] + i, loc[1] + j, loc[2] + k))
-                if not brickAvail(bricksDict, key, key2, mergeInternals  in ["BOTH, VERTICAL"], materialType) or key2 not in availableKeys:
+                if key2 not in availableKeys or not brickAvail(bricksDict, key, key2, mergeInternals  in ["BOTH, VERTICAL"], materialType):
                     if k == 0: breakOuter1 = True
                     else:      newMax2 = k
                     break
@@ -135,6 +141,9 @@ def updateBrickSizes(bricksDict, key, availableKeys, loc, brickSizes, zStep, max
 
 def attemptMerge(bricksDict, key, availableKeys, defaultSize, zStep, randState, brickType, maxWidth, maxDepth, legalBricksOnly, mergeInternals, materialType, preferLargest=False, mergeVertical=True, targetType=None, height3Only=False):
     """ attempt to merge bricksDict[key] with adjacent bricks """
+    # check availability with constant time lookups
+    if not isinstance(availableKeys, (set, frozenset)):
+        availableKeys = set(availableKeys)
     # get loc from key
     loc = getDictLoc(bricksDict, key)
     brickSizes = [defaultSize]
@@ -0,0 +1,109 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+from collections.abc import Mapping, MutableMapping
+
+# Blender imports
+# NONE!
+
+# Addon imports
+# NONE!
+
+
+class BricksDictOverlay(Mapping):
+    """ copy-on-write view of a subset of bricksDict entries
+
+    Reads fall through to 'base' for keys in 'keys'; field assignments are recorded in the overlay
+    only, and can be written back to 'base' with 'commit'
+
+    """
+
+    def __init__(self, base, keys):
+        self.base = base
+        self.keySet = keys
+        self.changes = {}
+
+    def __getitem__(self, key:str):
+        if key not in self.keySet:
+            raise KeyError(key)
+        return OverlayEntryView(self, key)
+
+    def __contains__(self, key:str):
+        return key in self.keySet
+
+    def __iter__(self):
+        return iter(self.keySet)
+
+    def __len__(self):
+        return len(self.keySet)
+
+    def getField(self, key:str, field:str):
+        changes = self.changes.get(key)
+        if changes is not None and field in changes:
+            return changes[field]
+        value = self.base[key][field]
+        # copy mutable values so they can't be changed in base through the overlay
+        return value.copy() if isinstance(value, list) else value
+
+    def setField(self, key:str, field:str, value):
+        self.changes.setdefault(key, {})[field] = value
+
+    def commit(self):
+        """ write changed fields to base bricksDict """
+        for key, changes in self.changes.items():
+            brickD = self.base[key]
+            for field, value in changes.items():
+                brickD[field] = value
+        self.changes = {}
+
+
+class OverlayEntryView(MutableMapping):
+    """ dictionary-like view of a single bricksDict entry in 'BricksDictOverlay' """
+
+    __slots__ = ("overlay", "key")
+
+    def __init__(self, overlay:BricksDictOverlay, key:str):
+        self.overlay = overlay
+        self.key = key
+
+    def __getitem__(self, field:str):
+        return self.overlay.getField(self.key, field)
+
+    def __setitem__(self, field:str, value):
+        self.overlay.setField(self.key, field, value)
+
+    def __delitem__(self, field:str):
+        raise KeyError("cannot remove field '%(field)s' from bricksDict overlay entry" % locals())
+
+    def __iter__(self):
+        fields = list(self.overlay.base[self.key])
+        yield from fields
+        yield from (f for f in self.overlay.changes.get(self.key, ()) if f not in fields)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+    def copy(self):
+        return self.toDict()
+
+    def toDict(self):
+        """ returns entry as dictionary """
+        return {field: self[field] for field in self}
@@ -0,0 +1,265 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+from bisect import bisect_left
+import multiprocessing
+import numpy as np
+
+# Blender imports
+from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+# Addon imports
+from ...functions.common import *
+
+
+def getMeshData(obj):
+    """ returns vertex coordinates, polygon vertex indices and polygon normals of obj mesh (local space) """
+    mesh = obj.data
+    # get vertex coordinates
+    verts = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", verts)
+    # get polygon vertex indices
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVerts)
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    loopVerts = loopVerts.tolist()
+    polys = [loopVerts[s:s + t] for s, t in zip(loopStarts.tolist(), loopTotals.tolist())]
+    # get polygon normals
+    normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    mesh.polygons.foreach_get("normal", normals)
+    return verts.reshape(-1, 3).tolist(), polys, normals.reshape(-1, 3).tolist()
+
+
+def castLine(bvh, start:Vector, axis:int, miniDist:float, sign:int=1):
+    """ returns list of (location, face index) for all intersections from 'start' along axis (sign: 1 or -1) """
+    direction = Vector((0, 0, 0))
+    direction[axis] = sign
+    miniDist = direction * miniDist
+    roundType = "CEILING" if sign > 0 else "FLOOR"
+    hits = []
+    orig = start
+    while True:
+        location, _, index, _ = bvh.ray_cast(orig, direction)
+        if index is None:
+            break
+        hits.append((location, index))
+        orig = VectorRound(location, 5, roundType=roundType) + miniDist
+    return hits
+
+
+# worker process state (set once per process by '_initLineWorker')
+_workerBVH = None
+_workerSettings = None
+
+
+def _initLineWorker(meshData:tuple, miniDist:float, castDoubleCheckRays:bool):
+    """ build BVH tree from serialized source mesh once for this worker process """
+    global _workerBVH, _workerSettings
+    verts, polys, _ = meshData
+    _workerBVH = BVHTree.FromPolygons(verts, polys)
+    _workerSettings = (miniDist, castDoubleCheckRays)
+
+
+def _castSlabLines(lines:list):
+    """ cast rays along all lattice rows in slab; returns list of (key, hits, hitsBefore) with serializable hits """
+    miniDist, castDoubleCheckRays = _workerSettings
+    results = []
+    for key, start in lines:
+        axis = key[0]
+        start = Vector(start)
+        hits = castLine(_workerBVH, start, axis, miniDist)
+        hitsBefore = castLine(_workerBVH, start, axis, miniDist, sign=-1) if castDoubleCheckRays else []
+        results.append((key, [(loc.to_tuple(), idx) for loc, idx in hits], [(loc.to_tuple(), idx) for loc, idx in hitsBefore]))
+    return results
+
+
+def parallelShellSupported():
+    """ worker processes must be forked so they can use mathutils without launching Blender """
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+class ScanlineCaster:
+    """ ray caster collecting every intersection along a lattice row with a single chain of casts
+
+    Results for each lattice location are derived from the sorted hits along its row, and match
+    the per-location results of 'castRays'/'rayObjIntersections' in generate.py
+
+    """
+
+    def __init__(self, meshData:tuple, coordMatrix, useNormals:bool, insidenessRayCastDir:str, castDoubleCheckRays:bool, miniDist:float=0.00015):
+        verts, polys, normals = meshData
+        self.meshData = meshData
+        self.bvh = BVHTree.FromPolygons(verts, polys)
+        self.normals = [Vector(n) for n in normals]
+        self.coordMatrix = coordMatrix
+        self.axisCoords = [coordMatrix.axisCoords(i).tolist() for i in range(3)]
+        self.useNormals = useNormals
+        self.insidenessRayCastDir = insidenessRayCastDir
+        self.castDoubleCheckRays = castDoubleCheckRays
+        self.miniDist = miniDist
+        self.lines = {}
+
+    ################################################
+    # scanline methods
+
+    @staticmethod
+    def getLineKey(loc:tuple, axis:int):
+        """ returns key for row along 'axis' passing through lattice location 'loc' """
+        return (axis, loc[(axis + 1) % 3], loc[(axis + 2) % 3])
+
+    def getLineStart(self, key:tuple):
+        """ returns coordinate of first lattice location in row with 'key' """
+        axis = key[0]
+        loc = [0, 0, 0]
+        loc[(axis + 1) % 3] = key[1]
+        loc[(axis + 2) % 3] = key[2]
+        return self.coordMatrix.co(*loc)
+
+    def storeLine(self, key:tuple, hits:list, hitsBefore:list):
+        """ store (positions, hits, hitsBefore) for row with 'key', where hits are (location, face index, normal) """
+        hits = [(Vector(loc), idx, self.normals[idx]) for loc, idx in hits]
+        hitsBefore = [(Vector(loc), idx, self.normals[idx]) for loc, idx in hitsBefore]
+        positions = [hit[0][key[0]] for hit in hits]
+        line = (positions, hits, hitsBefore)
+        self.lines[key] = line
+        return line
+
+    def getLineHits(self, key:tuple):
+        """ returns (positions, hits, hitsBefore) for row with 'key', casting rays along it if not yet cached """
+        line = self.lines.get(key)
+        if line is None:
+            axis = key[0]
+            start = self.getLineStart(key)
+            hits = castLine(self.bvh, start, axis, self.miniDist)
+            # intersections before the first lattice location (for insideness double check)
+            hitsBefore = castLine(self.bvh, start, axis, self.miniDist, sign=-1) if self.castDoubleCheckRays else []
+            line = self.storeLine(key, hits, hitsBefore)
+        return line
+
+    def castLinesInParallel(self, axes:str, processes:int, slabsPerProcess:int=4):
+        """ cast rays along all lattice rows for 'axes' in pool of worker processes, split into slabs along Z
+
+        Rows along X and Y are grouped by their Z index and rows along Z by their X index. Each worker
+        builds its own BVH tree from a serialized copy of the source mesh.
+
+        """
+        if processes < 2 or not parallelShellSupported():
+            return
+        xL, yL, zL = self.coordMatrix.shape
+        # get slab index and row keys for every row to cast
+        slabLines = {}
+        for axis in (0, 1, 2):
+            if "XYZ"[axis] not in axes.upper():
+                continue
+            slabAxis = 0 if axis == 2 else 2
+            for i in range(self.coordMatrix.shape[(axis + 1) % 3]):
+                for j in range(self.coordMatrix.shape[(axis + 2) % 3]):
+                    key = (axis, i, j)
+                    if key in self.lines:
+                        continue
+                    slabIdx = i if slabAxis == (axis + 1) % 3 else j
+                    slabLines.setdefault((slabAxis, slabIdx), []).append((key, self.getLineStart(key).to_tuple()))
+        if len(slabLines) == 0:
+            return
+        # split rows into slabs of neighboring layers
+        numSlabs = min(len(slabLines), processes * slabsPerProcess)
+        slabs = [[] for _ in range(numSlabs)]
+        for idx, slabKey in enumerate(sorted(slabLines)):
+            slabs[idx * numSlabs // len(slabLines)] += slabLines[slabKey]
+        # cast rays in worker processes and merge results
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(processes, initializer=_initLineWorker, initargs=(self.meshData, self.miniDist, self.castDoubleCheckRays)) as pool:
+            for results in pool.imap_unordered(_castSlabLines, slabs):
+                for key, hits, hitsBefore in results:
+                    self.storeLine(key, hits, hitsBefore)
+
+    ################################################
+    # per-location methods
+
+    def castRays(self, loc:tuple, axis:int, edgeLen:float=0):
+        """ returns same values as 'castRays' in generate.py for ray from 'loc' along +axis """
+        positions, hits, _ = self.getLineHits(self.getLineKey(loc, axis))
+        point = self.coordMatrix.co(*loc)
+        k = bisect_left(positions, self.axisCoords[axis][loc[axis]])
+        intersections = len(hits) - k
+        firstDirection = hits[k][2][axis] if intersections > 0 else False
+        if edgeLen == 0:
+            return intersections, firstDirection
+        firstIntersection = None
+        lastIntersection = None
+        nextIntersection = hits[k][0].copy() if intersections > 0 else None
+        edgeLen2 = edgeLen * 1.00001
+        # get first and last intersection within edgeLen
+        for location, index, normal in hits[k:]:
+            dist = (location - point).length
+            if dist > edgeLen2:
+                break
+            if firstIntersection is None:
+                firstIntersection = {"idx":index, "dist":dist, "loc":location, "normal":normal}
+            lastIntersection = {"idx":index, "dist":edgeLen - dist, "loc":location, "normal":normal}
+        edgeIntersects = firstIntersection is not None
+        return intersections, firstDirection, firstIntersection, nextIntersection, lastIntersection, edgeIntersects
+
+    def castRaysBackward(self, loc:tuple, axis:int):
+        """ returns (intersections, firstDirection) for ray from 'loc' along -axis """
+        positions, hits, hitsBefore = self.getLineHits(self.getLineKey(loc, axis))
+        k = bisect_left(positions, self.axisCoords[axis][loc[axis]])
+        intersections = k + len(hitsBefore)
+        if k > 0:
+            firstDirection = -hits[k - 1][2][axis]
+        elif len(hitsBefore) > 0:
+            firstDirection = -hitsBefore[0][2][axis]
+        else:
+            firstDirection = False
+        return intersections, firstDirection
+
+    def isOutside(self, loc:tuple, axis:int, count:int=None, firstDirection:float=None):
+        """ returns 1 if 'loc' is outside based on rays cast along axis, else 0 """
+        if count is None:
+            count, firstDirection = self.castRays(loc, axis)
+        if count % 2 == 0 and not (self.useNormals and firstDirection > 0):
+            return 1
+        elif self.castDoubleCheckRays:
+            # double check vert is inside mesh
+            count, firstDirection = self.castRaysBackward(loc, axis)
+            if count % 2 == 0 and not (self.useNormals and firstDirection > 0):
+                return 1
+        return 0
+
+    def rayObjIntersections(self, loc:tuple, axis:int, edgeLen:float):
+        """ returns same values as 'rayObjIntersections' in generate.py for lattice location 'loc' """
+        insidenessRayCastDir = self.insidenessRayCastDir
+        outsideL = []
+        axes = "XYZ"[axis:] + "XYZ"[:axis]
+        # run initial intersection check
+        intersections, firstDirection, firstIntersection, nextIntersection, lastIntersection, edgeIntersects = self.castRays(loc, axis, edgeLen=edgeLen)
+        if insidenessRayCastDir == "HIGH EFFICIENCY" or axes[0] in insidenessRayCastDir:
+            outsideL.append(self.isOutside(loc, axis, intersections, firstDirection))
+        # run more checks
+        if insidenessRayCastDir != "HIGH EFFICIENCY":
+            for a in axes[1:]:
+                if a in insidenessRayCastDir:
+                    outsideL.append(self.isOutside(loc, "XYZ".index(a)))
+        # find average of outsideL and set outside accordingly (<0.5 is False, >=0.5 is True)
+        outside = sum(outsideL)/len(outsideL) >= 0.5
+        # return helpful information
+        return not outside, edgeIntersects, intersections, nextIntersection, firstIntersection, lastIntersection
@@ -0,0 +1,122 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import numpy as np
+
+# Blender imports
+from mathutils import Vector
+
+# Addon imports
+from .columns import BricksDictColumns
+from ..caches import bricker_source_mesh_cache
+
+# multipliers for mixing vertex coordinate bits into face hashes
+FACE_HASH_PRIMES = np.array([0x9E3779B185EBCA87, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+
+def getFaceHashes(mesh):
+    """ returns dictionary with hash, min and max coordinate of each face of mesh (numpy arrays) """
+    numPolys = len(mesh.polygons)
+    cos = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", cos)
+    cos = cos.reshape(-1, 3)
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVerts)
+    loopStarts = np.empty(numPolys, dtype=np.int32)
+    loopTotals = np.empty(numPolys, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    if numPolys == 0:
+        return {"hashes": np.zeros(0, dtype=np.uint64), "mins": np.zeros((0, 3), dtype=np.float32), "maxs": np.zeros((0, 3), dtype=np.float32)}
+    # get loops of each face in order (offsets of first loop of each face)
+    offsets = np.cumsum(loopTotals) - loopTotals
+    loopPos = np.arange(int(loopTotals.sum())) - np.repeat(offsets, loopTotals)
+    loops = np.repeat(loopStarts, loopTotals) + loopPos
+    faceCos = cos[loopVerts[loops]]
+    # mix coordinate bits of each loop (weighted by position in face) and sum for each face
+    bits = faceCos.view(np.uint32).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        loopHashes = (bits * FACE_HASH_PRIMES).sum(axis=1) * (2 * loopPos.astype(np.uint64) + 1)
+        loopHashes ^= loopHashes >> np.uint64(29)
+        hashes = np.add.reduceat(loopHashes, offsets)
+    return {"hashes": hashes,
+            "mins": np.minimum.reduceat(faceCos, offsets, axis=0),
+            "maxs": np.maximum.reduceat(faceCos, offsets, axis=0)}
+
+
+def getSourceFaceHashes(cm, mesh):
+    """ returns 'getFaceHashes' for mesh of source duplicate (cached for the last brickified source mesh) """
+    cacheKey = (mesh.name, len(mesh.vertices), len(mesh.polygons))
+    cached = bricker_source_mesh_cache.get(cm.id)
+    if cached is not None and cached[0] == cacheKey:
+        return cached[1]
+    faceHashes = getFaceHashes(mesh)
+    storeSourceFaceHashes(cm, mesh, faceHashes)
+    return faceHashes
+
+
+def storeSourceFaceHashes(cm, mesh, faceHashes):
+    """ store 'getFaceHashes' for mesh of source duplicate """
+    bricker_source_mesh_cache[cm.id] = ((mesh.name, len(mesh.vertices), len(mesh.polygons)), faceHashes)
+
+
+def getChangedRegion(oldFaces, newFaces):
+    """ returns bounding box (min, max) of faces added or removed between face hashes 'oldFaces' and 'newFaces' (None if unchanged) """
+    oldChanged = ~np.isin(oldFaces["hashes"], newFaces["hashes"])
+    newChanged = ~np.isin(newFaces["hashes"], oldFaces["hashes"])
+    if not oldChanged.any() and not newChanged.any():
+        return None
+    mins = np.concatenate((oldFaces["mins"][oldChanged], newFaces["mins"][newChanged]))
+    maxs = np.concatenate((oldFaces["maxs"][oldChanged], newFaces["maxs"][newChanged]))
+    return Vector(mins.min(axis=0).tolist()), Vector(maxs.max(axis=0).tolist())
+
+
+def getFaceBounds(faceHashes):
+    """ returns bounding box (min, max) of faces from 'getFaceHashes' (None if no faces) """
+    if len(faceHashes["hashes"]) == 0:
+        return None
+    return Vector(faceHashes["mins"].min(axis=0).tolist()), Vector(faceHashes["maxs"].max(axis=0).tolist())
+
+
+def getFaceMap(oldFaces, newFaces):
+    """ returns new face index for each old face with identical hash (-1 if face was changed) """
+    if len(newFaces["hashes"]) == 0:
+        return np.full(len(oldFaces["hashes"]), -1, dtype=np.int32)
+    order = np.argsort(newFaces["hashes"], kind="stable")
+    sortedHashes = newFaces["hashes"][order]
+    idxs = np.searchsorted(sortedHashes, oldFaces["hashes"]).clip(0, len(order) - 1)
+    found = sortedHashes[idxs] == oldFaces["hashes"]
+    return np.where(found, order[idxs], -1).astype(np.int32)
+
+
+def remapNearFaces(bricksDict, faceMap):
+    """ update 'near_face' of bricksDict entries from old to new source face indices ('faceMap' from 'getFaceMap') """
+    if np.array_equal(faceMap, np.arange(len(faceMap))):
+        return
+    if isinstance(bricksDict, BricksDictColumns):
+        rows = bricksDict.aliveRows()
+        nearFaces = bricksDict.getColumn("near_face")[rows]
+        hasFace = (nearFaces >= 0) & (nearFaces < len(faceMap))
+        bricksDict.setColumnRows("near_face", rows[hasFace], faceMap[nearFaces[hasFace]])
+        return
+    for brickD in bricksDict.values():
+        nf = brickD["near_face"]
+        if nf is None or nf >= len(faceMap):
+            continue
+        newNF = int(faceMap[nf])
+        brickD["near_face"] = None if newNF == -1 else newNF
@@ -16,7 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 # System imports
+import base64
 import json
+import struct
+import zlib
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
 
 # Blender imports
 import bpy
@@ -25,9 +31,343 @@ import bpy
 from .generate import *
 from .modify import *
 from .functions import *
+from .columns import *
 from ..caches import bricker_bfm_cache, cacheExists
 from ...functions import *
 
+# prefix and version of binary deep cache format (see 'encodeBFMCache')
+BFM_CACHE_PREFIX = "BRKBFM"
+BFM_CACHE_VERSION = 3
+# max number of frames between packed animation frame and the keyframe its changes are stored against
+BFM_KEYFRAME_INTERVAL = 10
+
+
+def getBFMCacheMemoryBudget():
+    """ returns memory budget (in bytes) for decoded animation frames in bricker_bfm_cache """
+    try:
+        return bpy.props.bricker_preferences.bfmCacheMemory * 1024 ** 2
+    except AttributeError:
+        return 512 * 1024 ** 2
+
+
+def getBricksDictSize(bricksDict):
+    """ returns approximate memory size of bricksDict (in bytes) """
+    if isinstance(bricksDict, BricksDictColumns):
+        return bricksDict.memorySize()
+    # rough size of plain dictionary entries
+    return len(bricksDict) * 2048
+
+
+class FrameCache(MutableMapping):
+    """ dictionary of animation frame -> bricksDict, decoding packed frames on first access
+
+    Decoded frames of all frame caches share a least recently used list. When their total size
+    exceeds the 'Animation Cache Memory' preference, the least recently used frames are packed back
+    into compressed data and freed (only recompressed if they changed since being decoded).
+    Frames with identical source geometry can share the bricksDict of another frame (see 'setAlias').
+
+    Packed frames store only the entries changed since a preceding keyframe (see 'bases'), so packed
+    animations grow with the motion of the model rather than its size times the number of frames.
+
+    """
+    _lru = OrderedDict()
+    _lruSize = 0
+
+    def __init__(self, packedFrames:dict=None, aliases:dict=None, bases:dict=None):
+        self.packedFrames = packedFrames or {}
+        self.packedCRCs = {}
+        self.frames = {}
+        self.aliases = aliases or {}
+        # packed frame -> keyframe its packed changes apply to
+        self.bases = bases or {}
+        # last keyframe decoded from packed data (frame, bricksDict)
+        self._lastBase = (None, None)
+
+    def __getitem__(self, frame:str):
+        frame = self.aliases.get(frame, frame)
+        bricksDict = self.frames.get(frame)
+        if bricksDict is None:
+            bricksDict = self._decode(frame)
+            self.frames[frame] = bricksDict
+        self._touch(frame)
+        return bricksDict
+
+    def __setitem__(self, frame:str, bricksDict):
+        self._unalias(frame)
+        self._detachDependents(frame)
+        self.frames[frame] = bricksDict
+        self.packedFrames.pop(frame, None)
+        self.packedCRCs.pop(frame, None)
+        self.bases.pop(frame, None)
+        self._touch(frame, resize=True)
+
+    def __delitem__(self, frame:str):
+        if frame not in self:
+            raise KeyError(frame)
+        if self.aliases.pop(frame, None) is not None:
+            return
+        self._unalias(frame)
+        self._detachDependents(frame)
+        self.frames.pop(frame, None)
+        self.packedFrames.pop(frame, None)
+        self.packedCRCs.pop(frame, None)
+        self.bases.pop(frame, None)
+        entry = FrameCache._lru.pop((id(self), frame), None)
+        if entry is not None:
+            FrameCache._lruSize -= entry[1]
+
+    def __contains__(self, frame):
+        return frame in self.frames or frame in self.packedFrames or frame in self.aliases
+
+    def __iter__(self):
+        yield from self.storedFrames()
+        yield from self.aliases
+
+    def __len__(self):
+        return len(self.frames) + sum(frame not in self.frames for frame in self.packedFrames) + len(self.aliases)
+
+    def storedFrames(self):
+        """ returns frames with their own bricksDict (not aliases of other frames) """
+        return list(self.frames) + [frame for frame in self.packedFrames if frame not in self.frames]
+
+    def setAlias(self, frame:str, srcFrame:str):
+        """ share bricksDict of frame 'srcFrame' with frame 'frame' """
+        srcFrame = self.aliases.get(srcFrame, srcFrame)
+        if srcFrame not in self:
+            raise KeyError(srcFrame)
+        if frame == srcFrame:
+            return
+        if frame in self:
+            del self[frame]
+        self.aliases[frame] = srcFrame
+
+    def _unalias(self, frame:str):
+        """ remove alias for frame, moving its stored bricksDict to frames sharing it """
+        self.aliases.pop(frame, None)
+        sharingFrames = [f for f, src in self.aliases.items() if src == frame]
+        if len(sharingFrames) == 0:
+            return
+        newSrcFrame = sharingFrames[0]
+        if frame in self.frames:
+            self.frames[newSrcFrame] = self.frames.pop(frame)
+            entry = FrameCache._lru.pop((id(self), frame), None)
+            if entry is not None:
+                FrameCache._lru[(id(self), newSrcFrame)] = entry
+        if frame in self.packedFrames:
+            self.packedFrames[newSrcFrame] = self.packedFrames.pop(frame)
+        if frame in self.packedCRCs:
+            self.packedCRCs[newSrcFrame] = self.packedCRCs.pop(frame)
+        if frame in self.bases:
+            self.bases[newSrcFrame] = self.bases.pop(frame)
+        for f, base in self.bases.items():
+            if base == frame:
+                self.bases[f] = newSrcFrame
+        if self._lastBase[0] == frame:
+            self._lastBase = (None, None)
+        for f in sharingFrames:
+            self.aliases[f] = newSrcFrame
+        del self.aliases[newSrcFrame]
+
+    def _touch(self, frame:str, resize:bool=False, enforceBudget:bool=True):
+        """ move decoded frame to end of least recently used list and enforce memory budget """
+        key = (id(self), frame)
+        entry = FrameCache._lru.pop(key, None)
+        if entry is None or resize or entry[0]() is not self:
+            if entry is not None:
+                FrameCache._lruSize -= entry[1]
+            entry = (weakref.ref(self), getBricksDictSize(self.frames[frame]))
+            FrameCache._lruSize += entry[1]
+        FrameCache._lru[key] = entry
+        if enforceBudget:
+            FrameCache.enforceMemoryBudget(keep=key)
+
+    @staticmethod
+    def enforceMemoryBudget(keep:tuple=None):
+        """ pack least recently used decoded frames until their total size fits the memory budget """
+        budget = getBFMCacheMemoryBudget()
+        for key in list(FrameCache._lru):
+            if FrameCache._lruSize <= budget:
+                break
+            if key == keep:
+                continue
+            ref, size = FrameCache._lru.pop(key)
+            FrameCache._lruSize -= size
+            frameCache = ref()
+            if frameCache is not None and key[1] in frameCache.frames:
+                frameCache.packFrame(key[1])
+
+    def _decode(self, frame:str):
+        """ returns new bricksDict decoded from packed data of frame """
+        data = zlib.decompress(self.packedFrames[frame])
+        if frame in self.bases:
+            bricksDict = BricksDictColumns.unpackDiff(self._getBase(self.bases[frame]), data)
+            data = bricksDict.pack()
+        else:
+            bricksDict = BricksDictColumns.unpack(data)
+        self.packedCRCs[frame] = zlib.crc32(data)
+        return bricksDict
+
+    def _getBase(self, frame:str):
+        """ returns bricksDict of keyframe decoded from its packed data (not to be modified) """
+        if self._lastBase[0] != frame:
+            self._lastBase = (frame, BricksDictColumns.unpack(zlib.decompress(self.packedFrames[frame])))
+        return self._lastBase[1]
+
+    def _getKeyframe(self, frame:str):
+        """ returns nearest preceding packed keyframe to store changes of frame against (None if not found) """
+        try:
+            frameNum = int(frame)
+        except ValueError:
+            return None
+        keyframe = None
+        for f in self.packedFrames:
+            if f == frame or f in self.bases or f in self.aliases:
+                continue
+            try:
+                dist = frameNum - int(f)
+            except ValueError:
+                continue
+            if 0 < dist < BFM_KEYFRAME_INTERVAL and (keyframe is None or int(f) > int(keyframe)):
+                keyframe = f
+        return keyframe
+
+    def _detachDependents(self, frame:str):
+        """ decode frames packed against keyframe 'frame' (before its packed data is replaced) """
+        dependents = [f for f, base in self.bases.items() if base == frame]
+        for f in dependents:
+            if f not in self.frames:
+                self.frames[f] = self._decode(f)
+            del self.bases[f]
+            self.packedFrames.pop(f, None)
+            self.packedCRCs.pop(f, None)
+        if self._lastBase[0] == frame:
+            self._lastBase = (None, None)
+        # track decoded frames without packing frames until keyframe is replaced
+        for f in dependents:
+            self._touch(f, resize=True, enforceBudget=False)
+
+    def packFrame(self, frame:str):
+        """ compress decoded bricksDict for frame and free it from memory """
+        self.getPacked(frame)
+        del self.frames[frame]
+
+    def getPacked(self, frame:str):
+        """ returns compressed bricksDict for frame (reusing packed data of frames unchanged since decoding)
+
+        Frames shortly after a packed keyframe are packed as the entries changed since that keyframe
+        if those are fewer than half of the entries of the frame
+
+        """
+        if frame not in self.frames:
+            return self.packedFrames[frame]
+        bricksDict = self.frames[frame]
+        if not isinstance(bricksDict, BricksDictColumns):
+            bricksDict = BricksDictColumns.fromDict(bricksDict)
+        data = bricksDict.pack()
+        crc = zlib.crc32(data)
+        if frame in self.packedFrames and self.packedCRCs.get(frame) == crc:
+            return self.packedFrames[frame]
+        self._detachDependents(frame)
+        self.bases.pop(frame, None)
+        keyframe = self._getKeyframe(frame)
+        if keyframe is not None:
+            base = self._getBase(keyframe)
+            changedKeys = base.diffKeys(bricksDict) if base.shape == bricksDict.shape and base.namePrefix == bricksDict.namePrefix else None
+            if changedKeys is not None and len(changedKeys) * 2 < len(bricksDict):
+                data = bricksDict.packDiff(base, changedKeys)
+                self.bases[frame] = keyframe
+        self.packedFrames[frame] = zlib.compress(data, 6)
+        self.packedCRCs[frame] = crc
+        return self.packedFrames[frame]
+
+    def packAll(self):
+        """ returns dictionary of frame -> compressed bricksDict for all stored frames """
+        for frame in self.storedFrames():
+            self.getPacked(frame)
+        # frames decoded while packing changed keyframes above are packed again
+        return {frame: self.getPacked(frame) for frame in self.storedFrames()}
+
+    def toDict(self):
+        return {frame: self[frame] for frame in self}
+
+    @staticmethod
+    def fromDict(frames:dict):
+        """ returns frame cache with (decoded) bricksDicts of dictionary of frame -> bricksDict """
+        frameCache = FrameCache()
+        for frame, bricksDict in frames.items():
+            frameCache[frame] = bricksDict
+        return frameCache
+
+
+def isAnimCache(cache):
+    """ check if cache is dictionary of animation frame -> bricksDict (rather than a single bricksDict) """
+    return isinstance(cache, FrameCache) or (len(cache) > 0 and all("," not in k for k in cache.keys()))
+
+
+def packBricksDict(bricksDict):
+    """ returns compressed bytes of bricksDict (plain dictionary or columns) """
+    if not isinstance(bricksDict, BricksDictColumns):
+        bricksDict = BricksDictColumns.fromDict(bricksDict)
+    return zlib.compress(bricksDict.pack(), 6)
+
+
+def unpackBricksDict(data:bytes):
+    """ returns bricksDict (columns) from compressed bytes of 'packBricksDict' """
+    return BricksDictColumns.unpack(zlib.decompress(data))
+
+
+def encodeBFMCache(cache):
+    """ returns string for cm.BFMCache with bricksDict (or dictionary of animation frame -> bricksDict) packed in binary format
+
+    format: "<prefix><version>:" + base64 of (header length, json header, compressed bricksDicts) where
+    the header lists the byte ranges of each animation frame so frames can be decoded independently (as well as
+    the frames sharing the bricksDict of another frame and the keyframes packed frames store their changes against)
+
+    """
+    if cache is None:
+        return ""
+    isAnim = isAnimCache(cache)
+    if isAnim:
+        if not isinstance(cache, FrameCache):
+            cache = FrameCache.fromDict(cache)
+        packedFrames = cache.packAll()
+        frames = list(packedFrames)
+        blobs = list(packedFrames.values())
+        aliases = cache.aliases
+        bases = cache.bases
+    else:
+        frames = [None]
+        blobs = [packBricksDict(cache)]
+        aliases = {}
+        bases = {}
+    offsets = []
+    offset = 0
+    for blob in blobs:
+        offsets.append((offset, len(blob)))
+        offset += len(blob)
+    header = json.dumps({"anim":isAnim, "frames":[(f,) + o for f, o in zip(frames, offsets)], "aliases":aliases, "bases":bases}, separators=(",", ":")).encode()
+    data = b"".join([struct.pack("<I", len(header)), header] + blobs)
+    return "%s%d:%s" % (BFM_CACHE_PREFIX, BFM_CACHE_VERSION, base64.b64encode(data).decode())
+
+
+def decodeBFMCache(string:str):
+    """ returns bricksDict (or FrameCache for animations) from cm.BFMCache string (binary or legacy json format) """
+    if not string.startswith(BFM_CACHE_PREFIX):
+        # legacy json deep cache
+        cache = json.loads(string)
+        return FrameCache.fromDict(cache) if cache is not None and isAnimCache(cache) else cache
+    version, data = string[len(BFM_CACHE_PREFIX):].split(":", 1)
+    if int(version) > BFM_CACHE_VERSION:
+        raise ValueError("Bricker cache version %(version)s is newer than supported version %(BFM_CACHE_VERSION)s" % dict(version=version, BFM_CACHE_VERSION=BFM_CACHE_VERSION))
+    data = base64.b64decode(data)
+    headerLen = struct.unpack_from("<I", data)[0]
+    header = json.loads(data[4:4 + headerLen].decode())
+    start = 4 + headerLen
+    blobs = {f: data[start + offset:start + offset + length] for f, offset, length in header["frames"]}
+    if header["anim"]:
+        return FrameCache(blobs, aliases=header.get("aliases"), bases=header.get("bases"))
+    return unpackBricksDict(blobs[None])
+
 def getBricksDict(dType="MODEL", source=None, source_details=None, dimensions=None, brickScale=None, updateCursor=True, curFrame=None, cm=None, origSource=None, restrictContext=True):
     """ retrieve bricksDict from cache if possible, else create a new one """
     scn = bpy.context.scene
@@ -36,7 +376,11 @@ def getBricksDict(dType="MODEL", source=None, source_details=None, dimensions=No
     # if bricksDict can be pulled from cache
     if not matrixReallyIsDirty(cm) and cacheExists(cm) and not (cm.animIsDirty and "ANIM" in dType):
         # try getting bricksDict from light cache, then deep cache
-        bricksDict = bricker_bfm_cache.get(cm.id) or json.loads(cm.BFMCache)
+        bricksDict = bricker_bfm_cache.get(cm.id)
+        if not bricksDict:
+            # decode deep cache into light cache (animation frames are decoded on access)
+            bricksDict = decodeBFMCache(cm.BFMCache)
+            bricker_bfm_cache[cm.id] = bricksDict
         loadedFromCache = True
         # if animated, index into that dict
         if "ANIM" in dType:
@@ -64,7 +408,7 @@ def lightToDeepCache(bricker_bfm_cache):
         if not cm:
             continue
         # save last cache to cm.BFMCache
-        cm.BFMCache = json.dumps(bricker_bfm_cache[cm_id])
+        cm.BFMCache = encodeBFMCache(bricker_bfm_cache[cm_id])
         numPushedIDs += 1
     if numPushedIDs > 0:
         print("[Bricker] pushed {numKeys} {pluralized_dicts} from light cache to deep cache".format(numKeys=numPushedIDs, pluralized_dicts="dict" if numPushedIDs == 1 else "dicts"))
@@ -77,7 +421,7 @@ def deepToLightCache(bricker_bfm_cache):
         # make sure there is something to store to light cache
         if cm.BFMCache == "":
             continue
-        bricksDict = json.loads(cm.BFMCache)
+        bricksDict = decodeBFMCache(cm.BFMCache)
         bricker_bfm_cache[cm.id] = bricksDict
         numPulledIDs += 1
     if numPulledIDs > 0:
@@ -90,6 +434,6 @@ def cacheBricksDict(action, cm, bricksDict, curFrame=None):
         bricker_bfm_cache[cm.id] = bricksDict
     elif action in ("ANIMATE", "UPDATE_ANIM"):
         if (cm.id not in bricker_bfm_cache.keys() or
-           type(bricker_bfm_cache[cm.id]) != dict):
-            bricker_bfm_cache[cm.id] = {}
+           not isinstance(bricker_bfm_cache[cm.id], (dict, FrameCache))):
+            bricker_bfm_cache[cm.id] = FrameCache()
         bricker_bfm_cache[cm.id][str(curFrame)] = bricksDict
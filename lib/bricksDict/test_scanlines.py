@@ -0,0 +1,130 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# NOTE: Run with pytest from a Blender instance with Bricker enabled
+
+# System imports
+import bmesh
+import math
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils import Matrix, Vector
+
+# Addon imports
+from .generate import FaceIdxMatrix, getBrickMatrix, getSourceLattice
+from ...functions.common import bounds
+
+
+def setUpTestModel():
+    """ add cmlist item for test model and return it """
+    scn = bpy.context.scene
+    cm = scn.cmlist.add()
+    cm.id = max([cm0.id for cm0 in scn.cmlist]) + 1
+    scn.cmlist_index = len(scn.cmlist) - 1
+    cm.shellProcesses = 1
+    return cm
+
+
+def tearDownTestModel(obj):
+    """ remove cmlist item of test model and its source object """
+    scn = bpy.context.scene
+    scn.cmlist.remove(scn.cmlist_index)
+    scn.cmlist_index = len(scn.cmlist) - 1
+    m = obj.data
+    bpy.data.objects.remove(obj, do_unlink=True)
+    bpy.data.meshes.remove(m)
+
+
+def newSourceObject(name, bm):
+    """ link new object with mesh from 'bm' to scene """
+    m = bpy.data.meshes.new(name)
+    bm.to_mesh(m)
+    bm.free()
+    obj = bpy.data.objects.new(name, m)
+    bpy.context.scene.objects.link(obj)
+    bpy.context.scene.update()
+    return obj
+
+
+def closedMesh():
+    """ icosphere rotated off the lattice axes """
+    bm = bmesh.new()
+    bmesh.ops.create_icosphere(bm, subdivisions=2, diameter=1.0, matrix=Matrix.Rotation(math.radians(20), 4, Vector((1, 1, 0))))
+    return bm
+
+
+def openMesh():
+    """ cube with its top face removed """
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=1.6)
+    bm.faces.remove(next(f for f in bm.faces if f.calc_center_median().z > 0.5))
+    return bm
+
+
+def coplanarMesh():
+    """ two cubes sharing a face, with the top faces of both cubes in the same plane """
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=1.0, matrix=Matrix.Translation((-0.5, 0, 0)))
+    bmesh.ops.create_cube(bm, size=1.0, matrix=Matrix.Translation((0.5, 0, 0)))
+    return bm
+
+
+def getMatrices(cm, source, shellRayCasting):
+    """ returns brickFreqMatrix and faceIdxMatrix for 'source' with 'shellRayCasting' method """
+    cm.shellRayCasting = shellRayCasting
+    coordMatrix = getSourceLattice(source, bounds(source, use_adaptive_domain=False), Vector((0.2, 0.2, 0.24)))
+    faceIdxMatrix = FaceIdxMatrix(coordMatrix.shape)
+    brickFreqMatrix = getBrickMatrix(source, faceIdxMatrix, coordMatrix, cm.brickShell, axes=cm.calculationAxes, printStatus=False)
+    return brickFreqMatrix, faceIdxMatrix
+
+
+def assertSameMatrices(makeBMesh):
+    """ confirm scanline and per location ray casting produce the same matrices for all shell settings """
+    cm = setUpTestModel()
+    source = newSourceObject("Bricker_test_scanlines", makeBMesh())
+    try:
+        for brickShell in ("INSIDE", "OUTSIDE", "INSIDE AND OUTSIDE"):
+            for insidenessRayCastDir in ("HIGH EFFICIENCY", "XYZ"):
+                for castDoubleCheckRays in (False, True):
+                    cm.brickShell = brickShell
+                    cm.calculationAxes = "XYZ"
+                    cm.insidenessRayCastDir = insidenessRayCastDir
+                    cm.castDoubleCheckRays = castDoubleCheckRays
+                    settings = "%(brickShell)s, %(insidenessRayCastDir)s, castDoubleCheckRays=%(castDoubleCheckRays)s" % locals()
+                    expectedBFM, expectedFIM = getMatrices(cm, source, "PER LOCATION")
+                    bfm, fim = getMatrices(cm, source, "SCANLINE")
+                    assert np.array_equal(bfm, expectedBFM), "brickFreqMatrix differs (%(settings)s)" % locals()
+                    assert np.array_equal(fim.idx, expectedFIM.idx), "faceIdxMatrix differs (%(settings)s)" % locals()
+                    hasFace = expectedFIM.idx != -1
+                    assert np.allclose(fim.dist[hasFace], expectedFIM.dist[hasFace], atol=1e-4), "faceIdxMatrix distances differ (%(settings)s)" % locals()
+                    assert np.allclose(fim.loc[hasFace], expectedFIM.loc[hasFace], atol=1e-4), "faceIdxMatrix locations differ (%(settings)s)" % locals()
+    finally:
+        tearDownTestModel(source)
+
+
+def test_scanlines_closed_mesh():
+    assertSameMatrices(closedMesh)
+
+
+def test_scanlines_open_mesh():
+    assertSameMatrices(openMesh)
+
+
+def test_scanlines_coplanar_faces():
+    assertSameMatrices(coplanarMesh)
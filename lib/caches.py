@@ -24,6 +24,18 @@ bricker_source_mesh_cache = {}
 # initialize the BFMCache
 bricker_bfm_cache = {}
 
+# initialize the UV image pixel cache dictionary
+bricker_uv_image_cache = {}
+
+# initialize the logo mesh array cache dictionary
+bricker_logo_cache = {}
+
+# initialize the animation frame brick object index dictionary (see 'getAnimFrameIndex')
+bricker_anim_frame_cache = {}
+
+# initialize the animation frame brick mesh cache dictionary (last frame drawn while brickifying animation)
+bricker_anim_mesh_cache = {}
+
 # cache functions
 def cacheExists(cm):
     """check if light or deep matrix cache exists for cmlist item"""
@@ -0,0 +1,172 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import hashlib
+import os
+import tempfile
+import zipfile
+import numpy as np
+
+# Blender imports
+import bmesh
+import bpy
+
+# Addon imports
+# NONE!
+
+# version of on-disk brick mesh format (see 'writeBrickMeshes')
+BRICK_MESH_CACHE_VERSION = 2
+
+
+def getMeshCacheDirectory():
+    """ returns directory of on-disk brick mesh cache (shared by all Blender sessions on this machine) """
+    return os.path.join(tempfile.gettempdir(), "bricker_mesh_cache")
+
+
+def getMeshCacheSizeLimit():
+    """ returns size limit (in bytes) of on-disk brick mesh cache (0 if disabled) """
+    try:
+        return bpy.props.bricker_preferences.meshCacheSize * 1024 ** 2
+    except AttributeError:
+        return 256 * 1024 ** 2
+
+
+def getMeshCachePath(bm_cache_string:str):
+    """ returns path of cache file for brick meshes with settings 'bm_cache_string' """
+    version = getattr(bpy.props, "bricker_version", "")
+    key = "|".join((str(BRICK_MESH_CACHE_VERSION), str(version), bm_cache_string))
+    return os.path.join(getMeshCacheDirectory(), hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+
+def bmeshToArrays(bm, prefix:str=""):
+    """ returns dictionary of vertex, face, edge flag and uv arrays for bmesh """
+    bm.verts.index_update()
+    uvLayer = bm.loops.layers.uv.active
+    arrays = {
+        "co": np.array([v.co[:] for v in bm.verts], dtype=np.float32).reshape(-1, 3),
+        "select": np.array([v.select for v in bm.verts], dtype=np.bool_),
+        "face_verts": np.array([v.index for f in bm.faces for v in f.verts], dtype=np.int32),
+        "face_totals": np.array([len(f.verts) for f in bm.faces], dtype=np.int32),
+        "smooth": np.array([f.smooth for f in bm.faces], dtype=np.bool_),
+        "material_index": np.array([f.material_index for f in bm.faces], dtype=np.int16),
+        "face_select": np.array([f.select for f in bm.faces], dtype=np.bool_),
+        "loose_edges": np.array([[v.index for v in e.verts] for e in bm.edges if len(e.link_faces) == 0], dtype=np.int32).reshape(-1, 2),
+        "seam_edges": np.array([[v.index for v in e.verts] for e in bm.edges if e.seam], dtype=np.int32).reshape(-1, 2),
+        "sharp_edges": np.array([[v.index for v in e.verts] for e in bm.edges if not e.smooth], dtype=np.int32).reshape(-1, 2),
+    }
+    if uvLayer is not None:
+        arrays["uv"] = np.array([l[uvLayer].uv[:] for f in bm.faces for l in f.loops], dtype=np.float32).reshape(-1, 2)
+    return {prefix + name: arr for name, arr in arrays.items()}
+
+
+def arraysToBMesh(arrays, prefix:str=""):
+    """ returns new bmesh created from arrays in 'bmeshToArrays' format """
+    bm = bmesh.new()
+    verts = [bm.verts.new(co) for co in arrays[prefix + "co"].tolist()]
+    faceVerts = arrays[prefix + "face_verts"].tolist()
+    uvLayer = bm.loops.layers.uv.new() if prefix + "uv" in arrays else None
+    uvs = arrays[prefix + "uv"].tolist() if uvLayer is not None else None
+    i = 0
+    for total, smooth, matIdx, select in zip(arrays[prefix + "face_totals"].tolist(), arrays[prefix + "smooth"].tolist(), arrays[prefix + "material_index"].tolist(), arrays[prefix + "face_select"].tolist()):
+        f = bm.faces.new([verts[idx] for idx in faceVerts[i:i + total]])
+        f.smooth = smooth
+        f.material_index = matIdx
+        # NOTE: deselecting a face deselects its verts
+        if select:
+            f.select = True
+        if uvLayer is not None:
+            for l, uv in zip(f.loops, uvs[i:i + total]):
+                l[uvLayer].uv = uv
+        i += total
+    for v1, v2 in arrays[prefix + "loose_edges"].tolist():
+        bm.edges.new((verts[v1], verts[v2]))
+    for v1, v2 in arrays[prefix + "seam_edges"].tolist():
+        bm.edges.get((verts[v1], verts[v2])).seam = True
+    for v1, v2 in arrays[prefix + "sharp_edges"].tolist():
+        bm.edges.get((verts[v1], verts[v2])).smooth = False
+    for v, select in zip(verts, arrays[prefix + "select"].tolist()):
+        v.select = select
+    bm.verts.index_update()
+    return bm
+
+
+def readBrickMeshes(bm_cache_string:str):
+    """ returns list of brick bmeshes for 'bm_cache_string' from on-disk cache (None if not found) """
+    if getMeshCacheSizeLimit() == 0:
+        return None
+    path = getMeshCachePath(bm_cache_string)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        # mark file as recently used
+        os.utime(path, None)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+    return [arraysToBMesh(arrays, prefix="%d_" % i) for i in range(int(arrays["count"]))]
+
+
+def writeBrickMeshes(bm_cache_string:str, bms:list):
+    """ store list of brick bmeshes for 'bm_cache_string' to on-disk cache """
+    limit = getMeshCacheSizeLimit()
+    if limit == 0:
+        return
+    path = getMeshCachePath(bm_cache_string)
+    arrays = {"count": np.array(len(bms))}
+    for i, bm in enumerate(bms):
+        arrays.update(bmeshToArrays(bm, prefix="%d_" % i))
+    # write to temporary file and move into place so concurrent readers never see partial files
+    tmpPath = "%(path)s.%(pid)s.tmp" % dict(path=path, pid=os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmpPath, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmpPath, path)
+    except OSError:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        return
+    enforceMeshCacheSize(limit)
+
+
+def enforceMeshCacheSize(limit:int=None):
+    """ remove least recently used files from on-disk brick mesh cache until under size limit """
+    limit = getMeshCacheSizeLimit() if limit is None else limit
+    directory = getMeshCacheDirectory()
+    files = []
+    try:
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".npz"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return
+    totalSize = sum(f[1] for f in files)
+    for _, size, path in sorted(files):
+        if totalSize <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # already removed by another process
+            pass
+        totalSize -= size
+
+
+def clearMeshCache():
+    """ remove all files from on-disk brick mesh cache """
+    enforceMeshCacheSize(limit=0)
@@ -44,6 +44,21 @@ class BRICKER_PT_preferences(AddonPreferences):
         min=0.00001,
         precision=3,
         default=0.096)
+    bfmCacheMemory = bpy.props.IntProperty(
+        name="Animation Cache Memory (MB)",
+        description="Memory budget for decoded frames of brick animations (least recently used frames are compressed when exceeded)",
+        min=16,
+        default=512)
+    undoMemory = bpy.props.IntProperty(
+        name="Undo Memory (MB)",
+        description="Memory limit for bricksDict changes stored in Bricker's undo and redo stacks (oldest steps are removed when exceeded)",
+        min=16,
+        default=256)
+    meshCacheSize = bpy.props.IntProperty(
+        name="Brick Mesh Disk Cache (MB)",
+        description="Size limit for generated brick meshes cached on disk and shared between Blender sessions and background processes (0 to disable)",
+        min=0,
+        default=256)
 
 	# addon updater preferences
     auto_check_update = bpy.props.BoolProperty(
@@ -88,6 +103,10 @@ class BRICKER_PT_preferences(AddonPreferences):
             col.prop(prefs, "relativeBrickHeight")
         else:
             col.prop(prefs, "absoluteBrickHeight")
+        col = layout.column(align=True)
+        col.prop(prefs, "bfmCacheMemory")
+        col.prop(prefs, "undoMemory")
+        col.prop(prefs, "meshCacheSize")
 
         # updater draw function
         addon_updater_ops.update_settings_ui(self,context)
@@ -0,0 +1,387 @@
+# Copyright (C) 2018 Christopher Gearhart
+# chris@bblanimation.com
+# http://bblanimation.com/
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# System imports
+import os
+import socket
+import subprocess
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import numpy as np
+
+# Blender imports
+import bpy
+from mathutils import Vector
+
+# Addon imports
+from .bricksDict import *
+from ..functions import *
+from ..functions.mesh_assembly import MeshAssembler
+
+# cmlist properties not sent to worker instances
+WORKER_SKIPPED_PROPS = ("BFMCache", "blender_undo_state")
+
+
+class BrickerWorkerPool:
+    """ persistent background Blender instances computing bricksDicts of animation frames for a model
+
+    Each worker starts Blender once (with factory settings, without loading the .blend file) and then
+    serves requests until the pool is shut down (when the brickify operator finishes or is cancelled). Requests hold only the evaluated source mesh arrays and
+    model settings for a frame, and workers send back the packed bricksDict (see 'getWorkerRequest').
+    Bricks are drawn by the host when the bricksDict of a frame is retrieved.
+
+    """
+    instances = {}
+
+    def __init__(self):
+        self.authkey = os.urandom(16)
+        self.listener = None
+        self.maxWorkers = 5
+        self.timeout = 0
+        # worker id -> {"process", "conn", "job", "startTime"}
+        self.workers = {}
+        self.nextWorkerID = 0
+        # connections accepted by listener thread (worker id -> connection)
+        self.connections = {}
+        self.lock = threading.Lock()
+        # list of (frame, request) waiting for an idle worker
+        self.pendingJobs = []
+        self.results = {}
+        self.issues = {}
+
+    @classmethod
+    def getInstance(cls, cm_id:str):
+        """ returns worker pool for cmlist item with id 'cm_id' """
+        if cm_id not in cls.instances:
+            cls.instances[cm_id] = cls()
+        return cls.instances[cm_id]
+
+    @classmethod
+    def shutdownAll(cls):
+        """ stop worker instances of all pools """
+        for pool in cls.instances.values():
+            pool.shutdown()
+        cls.instances.clear()
+
+    ################################################
+    # job methods
+
+    def addJob(self, frame:int, request:dict):
+        """ queue bricksDict request for animation frame (returns False if frame is already queued or running) """
+        if frame in self.getJobs():
+            return False
+        self.results.pop(frame, None)
+        self.issues.pop(frame, None)
+        self.pendingJobs.append((frame, request))
+        return True
+
+    def getJobs(self):
+        """ returns frames of pending and running jobs """
+        return [frame for frame, _ in self.pendingJobs] + [w["job"][0] for w in self.workers.values() if w["job"] is not None]
+
+    def processJobs(self):
+        """ retrieve results of finished jobs, drop timed out jobs and send pending jobs to idle workers (call from main thread) """
+        self.acceptConnections()
+        for workerID, worker in list(self.workers.items()):
+            conn, job = worker["conn"], worker["job"]
+            # worker process exited (crashed or failed to start)
+            if worker["process"].poll() is not None:
+                self.removeWorker(workerID)
+                if job is not None:
+                    self.issues[job[0]] = "Worker instance exited with code %(code)s" % dict(code=worker["process"].returncode)
+                elif conn is None:
+                    self.dropPendingJobs("Could not start background Blender instance (exit code %(code)s)" % dict(code=worker["process"].returncode))
+                continue
+            if job is None:
+                continue
+            # retrieve result of finished job
+            if conn.poll():
+                try:
+                    result = conn.recv()
+                except (EOFError, OSError):
+                    self.removeWorker(workerID)
+                    self.issues[job[0]] = "Lost connection to worker instance"
+                    continue
+                worker["job"] = None
+                if "error" in result:
+                    self.issues[job[0]] = result["error"]
+                else:
+                    self.results[job[0]] = result["bricksDict"]
+            # drop job if it took longer than timeout
+            elif self.timeout > 0 and time.time() - worker["startTime"] > self.timeout:
+                self.removeWorker(workerID)
+                self.issues[job[0]] = "Timed out after %(timeout)s seconds" % dict(timeout=self.timeout)
+        # send pending jobs to idle workers
+        for worker in self.workers.values():
+            if len(self.pendingJobs) == 0:
+                break
+            if worker["conn"] is None or worker["job"] is not None:
+                continue
+            worker["job"] = self.pendingJobs.pop(0)
+            worker["startTime"] = time.time()
+            try:
+                worker["conn"].send(worker["job"][1])
+            except (OSError, ValueError):
+                # worker process exit is handled on next call
+                pass
+        # start new workers for remaining pending jobs
+        numStarting = sum(w["conn"] is None for w in self.workers.values())
+        while numStarting < len(self.pendingJobs) and len(self.workers) < self.maxWorkers:
+            self.startWorker()
+            numStarting += 1
+        # stop extra workers if max workers was reduced
+        for workerID, worker in list(self.workers.items()):
+            if len(self.workers) <= self.maxWorkers:
+                break
+            if worker["job"] is None:
+                self.removeWorker(workerID)
+
+    def dropPendingJobs(self, issue:str):
+        """ drop all jobs waiting for an idle worker with 'issue' """
+        for frame, _ in self.pendingJobs:
+            self.issues[frame] = issue
+        self.pendingJobs = []
+
+    def cancelJobs(self):
+        """ drop pending jobs and stop workers running jobs """
+        self.pendingJobs = []
+        for workerID, worker in list(self.workers.items()):
+            if worker["job"] is not None:
+                self.removeWorker(workerID)
+        self.results.clear()
+        self.issues.clear()
+
+    def jobComplete(self, frame:int):
+        return frame in self.results
+
+    def jobDropped(self, frame:int):
+        return frame in self.issues
+
+    def getResult(self, frame:int):
+        """ returns bricksDict computed for frame (removes it from the pool) """
+        return unpackBricksDict(self.results.pop(frame))
+
+    def getIssueString(self, frame:int):
+        return self.issues.pop(frame)
+
+    def numPendingJobs(self):
+        return len(self.pendingJobs)
+
+    def numRunningJobs(self):
+        return sum(w["job"] is not None for w in self.workers.values())
+
+    def jobsComplete(self):
+        return self.numPendingJobs() + self.numRunningJobs() == 0
+
+    ################################################
+    # worker methods
+
+    def startListener(self):
+        """ listen for connections from worker instances on localhost """
+        if self.listener is not None:
+            return
+        self.listener = Listener(("localhost", 0), authkey=self.authkey)
+        thread = threading.Thread(target=self._acceptLoop, args=(self.listener,))
+        thread.daemon = True
+        thread.start()
+
+    def _acceptLoop(self, listener):
+        """ accept worker connections until listener is closed (runs in separate thread; must not use bpy) """
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError, EOFError):
+                # stop if listener was closed, else ignore connections failing the authkey handshake
+                if self.listener is not listener:
+                    break
+                continue
+            try:
+                workerID = conn.recv()
+            except Exception:
+                conn.close()
+                continue
+            if not isinstance(workerID, int):
+                conn.close()
+                continue
+            with self.lock:
+                self.connections[workerID] = conn
+
+    def acceptConnections(self):
+        """ assign connections accepted by listener thread to their workers """
+        with self.lock:
+            connections, self.connections = self.connections, {}
+        for workerID, conn in connections.items():
+            if workerID in self.workers:
+                self.workers[workerID]["conn"] = conn
+            else:
+                conn.close()
+
+    def startWorker(self):
+        """ launch background Blender instance that connects to this pool """
+        self.startListener()
+        host, port = self.listener.address
+        workerID = self.nextWorkerID
+        self.nextWorkerID += 1
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brickify_worker.py")
+        addonPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        args = [bpy.app.binary_path, "--background", "--factory-startup", "--python", script, "--", host, str(port), addonPath, str(workerID)]
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+        # pass authkey through stdin (arguments can be read by other users)
+        try:
+            process.stdin.write(self.authkey.hex().encode() + b"\n")
+            process.stdin.close()
+        except OSError:
+            # worker process exit is handled in 'processJobs'
+            pass
+        self.workers[workerID] = {"process":process, "conn":None, "job":None, "startTime":None}
+
+    def removeWorker(self, workerID:int):
+        """ stop worker instance (jobs running on it are not requeued) """
+        worker = self.workers.pop(workerID)
+        if worker["conn"] is not None:
+            if worker["job"] is None:
+                # ask idle worker to exit cleanly
+                try:
+                    worker["conn"].send(None)
+                except (OSError, ValueError):
+                    pass
+            worker["conn"].close()
+        if worker["job"] is not None or worker["conn"] is None:
+            worker["process"].kill()
+
+    def shutdown(self):
+        """ stop all worker instances and close listener """
+        self.pendingJobs = []
+        for workerID in list(self.workers.keys()):
+            self.removeWorker(workerID)
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            # wake listener thread waiting in 'accept' so it can exit
+            try:
+                socket.create_connection(listener.address, timeout=1).close()
+            except OSError:
+                pass
+            listener.close()
+
+
+def canUseWorkerPool(cm, source):
+    """ check if bricksDicts of animation frames of 'source' can be computed by worker pool (needs no data from .blend file) """
+    if cm.maxWorkers == 0 or is_smoke(source) or cm.brickType == "CUSTOM":
+        return False
+    # colors sampled from uv images (see 'getUVImages') need image data from .blend file
+    uv_tex_data = getUVTextureData(source)
+    images = [uv_tex.image for uv_tex in uv_tex_data] if uv_tex_data else []
+    images += [cm.uvImage, getFirstImgTexNode(source)]
+    return all(verifyImg(img) is None for img in images)
+
+
+def getWorkerRequest(cm, source, frame:int):
+    """ returns data sent to worker instance for computing bricksDict of frame (source duplicate without parent and with transforms applied) """
+    arrays = MeshAssembler.getMeshArrays(source.data)
+    # send settings stored in cmlist item (unset properties have default values in worker)
+    settings = {}
+    for prop in cm.keys():
+        if prop in WORKER_SKIPPED_PROPS:
+            continue
+        value = cm[prop]
+        if hasattr(value, "to_list"):
+            value = value.to_list()
+        if isinstance(value, (bool, int, float, str, list)):
+            settings[prop] = value
+    return {"frame":frame,
+            "name":getSourceName(cm),
+            "settings":settings,
+            "co":arrays["co"],
+            "vertex_index":arrays["vertex_index"],
+            "loop_start":arrays["loop_start"],
+            "loop_total":arrays["loop_total"]}
+
+
+################################################
+# worker instance functions
+
+
+def runWorker(address:tuple, authkey:bytes, workerID:int):
+    """ serve bricksDict requests from worker pool until connection is closed (runs in background Blender instance) """
+    # remove objects of factory startup scene (source object is named like the host source)
+    for obj in bpy.data.objects:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    conn = Client(address, authkey=authkey)
+    conn.send(workerID)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        try:
+            result = {"frame":request["frame"], "bricksDict":packBricksDict(makeWorkerBricksDict(request))}
+        except Exception:
+            result = {"frame":request["frame"], "error":traceback.format_exc()}
+        conn.send(result)
+    conn.close()
+
+
+def makeWorkerBricksDict(request:dict):
+    """ returns bricksDict for source mesh arrays and model settings in 'request' (see 'getWorkerRequest') """
+    scn = bpy.context.scene
+    # set up model with settings of host (bypassing property update functions)
+    if len(scn.cmlist) == 0:
+        scn.cmlist.add()
+    scn.cmlist_index = 0
+    cm = scn.cmlist[0]
+    for prop, value in request["settings"].items():
+        cm[prop] = value
+    cm.zStep = getZStep(cm)
+    # create source object named like the host source (used for names in bricksDict)
+    source = bpy.data.objects.get(request["name"])
+    if source is None:
+        source = bpy.data.objects.new(request["name"], bpy.data.meshes.new(request["name"]))
+    oldMesh = source.data
+    source.data = meshFromArrays(request["name"], request)
+    bpy.data.meshes.remove(oldMesh)
+    cm.source_obj = source
+    # evaluate source mesh for 'obj.ray_cast' (see 'brickifyCurrentFrame')
+    if source.name not in scn.objects:
+        scn.objects.link(source)
+    scn.update()
+    # make bricksDict like 'getBricksDict' does for new frames
+    source_details, dimensions = getDetailsAndBounds(source, cm)
+    # brick scale of non-custom brick types (see 'getArgumentsForBricksDict'; custom objects aren't available here)
+    brickScale = Vector((dimensions["width"] + dimensions["gap"],
+                dimensions["width"] + dimensions["gap"],
+                dimensions["height"]+ dimensions["gap"]))
+    return makeBricksDict(source, source_details, brickScale, origSource=source)
+
+
+def meshFromArrays(name:str, arrays:dict):
+    """ returns new mesh with vertices and faces from 'co', 'vertex_index', 'loop_start' and 'loop_total' arrays """
+    m = bpy.data.meshes.new(name)
+    m.vertices.add(len(arrays["co"]))
+    m.vertices.foreach_set("co", np.ascontiguousarray(arrays["co"], dtype=np.float32).ravel())
+    m.loops.add(len(arrays["vertex_index"]))
+    m.loops.foreach_set("vertex_index", arrays["vertex_index"])
+    m.polygons.add(len(arrays["loop_start"]))
+    m.polygons.foreach_set("loop_start", arrays["loop_start"])
+    m.polygons.foreach_set("loop_total", arrays["loop_total"])
+    m.update(calc_edges=True)
+    return m
+
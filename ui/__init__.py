@@ -274,6 +274,8 @@ class VIEW3D_PT_bricker_animation(Panel):
             col.prop(cm, "startFrame")
             col = split.column(align=True)
             col.prop(cm, "stopFrame")
+            row = col1.row(align=True)
+            row.prop(cm, "frameVisibility", text="")
             source = cm.source_obj
             self.appliedMods = False
             if source:
@@ -435,6 +437,8 @@ class VIEW3D_PT_bricker_model_settings(Panel):
         if not cm.useAnimation:
             row = col.row(align=True)
             row.prop(cm, "splitModel")
+            if cm.splitModel:
+                row.prop(cm, "instanceBricks")
 
         row = col.row(align=True)
         row.label(text="Brick Shell:")
@@ -1086,6 +1090,13 @@ class VIEW3D_PT_bricker_advanced(Panel):
         row.prop(cm, "useNormals")
         row = col.row(align=True)
         row.prop(cm, "verifyExposure")
+        row = col.row(align=True)
+        row.label(text="Ray Casting:")
+        row = col.row(align=True)
+        row.prop(cm, "shellRayCasting", text="")
+        if cm.shellRayCasting == "SCANLINE" and parallelShellSupported():
+            row = col.row(align=True)
+            row.prop(cm, "shellProcesses")
         if not cm.useAnimation and not (cm.modelCreated or cm.animated):
             row = col.row(align=True)
             row.label(text="Model Orientation:")
@@ -39,25 +39,10 @@ def brickerRunningBlockingOp():
 @persistent
 def handle_animation(scn):
     for i, cm in enumerate(scn.cmlist):
-        if not cm.animated:
+        # skip models with keyframed frame visibility
+        if not cm.animated or cm.frameVisibility == "KEYFRAMES":
             continue
-        n = getSourceName(cm)
-        for cf in range(cm.lastStartFrame, cm.lastStopFrame + 1):
-            curBricks = bpy.data.groups.get("Bricker_%(n)s_bricks_f_%(cf)s" % locals())
-            if curBricks is None:
-                continue
-            adjusted_frame_current = getAnimAdjustedFrame(scn.frame_current, cm.lastStartFrame, cm.lastStopFrame)
-            onCurF = adjusted_frame_current == cf
-            for brick in curBricks.objects:
-                # hide bricks from view and render unless on current frame
-                if brick.hide == onCurF:
-                    brick.hide = not onCurF
-                    brick.hide_render = not onCurF
-                if bpy.context.active_object and bpy.context.active_object.name.startswith("Bricker_%(n)s_bricks" % locals()) and onCurF:
-                    select(brick, active=True)
-                # prevent bricks from being selected on frame change
-                elif brick.select:
-                    brick.select = False
+        showAnimFrame(scn, cm)
 
 
 def isObjVisible(scn, cm, n):
@@ -199,6 +184,14 @@ def find_3dview_space():
 def clear_bfm_cache(dummy):
     for key in bricker_bfm_cache.keys():
         bricker_bfm_cache[key] = None
+    clearColorIndices()
+    resetAnimFrameIndex()
+
+
+# brick objects and their visibility may differ after undo/redo
+@persistent
+def reset_anim_frame_index(scene):
+    resetAnimFrameIndex()
 
 
 # pull dicts from deep cache to light cache on load
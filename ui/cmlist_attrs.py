@@ -83,6 +83,13 @@ class CMLIST_UL_properties(bpy.types.PropertyGroup):
         update=dirtyAnim,
         min=0, max=500000,
         default=10)
+    frameVisibility = EnumProperty(
+        name="Frame Visibility",
+        description="Choose how bricks of the current frame are shown during playback",
+        items=[("HANDLER", "Frame Handler", "Show bricks of current frame when frame changes (selects bricks of current frame if bricks are active)"),
+               ("KEYFRAMES", "Keyframes", "Keyframe visibility of bricks for each frame (no script runs on frame change; plays back in linked files and renders without Bricker)")],
+        update=updateFrameVisibility,
+        default="HANDLER")
     maxWorkers = IntProperty(
         name="Max Worker Instances",
         description="Maximum number of Blender instances allowed to run in background for Bricker calculations (larger numbers are faster at a higher CPU load; 0 for local calculation)",
@@ -165,6 +172,11 @@ class CMLIST_UL_properties(bpy.types.PropertyGroup):
         description="Split model into separate objects (slower)",
         update=dirtyModel,
         default=False)
+    instanceBricks = BoolProperty(
+        name="Instance Meshes",
+        description="Share one mesh between split bricks of the same shape, with edge split and bevel applied to the shared meshes instead of modifiers on every brick (faster for large models)",
+        update=dirtyBuild,
+        default=False)
     randomLoc = FloatProperty(
         name="Random Location",
         description="Max random location applied to each brick",
@@ -592,6 +604,18 @@ class CMLIST_UL_properties(bpy.types.PropertyGroup):
         description="Cast additional ray(s) the opposite direction for insideness calculation (Slightly slower but much more accurate if mesh is not single closed mesh)",
         default=True,
         update=dirtyMatrix)
+    shellRayCasting = EnumProperty(
+        name="Ray Casting",
+        description="Method used to cast rays for brick shell and insideness calculations",
+        items=[("SCANLINE", "Scanline (fast)", "Cast rays along each lattice row once using a BVH tree, and derive results for all locations on that row (EXPERIMENTAL: results may differ where rays graze faces or lattice locations lie on faces)"),
+               ("PER LOCATION", "Per Location", "Cast rays from each lattice location individually (slower)")],
+        update=dirtyMatrix,
+        default="PER LOCATION")
+    shellProcesses = IntProperty(
+        name="Processes",
+        description="Number of processes used to cast scanline rays (lattice is split into slabs, one BVH tree per process; 0 for one per CPU, 1 to disable)",
+        min=0, max=64,
+        default=1)
     useNormals = BoolProperty(
         name="Use Normals",
         description="Use normals to calculate insideness of bricks (WARNING: May produce inaccurate model if source is not single closed mesh)",
@@ -27,6 +27,7 @@ props = bpy.props
 # Addon imports
 from ..functions import *
 from ..buttons.bevel import *
+from ..lib.worker_pool import BrickerWorkerPool
 from ..lib.background_processing.classes.JobManager import JobManager
 
 
@@ -126,6 +127,14 @@ def updateJobManagerProperties(self, context):
     curJobManager = JobManager.get_instance(cm.id)
     curJobManager.timeout = cm.backProcTimeout
     curJobManager.max_workers = cm.maxWorkers
+    curWorkerPool = BrickerWorkerPool.getInstance(cm.id)
+    curWorkerPool.timeout = cm.backProcTimeout
+    curWorkerPool.maxWorkers = cm.maxWorkers
+
+
+def updateFrameVisibility(self, context):
+    scn, cm, _ = getActiveContextInfo()
+    updateFrameVisibilityKeyframes(cm)
 
 
 def dirtyAnim(self, context):
@@ -203,6 +212,7 @@ def getCMProps():
             "mergeType",
             "legalBricksOnly",
             "splitModel",
+            "instanceBricks",
             "internalSupports",
             "matShellDepth",
             "latticeStep",
@@ -228,8 +238,11 @@ def getCMProps():
             "verifyExposure",
             "insidenessRayCastDir",
             "castDoubleCheckRays",
+            "shellRayCasting",
+            "shellProcesses",
             "startFrame",
             "stopFrame",
+            "frameVisibility",
             "useAnimation",
             "autoUpdateOnDelete",
             "brickShell",